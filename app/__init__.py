@@ -52,6 +52,14 @@ def create_app():
     app.config.setdefault("REMINDERS_SKEW_SECONDS", 90)
     app.config.setdefault("REMINDERS_CATCHUP_SECONDS", 300)
 
+    # Notification retention (read rows older than N days -> notifications_archive; 0 = off)
+    app.config.setdefault("NOTIF_RETENTION_DAYS", 90)
+    app.config.setdefault("NOTIF_RETENTION_BATCH", 1000)
+    app.config.setdefault("NOTIF_RETENTION_INTERVAL_HOURS", 24)
+
+    # Upload image derivatives: requeue jobs still pending after N seconds (0 = off)
+    app.config.setdefault("UPLOAD_DERIVATIVE_STALE_SECONDS", 300)
+
     # Ensure instance folder exists
     Path(app.instance_path).mkdir(parents=True, exist_ok=True)
 
@@ -234,6 +242,14 @@ def create_app():
     from app.notifications import bp as notifications_bp
     app.register_blueprint(notifications_bp, url_prefix="/notifications")
 
+    from app.notifications.counters import init_counters
+    from app.callendar.services.invitations_service import register_invitation_counter
+    init_counters(app)
+    register_invitation_counter()
+
+    from app.notifications.cli import notifications_cli
+    app.cli.add_command(notifications_cli)
+
     # ---------- FEED STACK (order-safe) ----------
     try:
         # Import routes package so all route_*.py attach to the shared bp
@@ -244,6 +260,15 @@ def create_app():
     except Exception as e:
         app.logger.exception("❌ Failed to register Feed blueprint: %s", e)
 
+    from app.feed.cli import feed_cli
+    app.cli.add_command(feed_cli)
+
+    from app.feed.cache import init_feed_cache
+    init_feed_cache(app)
+
+    from app.feed.timeline import init_timeline
+    init_timeline(app)
+
     # Feed notifications API (DB-triggered)
     try:
         from app.notifications.feed_notifications import bp as feed_notify_api_bp
@@ -273,10 +298,15 @@ def create_app():
     app.register_blueprint(uploader_bp)
     app.register_blueprint(uploads_public_bp)
 
+    from app.uploader.cli import uploads_cli
+    app.cli.add_command(uploads_cli)
+
     # Realtime SSE
     from app.realtime import api as _realtime_api
     from app.realtime import bp as realtime_bp
+    from app.realtime.broker import init_realtime
     app.register_blueprint(realtime_bp)
+    init_realtime(app)
 
     # Analytics API
     from app.analytics_feed import api as _feed_analytics_api
@@ -296,6 +326,21 @@ def create_app():
     from app.feed_search import bp as feed_search_bp
     app.register_blueprint(feed_search_bp)
 
+    from app.feed_search.cli import feed_search_cli
+    app.cli.add_command(feed_search_cli)
+
+    # Unified search (index + /api/search)
+    from app.search import bp as search_bp
+    from app.search.cli import search_cli
+    app.register_blueprint(search_bp)
+    app.cli.add_command(search_cli)
+
+    # Content-addressed blob store behind file uploads
+    app.config.setdefault("BLOBS_ENABLED", True)
+    app.config.setdefault("BLOBS_DIR", os.path.join(app.instance_path, "blobs"))
+    from app.blobs.cli import blobs_cli
+    app.cli.add_command(blobs_cli)
+
     from app.users.api_avatar import bp as account_api_bp
     app.register_blueprint(account_api_bp)
 
@@ -361,6 +406,52 @@ def create_app():
             id="reminders-job",
             replace_existing=True,
         )
+        if int(app.config.get("NOTIF_RETENTION_DAYS", 0) or 0) > 0:
+            def _run_retention_job():
+                with app.app_context():
+                    try:
+                        from app.notifications.retention import archive_read_notifications
+                        app.logger.info("[notifications] archived=%s", archive_read_notifications())
+                    except Exception:
+                        app.logger.exception("[notifications] retention job failed")
+                    finally:
+                        try:
+                            db.session.remove()
+                        except Exception:
+                            pass
+
+            sched.add_job(
+                _run_retention_job,
+                "interval",
+                hours=int(app.config.get("NOTIF_RETENTION_INTERVAL_HOURS", 24)),
+                id="notifications-retention-job",
+                replace_existing=True,
+            )
+        stale_seconds = int(app.config.get("UPLOAD_DERIVATIVE_STALE_SECONDS", 0) or 0)
+        if stale_seconds > 0:
+            def _run_derivatives_job():
+                with app.app_context():
+                    try:
+                        from app.uploader.derivatives import requeue_stale
+                        n = requeue_stale(stale_seconds)
+                        if n:
+                            app.logger.info("[uploads] requeued derivative jobs=%s", n)
+                    except Exception:
+                        app.logger.exception("[uploads] derivative requeue job failed")
+                    finally:
+                        try:
+                            db.session.remove()
+                        except Exception:
+                            pass
+
+            sched.add_job(
+                _run_derivatives_job,
+                "interval",
+                seconds=stale_seconds,
+                id="upload-derivatives-requeue-job",
+                replace_existing=True,
+            )
+
         sched.start()
         app.extensions["reminder_scheduler"] = sched
         app.logger.info("Reminders scheduler started (every %s minute(s))", interval)
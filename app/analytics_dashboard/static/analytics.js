@@ -140,7 +140,7 @@
   if (window.Realtime){
     window.addEventListener("feed_events", (e)=>{
       const t = e.detail?.type;
-      if (t === "post" || t === "comment" || t === "reaction"){
+      if (t === "post" || t === "comment" || t === "reaction" || t === "post_activity"){
         // light touch — just update KPIs; full refresh is cheap enough for your dataset
         loadOverview();
       }
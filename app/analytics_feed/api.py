@@ -5,7 +5,8 @@ from datetime import datetime, timedelta
 
 from app.extensions import db
 from app.models import User
-from app.feed.models import FeedPost, FeedComment, FeedReaction  # adjust if feed models in different module
+from app.feed.models import FeedPost, FeedComment, FeedReaction, FeedPostStats, FeedPostReactionStats  # adjust if feed models in different module
+from app.feed.stats import backfill_post_stats
 
 from . import bp
 
@@ -35,25 +36,30 @@ def overview():
     since = datetime.utcnow() - timedelta(days=days)
 
     posts_q = FeedPost.query.filter(FeedPost.created_at >= since)
-    reactions_q = FeedReaction.query.join(FeedPost).filter(FeedPost.created_at >= since)
-    comments_q = FeedComment.query.join(FeedPost).filter(FeedPost.created_at >= since)
 
     # Filter by role
     role = getattr(current_user, "role", "user")
     sid = getattr(current_user, "sector_id", None)
     if role == "director" and sid:
         posts_q = posts_q.filter((FeedPost.audience_type == "all") | (FeedPost.audience_id == sid))
-        reactions_q = reactions_q.filter((FeedPost.audience_type == "all") | (FeedPost.audience_id == sid))
-        comments_q = comments_q.filter((FeedPost.audience_type == "all") | (FeedPost.audience_id == sid))
     elif role == "user":
         posts_q = posts_q.filter((FeedPost.audience_type == "all") | (FeedPost.author_id == current_user.id))
-        reactions_q = reactions_q.filter((FeedPost.audience_type == "all") | (FeedPost.author_id == current_user.id))
-        comments_q = comments_q.filter((FeedPost.audience_type == "all") | (FeedPost.author_id == current_user.id))
+
+    # Comment/reaction totals come from the denormalized per-post counters;
+    # legacy posts in the window get their rows first so they don't count as 0
+    backfill_post_stats(since)
+    n_posts, n_comments, n_reactions = posts_q.outerjoin(
+        FeedPostStats, FeedPostStats.post_id == FeedPost.id
+    ).with_entities(
+        func.count(FeedPost.id),
+        func.coalesce(func.sum(FeedPostStats.comment_count), 0),
+        func.coalesce(func.sum(FeedPostStats.reaction_count), 0),
+    ).one()
 
     stats = {
-        "posts": posts_q.count(),
-        "comments": comments_q.count(),
-        "reactions": reactions_q.count(),
+        "posts": int(n_posts or 0),
+        "comments": int(n_comments or 0),
+        "reactions": int(n_reactions or 0),
     }
 
     return jsonify({"ok": True, "since": since.isoformat(), "stats": stats})
@@ -66,19 +72,26 @@ def reactions_breakdown():
     days = request.args.get("days", 30, type=int)
     since = datetime.utcnow() - timedelta(days=days)
 
-    q = db.session.query(
-        FeedReaction.emoji,
-        func.count(FeedReaction.id).label("count")
-    ).join(FeedPost).filter(FeedPost.created_at >= since)
-
     role = getattr(current_user, "role", "user")
     sid = getattr(current_user, "sector_id", None)
-    if role == "director" and sid:
-        q = q.filter((FeedPost.audience_type == "all") | (FeedPost.audience_id == sid))
-    elif role == "user":
-        q = q.filter(FeedReaction.user_id == current_user.id)
-
-    q = q.group_by(FeedReaction.emoji).order_by(func.count(FeedReaction.id).desc())
+    if role == "user":
+        # per-reactor breakdown can't come from per-post counters
+        total = func.count(FeedReaction.id)
+        q = db.session.query(FeedReaction.emoji, total.label("count")) \
+            .join(FeedPost).filter(FeedPost.created_at >= since) \
+            .filter(FeedReaction.user_id == current_user.id) \
+            .group_by(FeedReaction.emoji)
+    else:
+        backfill_post_stats(since)
+        total = func.sum(FeedPostReactionStats.count)
+        q = db.session.query(FeedPostReactionStats.emoji, total.label("count")) \
+            .join(FeedPost, FeedPost.id == FeedPostReactionStats.post_id) \
+            .filter(FeedPost.created_at >= since)
+        if role == "director" and sid:
+            q = q.filter((FeedPost.audience_type == "all") | (FeedPost.audience_id == sid))
+        q = q.group_by(FeedPostReactionStats.emoji)
+
+    q = q.order_by(total.desc())
     data = [{"emoji": e, "count": c} for e, c in q.all()]
 
     return jsonify({"ok": True, "since": since.isoformat(), "items": data})
@@ -90,12 +103,13 @@ def top_contributors():
     """GET /api/feed/analytics/top-contributors?days=30"""
     days = request.args.get("days", 30, type=int)
     since = datetime.utcnow() - timedelta(days=days)
+    backfill_post_stats(since)
 
     q = db.session.query(
         FeedPost.author_id,
         func.count(FeedPost.id).label("posts"),
-        func.coalesce(func.sum(func.count(FeedReaction.id)).over(partition_by=FeedPost.author_id), 0).label("total_rx")
-    ).join(FeedReaction, FeedReaction.post_id == FeedPost.id, isouter=True)\
+        func.coalesce(func.sum(FeedPostStats.reaction_count), 0).label("total_rx")
+    ).join(FeedPostStats, FeedPostStats.post_id == FeedPost.id, isouter=True)\
      .filter(FeedPost.created_at >= since)
 
     role = getattr(current_user, "role", "user")
@@ -0,0 +1,214 @@
+# app/blobs/__init__.py
+"""
+Content-addressed blob store shared by the upload paths (uploader, drive,
+Attachment.save_upload, ticket comment files).
+
+Uploads are streamed to a temp file while their SHA-256 is computed, moved to
+BLOBS_DIR/<aa>/<bb>/<sha256> if that content is new, and then hard-linked to
+the path the module has always used. Every module keeps reading, serving and
+deleting "its" file exactly as before; identical content just shares one inode.
+The inode link count is the reference count: a blob whose only link is the
+one in BLOBS_DIR is unused and `flask blobs gc` removes it.
+
+Files are treated as immutable: writers replace (new name / os.replace), never
+modify in place, otherwise every linked copy would change.
+
+Where hard links are impossible (different volume, FAT, ...) the file is copied
+instead, which is the old behaviour. BLOBS_ENABLED=False turns the store off.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from flask import current_app
+
+CHUNK = 1024 * 1024
+
+
+def enabled() -> bool:
+    return bool(current_app.config.get("BLOBS_ENABLED", True))
+
+
+def blobs_root() -> Path:
+    root = current_app.config.get("BLOBS_DIR") or os.path.join(current_app.instance_path, "blobs")
+    p = Path(root)
+    (p / "tmp").mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def blob_path(sha256: str) -> Path:
+    return blobs_root() / sha256[:2] / sha256[2:4] / sha256
+
+
+def _copy_to_tmp(stream) -> Tuple[Path, str, int]:
+    """Stream into BLOBS_DIR/tmp while hashing; returns (tmp path, sha256, size)."""
+    tmp = blobs_root() / "tmp" / uuid.uuid4().hex
+    h = hashlib.sha256()
+    size = 0
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = stream.read(CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return tmp, h.hexdigest(), size
+
+
+def _link(src: Path, dest: Path) -> None:
+    """Hard-link src to dest (replacing dest atomically); copy when links are not possible."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.lnk")
+    try:
+        os.link(src, tmp)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def save(file_storage, dest) -> Optional[str]:
+    """
+    Drop-in for FileStorage.save(dest): store the content once and link it at
+    dest. Returns the SHA-256 (None when the store is disabled).
+    """
+    dest = Path(dest)
+    if not enabled():
+        file_storage.save(str(dest))
+        return None
+
+    stream = getattr(file_storage, "stream", file_storage)
+    tmp, sha, _ = _copy_to_tmp(stream)
+    blob = blob_path(sha)
+    try:
+        try:
+            _link(blob, dest)  # content already known: reuse it
+        except FileNotFoundError:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, blob)
+            _link(blob, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return sha
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Maintenance (flask blobs ...)
+# -----------------------------------------------------------------------------
+def _walk_files(dirs: Iterable[Path], skip: Path) -> Iterator[Path]:
+    skip = skip.resolve()
+    for d in dirs:
+        if not d.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(d):
+            here = Path(dirpath).resolve()
+            if here == skip or skip in here.parents:
+                dirnames[:] = []
+                continue
+            dirnames[:] = [n for n in dirnames if not n.startswith(".")]
+            for name in filenames:
+                p = here / name
+                if not name.startswith(".") and p.is_file() and not p.is_symlink():
+                    yield p
+
+
+def dedupe_dirs(dirs: Iterable[Path], dry_run: bool = False) -> dict:
+    """
+    Link every file under dirs to its blob: the first copy of some content
+    becomes the blob (no data copied), later copies are replaced by links.
+    """
+    root = blobs_root()
+    stats = {"files": 0, "linked": 0, "bytes_freed": 0, "skipped": 0}
+    planned = {}  # dry run: sha -> file that would have become the blob
+    for path in _walk_files(dirs, skip=root):
+        stats["files"] += 1
+        st = path.stat()
+        sha = hash_file(path)
+        blob = blob_path(sha)
+        try:
+            if not blob.exists():
+                if sha not in planned:
+                    if dry_run:
+                        planned[sha] = path
+                    else:
+                        blob.parent.mkdir(parents=True, exist_ok=True)
+                        os.link(path, blob)
+                    continue
+                blob = planned[sha]
+            bst = blob.stat()
+            if (bst.st_dev, bst.st_ino) == (st.st_dev, st.st_ino):
+                continue  # already this blob
+            if bst.st_dev != st.st_dev:
+                stats["skipped"] += 1  # other volume: cannot link
+                continue
+            if not dry_run:
+                _link(blob, path)
+            stats["linked"] += 1
+            if st.st_nlink == 1:  # last name of the old inode -> space actually freed
+                stats["bytes_freed"] += st.st_size
+        except OSError:
+            current_app.logger.exception("blobs: could not dedupe %s", path)
+            stats["skipped"] += 1
+    return stats
+
+
+def _iter_blobs() -> Iterator[Path]:
+    root = blobs_root()
+    for p in root.glob("??/??/*"):
+        if p.is_file():
+            yield p
+
+
+def gc(dry_run: bool = False) -> Tuple[int, int]:
+    """Remove blobs nothing links to any more; returns (count, bytes)."""
+    n = size = 0
+    for p in _iter_blobs():
+        st = p.stat()
+        if st.st_nlink <= 1:
+            n += 1
+            size += st.st_size
+            if not dry_run:
+                p.unlink(missing_ok=True)
+    for p in (blobs_root() / "tmp").iterdir():
+        if not dry_run:
+            p.unlink(missing_ok=True)
+    return n, size
+
+
+def stats() -> dict:
+    out = {"blobs": 0, "bytes": 0, "references": 0, "bytes_saved": 0}
+    for p in _iter_blobs():
+        st = p.stat()
+        refs = max(st.st_nlink - 1, 0)
+        out["blobs"] += 1
+        out["bytes"] += st.st_size
+        out["references"] += refs
+        out["bytes_saved"] += st.st_size * max(refs - 1, 0)
+    return out
+
+
+def default_dirs() -> list:
+    cfg = current_app.config
+    dirs = [cfg.get("UPLOADS_DIR"), cfg.get("DRIVE_UPLOAD_FOLDER"),
+            cfg.get("ATTACHMENTS_DIR") or os.path.join(current_app.root_path, "attachments")]
+    seen, out = set(), []
+    for d in dirs:
+        if d and os.path.realpath(d) not in seen:
+            seen.add(os.path.realpath(d))
+            out.append(Path(d))
+    return out
@@ -0,0 +1,47 @@
+# app/blobs/cli.py
+from pathlib import Path
+
+import click
+from flask.cli import AppGroup
+
+blobs_cli = AppGroup("blobs", help="Content-addressed upload store")
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+@blobs_cli.command("dedupe")
+@click.argument("dirs", nargs=-1, type=click.Path(file_okay=False, path_type=Path))
+@click.option("--dry-run", is_flag=True, help="Only report what would be linked.")
+def dedupe(dirs, dry_run: bool):
+    """Hard-link identical files already on disk (default: uploads, drive, attachments)."""
+    from app.blobs import dedupe_dirs, default_dirs
+
+    dirs = list(dirs) or default_dirs()
+    for d in dirs:
+        click.echo(f"Scanning {d}")
+    s = dedupe_dirs(dirs, dry_run=dry_run)
+    verb = "Would link" if dry_run else "Linked"
+    click.echo(f"{s['files']} file(s); {verb} {s['linked']} duplicate(s), "
+               f"{_mb(s['bytes_freed'])} freed; {s['skipped']} skipped.")
+
+
+@blobs_cli.command("gc")
+@click.option("--dry-run", is_flag=True)
+def gc(dry_run: bool):
+    """Remove blobs no upload references any more."""
+    from app.blobs import gc as run_gc
+
+    n, size = run_gc(dry_run=dry_run)
+    click.echo(f"{'Would remove' if dry_run else 'Removed'} {n} blob(s), {_mb(size)}.")
+
+
+@blobs_cli.command("stats")
+def stats():
+    """Blob count, size and space saved by sharing."""
+    from app.blobs import stats as blob_stats
+
+    s = blob_stats()
+    click.echo(f"{s['blobs']} blob(s), {_mb(s['bytes'])} stored, "
+               f"{s['references']} reference(s), {_mb(s['bytes_saved'])} saved.")
@@ -4,8 +4,9 @@ from typing import Iterable, Mapping, Any, Optional, List, Dict
 
 from flask import current_app
 
-from app.notifications.service import create_notification
+from app.notifications.service import create_notification, create_notifications_bulk
 from app.callendar.models import Event
+from app.extensions import db
 
 try:
     from app.models import User
@@ -142,6 +143,27 @@ def _create_notification_safe(*, user_id: int, title: str, link_url: str, meta:
         pass
 
 
+def _notify_bulk(recips: List[int], *, title: str, link_url: str, meta: dict, body: Optional[str] = None) -> None:
+    """One INSERT + one commit for all recipients; per-user fallback if the batch fails."""
+    if not recips:
+        return
+    try:
+        create_notifications_bulk(recips, title=title, body=body, link_url=link_url, meta=meta)
+        return
+    except Exception:
+        try:
+            current_app.logger.exception("create_notifications_bulk failed (%d recipients); sending one by one", len(recips))
+        except Exception:
+            pass
+        db.session.rollback()
+    for uid in recips:
+        _create_notification_safe(user_id=uid, title=title, body=body, link_url=link_url, meta=meta)
+
+
+def reminder_title(event: Event) -> str:
+    return f"Потсетник: {event.title or 'Настан'}"
+
+
 # ----------------- notifications -----------------
 
 def notify_event_invitation(event: Event, *, recipients: Iterable[Mapping[str, Any] | Any] | None = None) -> None:
@@ -164,14 +186,7 @@ def notify_event_invitation(event: Event, *, recipients: Iterable[Mapping[str, A
         "timezone": getattr(event, "timezone", None) or "",
     }
 
-    for uid in recips:
-        _create_notification_safe(
-            user_id=uid,
-            title=title,
-            body=body,
-            link_url=_event_link_url(event),
-            meta=base_meta,
-        )
+    _notify_bulk(recips, title=title, body=body, link_url=_event_link_url(event), meta=base_meta)
 
 
 def notify_event_updated(
@@ -199,14 +214,7 @@ def notify_event_updated(
         "timezone": getattr(event, "timezone", None) or "",
     }
 
-    for uid in recips:
-        _create_notification_safe(
-            user_id=uid,
-            title=title,
-            body=body,
-            link_url=_event_link_url(event),
-            meta=base_meta,
-        )
+    _notify_bulk(recips, title=title, body=body, link_url=_event_link_url(event), meta=base_meta)
 
 
 def notify_event_reminder(
@@ -219,7 +227,7 @@ def notify_event_reminder(
     Reminder fired for organiser + attendees.
     meta.type = "event_reminder"
     """
-    title = f"Потсетник: {event.title or 'Настан'}"
+    title = reminder_title(event)
     minutes_txt = f"{int(reminder_minutes)} мин." if reminder_minutes else "скоро"
     body = f"Настанот започнува {minutes_txt}."
 
@@ -234,11 +242,4 @@ def notify_event_reminder(
         "timezone": getattr(event, "timezone", None) or "",
     }
 
-    for uid in recips:
-        _create_notification_safe(
-            user_id=uid,
-            title=title,
-            body=body,
-            link_url=_event_link_url(event),
-            meta=base_meta,
-        )
+    _notify_bulk(recips, title=title, body=body, link_url=_event_link_url(event), meta=base_meta)
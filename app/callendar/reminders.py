@@ -1,13 +1,13 @@
 # app/callendar/reminders.py
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List, Iterable, Optional
+from typing import List, Iterable, Optional
 from zoneinfo import ZoneInfo
 from flask import current_app
 
 from app.extensions import db
 from app.callendar.models import Event  # adjust if needed
-from app.callendar.notify import notify_event_reminder
+from app.callendar.notify import notify_event_reminder, reminder_title
 from app.notifications.models import Notification
 
 # Try to import your EventReminder model (optional)
@@ -161,20 +161,21 @@ def _get_events_in_window(window_start: datetime, window_end: datetime) -> List[
 
 # -------- De-dupe (DB portable) ---------------------------------------------
 
-def _recent_reminder_sent(user_id: int, title: str, window_seconds: int = 600) -> bool:
-    """
-    De-dupe by (user_id, title) within window_seconds.
-    Works on SQLite/Postgres without JSON operators.
-    """
+def _recently_reminded(user_ids: Iterable[int], title: str, window_seconds: int = 600) -> set:
+    """The user_ids that already got `title` within window_seconds (one query)."""
+    ids = {int(u) for u in user_ids}
+    if not ids:
+        return set()
     since = _utcnow_naive() - timedelta(seconds=window_seconds)
-    return (
-        db.session.query(Notification)
-        .filter(Notification.user_id == int(user_id))
+    rows = (
+        db.session.query(Notification.user_id)
+        .filter(Notification.user_id.in_(ids))
         .filter(Notification.title == title)
         .filter(Notification.created_at >= since)
-        .count()
-        > 0
+        .distinct()
+        .all()
     )
+    return {int(r[0]) for r in rows}
 
 
 # -------- Core runner --------------------------------------------------------
@@ -248,23 +249,21 @@ def enqueue_due_reminders(
             if not (due_exact or due_catchup):
                 continue
 
-            reminder_title = f"Reminder: {ev.title or 'Event'}"
             # recipients: attendees + organiser
-            recips: List[Dict[str, Any]] = []
+            recips: List[int] = []
             for a in getattr(ev, "attendees", []) or []:
                 uid = getattr(a, "user_id", None) or (a.get("user_id") if isinstance(a, dict) else None)
-                if uid:
-                    recips.append({"id": int(uid)})
-            if getattr(ev, "organiser_id", None):
-                recips.append({"id": int(ev.organiser_id)})
-
-            delivered = 0
-            for r in recips:
-                uid = int(r["id"])
-                if _recent_reminder_sent(uid, reminder_title, window_seconds=600):
-                    continue
-                notify_event_reminder(ev, recipients=[{"id": uid}], reminder_minutes=m)
-                delivered += 1
+                if uid and int(uid) not in recips:
+                    recips.append(int(uid))
+            if getattr(ev, "organiser_id", None) and int(ev.organiser_id) not in recips:
+                recips.append(int(ev.organiser_id))
+
+            # one de-dupe query and one bulk insert for everybody still due
+            already = _recently_reminded(recips, reminder_title(ev), window_seconds=600)
+            due = [uid for uid in recips if uid not in already]
+            if due:
+                notify_event_reminder(ev, recipients=due, reminder_minutes=m)
+            delivered = len(due)
 
             fired_total += delivered
 
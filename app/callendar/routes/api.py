@@ -560,8 +560,8 @@ def api_respond_invitation():
             inv_count = 0
 
         try:
-            from app.notifications.models import Notification
-            notif_unread = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
+            from app.notifications import counters
+            notif_unread = counters.get("notifications", current_user.id)
         except Exception:
             notif_unread = 0
 
@@ -625,8 +625,10 @@ def api_users_options():
 @bp.route("/api/invitations/count", methods=["GET"])
 @login_required
 def api_invitations_count():
-    items = list_invitations_for_user(current_user.id)
-    return jsonify({"count": len(items or [])})
+    from app.notifications import counters
+    from app.notifications.routes import counter_response
+    count = counters.get("invitations", current_user.id)
+    return counter_response({"count": count}, f"invitations-{current_user.id}-{count}")
 
 
 # -------------------------
@@ -24,6 +24,14 @@ def list_invitations_for_user(user_id: int) -> List[EventAttendee]:
     )
 
 
+def register_invitation_counter() -> None:
+    """Pending invitations per user as a badge counter (app.notifications.counters)."""
+    from app.notifications.counters import register_counter
+    register_counter("invitations", EventAttendee, "status",
+                     member=lambda v: v in (None, InviteStatus.INVITED),  # None: column default, INVITED
+                     condition=lambda: EventAttendee.status == InviteStatus.INVITED)
+
+
 def get_invitation_map_for_events(event_ids: Iterable[int], user_id: int) -> Dict[int, InviteStatus]:
     """Return a map {event_id: status} for quick lookup in views."""
     rows = (
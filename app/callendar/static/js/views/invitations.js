@@ -165,4 +165,13 @@
       }
     }catch{}
   })();
+
+  // Pushed counter changes (notif_events "unread_changed") instead of polling
+  if (window.Realtime){
+    window.Realtime.on('unread_changed', (d)=>{
+      if (!d || typeof d.count !== 'number') return;
+      if (d.counter === 'invitations') updateBadge(d.count);
+      else if (d.counter === 'notifications') setBadge(notifBadge, d.count);
+    });
+  }
 })();
@@ -13,6 +13,7 @@ from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy import and_, func
 
+from .. import blobs
 from ..extensions import db
 from ..models import DriveFolder, DriveFile, DriveACL, DrivePermission, User
 from . import bp  # blueprint defined in app/drive/__init__.py with url_prefix="/drive"
@@ -455,7 +456,7 @@ def api_file_upload():
 
     up_root = _uploads_root()
     file_path = os.path.join(up_root, stored_name)
-    file.save(file_path)
+    blobs.save(file, file_path)
     size = os.path.getsize(file_path)
 
     rec = DriveFile(
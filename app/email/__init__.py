@@ -24,6 +24,14 @@ DEFAULTS = {
     "EMAIL_MAX_ATTACHMENT_MB": 25,          # Outgoing size guardrail
     "EMAIL_DEFAULT_SYNC_WINDOW_DAYS": 30,   # Initial IMAP sync horizon
     "EMAIL_IDLE_ENABLED": True,             # Enable IMAP IDLE when supported
+    "EMAIL_HEADER_CACHE_ENABLED": True,     # List folders from the local header store (services/header_cache.py)
+    "EMAIL_HEADER_CACHE_SYNC_BUDGET": 1000, # New messages cached per listing request; the rest in the background
+    # IMAP session pool (services/imap_pool.py)
+    "EMAIL_IMAP_POOL_ENABLED": True,
+    "EMAIL_IMAP_POOL_MAX_PER_ACCOUNT": 3,   # Concurrent logins per account, per process
+    "EMAIL_IMAP_POOL_IDLE_SECONDS": 240,    # Log out sessions unused this long
+    "EMAIL_IMAP_POOL_NOOP_SECONDS": 30,     # NOOP-check sessions idle longer than this before reuse
+    "EMAIL_IMAP_POOL_WAIT_SECONDS": 15,     # Wait for a free session before giving up
     # Diagnostics
     "EMAIL_DNS_TIMEOUT_SEC": 5,
     "EMAIL_TCP_TIMEOUT_SEC": 8,
@@ -66,6 +74,8 @@ def init_app(app):
     with app.app_context():
         _ensure_defaults()
         _register_routes()
+        from .services.imap_pool import init_imap_pool
+        init_imap_pool(app)
         app.register_blueprint(bp)
 
         # Optional: attach admin integration if present
@@ -3,8 +3,11 @@
 SQLAlchemy models for the Email feature.
 """
 from .connection import EmailConnection, EmailConnectionLog
+from .header_cache import EmailFolderState, EmailHeader
 
 __all__ = [
     "EmailConnection",
     "EmailConnectionLog",
+    "EmailFolderState",
+    "EmailHeader",
 ]
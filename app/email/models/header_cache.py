@@ -0,0 +1,60 @@
+# app/email/models/header_cache.py
+from datetime import datetime
+from app.extensions import db
+
+
+class EmailFolderState(db.Model):
+    """
+    Sync position of one IMAP folder in the local header cache
+    (see app/email/services/header_cache.py).
+    """
+    __tablename__ = "email_folder_states"
+
+    id = db.Column(db.Integer, primary_key=True)
+    connection_id = db.Column(
+        db.Integer, db.ForeignKey("email_connections.id", ondelete="CASCADE"), nullable=False
+    )
+    folder = db.Column(db.String(512), nullable=False)
+
+    uidvalidity = db.Column(db.BigInteger)
+    uidnext = db.Column(db.BigInteger)          # every UID below this is in email_headers
+    highestmodseq = db.Column(db.BigInteger)    # CONDSTORE/QRESYNC servers; NULL until a full pass completed
+    exists_count = db.Column(db.Integer)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("connection_id", "folder", name="uq_email_folder_states_conn_folder"),
+    )
+
+    def __repr__(self):
+        return f"<EmailFolderState {self.connection_id}:{self.folder} uidnext={self.uidnext}>"
+
+
+class EmailHeader(db.Model):
+    """Cached envelope of one message: what the mailbox listing shows, filters and sorts on."""
+    __tablename__ = "email_headers"
+
+    folder_id = db.Column(
+        db.Integer, db.ForeignKey("email_folder_states.id", ondelete="CASCADE"), primary_key=True
+    )
+    uid = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+
+    internaldate = db.Column(db.DateTime)       # naive UTC
+    seen = db.Column(db.Boolean, default=False, nullable=False)
+    flags = db.Column(db.String(255))
+    subject = db.Column(db.Text)
+    from_addr = db.Column(db.Text)
+    date_hdr = db.Column(db.String(255))
+    message_id = db.Column(db.String(512))
+    size = db.Column(db.Integer)
+    has_attachment = db.Column(db.Boolean, default=False, nullable=False)
+    # casefold()ed "subject\nfrom" for the q filter (SQLite lower()/LIKE only fold ASCII)
+    search_text = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index("ix_email_headers_folder_date_uid", "folder_id", "internaldate", "uid"),
+        db.Index("ix_email_headers_folder_attach_date_uid", "folder_id", "has_attachment", "internaldate", "uid"),
+    )
+
+    def __repr__(self):
+        return f"<EmailHeader {self.folder_id}/{self.uid}>"
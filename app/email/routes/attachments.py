@@ -4,6 +4,7 @@ from __future__ import annotations
 import io
 import mimetypes
 import email
+from contextlib import ExitStack
 from email.header import decode_header, make_header
 
 from flask import abort, send_file, request
@@ -11,8 +12,8 @@ from flask_login import login_required, current_user
 
 from app.email import bp
 from app.email.models.connection import EmailConnection
-from app.email.services.account import build_runtime_cfg
-from app.email.services.connection import open_imap
+from app.email.services.imap_pool import imap_session
+from app.email.services import message_parts
 
 
 def _decode(s: str | None) -> str:
@@ -126,6 +127,56 @@ def _get_account_or_404(acc_id: int) -> EmailConnection:
     return conn
 
 
+def _send_attachment(conn: EmailConnection, folder: str, uid: str, part_id: str, url_name: str | None):
+    """
+    Locate the part through BODYSTRUCTURE and stream it: BODY.PEEK[part]<offset.len>
+    chunks, transfer-decoded on the fly, so the message is never held in memory.
+    The IMAP session stays checked out until the response has been sent.
+    Servers without a usable BODYSTRUCTURE get the old full-RFC822 parse.
+    """
+    with ExitStack() as stack:
+        imap = stack.enter_context(imap_session(conn))
+        if not _select_mailbox(imap, folder, readonly=True):
+            abort(404, description="Message not found")
+
+        structure = message_parts.message_structure(imap, uid)
+        if structure:
+            part = message_parts.find_part(structure["parts"], part_id)
+            if not part:
+                abort(404, description="Attachment part not found")
+            info = message_parts.attachment_info(part)
+            download_name, mimetype = _guess_download_meta(part["filename"] or url_name, info["content_type"])
+            body = message_parts.PartReader(
+                message_parts.iter_part(imap, uid, part),
+                release=stack.pop_all().__exit__,
+            )
+        else:
+            raw = _fetch_rfc822(imap, folder, uid)
+            if not raw:
+                abort(404, description="Message not found")
+
+            msg = email.message_from_bytes(raw)
+            part = _find_part_by_id(msg, part_id)
+            if not part:
+                abort(404, description="Attachment part not found")
+
+            ctype = part.get_content_type() or "application/octet-stream"
+            mime_name = _decode(part.get_filename()) if part.get_filename() else None
+            download_name, mimetype = _guess_download_meta(mime_name or url_name, ctype)
+            body = io.BytesIO(part.get_payload(decode=True) or b"")
+
+    return send_file(
+        body,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        max_age=0,
+        etag=False,
+        conditional=False,
+        last_modified=None,
+    )
+
+
 # Route with filename in the URL (used by your template)
 @bp.route("/mail/attachment/<path:folder>/<uid>/<part_id>/<path:filename>")
 @login_required
@@ -140,40 +191,7 @@ def download_attachment(folder: str, uid: str, part_id: str, filename: str):
         abort(400, description="Missing acc")
 
     conn = _get_account_or_404(acc)
-    cfg = build_runtime_cfg(conn)
-    imap = open_imap(cfg)
-
-    try:
-        raw = _fetch_rfc822(imap, folder, uid)
-        if not raw:
-            abort(404, description="Message not found")
-
-        msg = email.message_from_bytes(raw)
-        part = _find_part_by_id(msg, part_id)
-        if not part:
-            abort(404, description="Attachment part not found")
-
-        payload = part.get_payload(decode=True) or b""
-        ctype = part.get_content_type() or "application/octet-stream"
-        mime_name = _decode(part.get_filename()) if part.get_filename() else None
-        download_name, mimetype = _guess_download_meta(mime_name or filename, ctype)
-
-        bio = io.BytesIO(payload)
-        return send_file(
-            bio,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=download_name,
-            max_age=0,
-            etag=False,
-            conditional=False,
-            last_modified=None,
-        )
-    finally:
-        try:
-            imap.logout()
-        except Exception:
-            pass
+    return _send_attachment(conn, folder, uid, part_id, filename)
 
 
 # Optional: also support without filename segment
@@ -185,37 +203,4 @@ def download_attachment_nofilename(folder: str, uid: str, part_id: str):
         abort(400, description="Missing acc")
 
     conn = _get_account_or_404(acc)
-    cfg = build_runtime_cfg(conn)
-    imap = open_imap(cfg)
-
-    try:
-        raw = _fetch_rfc822(imap, folder, uid)
-        if not raw:
-            abort(404, description="Message not found")
-
-        msg = email.message_from_bytes(raw)
-        part = _find_part_by_id(msg, part_id)
-        if not part:
-            abort(404, description="Attachment part not found")
-
-        payload = part.get_payload(decode=True) or b""
-        ctype = part.get_content_type() or "application/octet-stream"
-        mime_name = _decode(part.get_filename()) if part.get_filename() else None
-        download_name, mimetype = _guess_download_meta(mime_name, ctype)
-
-        bio = io.BytesIO(payload)
-        return send_file(
-            bio,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=download_name,
-            max_age=0,
-            etag=False,
-            conditional=False,
-            last_modified=None,
-        )
-    finally:
-        try:
-            imap.logout()
-        except Exception:
-            pass
+    return _send_attachment(conn, folder, uid, part_id, None)
@@ -9,7 +9,8 @@ from flask_login import login_required, current_user
 from app.email import bp
 from app.email.models.connection import EmailConnection
 from app.email.services.account import build_runtime_cfg
-from app.email.services.connection import open_smtp, open_imap
+from app.email.services.connection import open_smtp
+from app.email.services.imap_pool import imap_session
 from app.email.services.folders.specials import resolve_specials
 from app.email.services.mail_ops import append_sent_copy, append_draft
 from app.email.routes._helpers import _is_spa_request
@@ -178,19 +179,12 @@ def compose():
 
     # Save a copy to Sent via IMAP APPEND (non-fatal if it fails)
     try:
-        cfg = build_runtime_cfg(account)
-        imap = open_imap(cfg)
-        try:
+        with imap_session(account) as imap:
             specials = resolve_specials(imap, account.provider or "")
             sent_box = specials.get("sent") or "Sent"
             ok, err = append_sent_copy(imap, sent_box, msg)
             # ignore errors, optionally log
             _ = (ok, err)
-        finally:
-            try:
-                imap.logout()
-            except Exception:
-                pass
     except Exception:
         pass
 
@@ -217,19 +211,12 @@ def compose_autosave():
     draft_uid = request.form.get("draft_uid") or None
 
     try:
-        cfg = build_runtime_cfg(account)
-        imap = open_imap(cfg)
-        try:
+        with imap_session(account) as imap:
             specials = resolve_specials(imap, account.provider or "")
             drafts_box = specials.get("drafts") or "Drafts"
             ok, new_uid, err = append_draft(imap, drafts_box, msg, draft_uid=draft_uid)
             if not ok:
                 return jsonify(ok=False, error=err or "Autosave failed"), 400
             return jsonify(ok=True, draft_uid=new_uid or draft_uid)
-        finally:
-            try:
-                imap.logout()
-            except Exception:
-                pass
     except Exception as e:
         return jsonify(ok=False, error=str(e)), 400
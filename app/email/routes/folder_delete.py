@@ -6,8 +6,7 @@ import imaplib
 
 from app.email import bp
 from app.email.models.connection import EmailConnection
-from app.email.services.account import build_runtime_cfg
-from app.email.services.connection import open_imap
+from app.email.services.imap_pool import imap_session
 from app.email.services.mailbox import list_folders_tree
 
 SPECIAL_LAST_SEG = {
@@ -140,9 +139,7 @@ def mail_folder_delete():
     if not account:
         abort(404, description="Account not found")
 
-    cfg = build_runtime_cfg(account)
-    imap = open_imap(cfg)
-    try:
+    with imap_session(account) as imap:
         info = list_folders_tree(imap)
         delim = info.get("delim", "/")
 
@@ -176,8 +173,3 @@ def mail_folder_delete():
             return jsonify(ok=False, error=f'IMAP DELETE failed for "{path}"'), 400
 
         return jsonify(ok=True, deleted=path, moved_to=parent)
-    finally:
-        try:
-            imap.logout()
-        except Exception:
-            pass
@@ -5,8 +5,7 @@ from flask_login import login_required, current_user
 
 from app.email import bp
 from app.email.models.connection import EmailConnection
-from app.email.services.account import build_runtime_cfg
-from app.email.services.connection import open_imap
+from app.email.services.imap_pool import imap_session
 from app.email.services.mail_ops import move_to_mailbox
 from app.email.services.folders.specials import resolve_specials
 from app.email.routes._helpers import _is_spa_request
@@ -41,9 +40,7 @@ def _do_move(to_label: str):
         return redirect(url_for("email.mailbox_folder", folder=folder, acc=acc_id))
 
     try:
-        cfg = build_runtime_cfg(account)
-        imap = open_imap(cfg)
-        try:
+        with imap_session(account) as imap:
             specials = resolve_specials(imap, account.provider or "")
             targets = {
                 "trash": specials.get("trash") or "Trash",
@@ -64,9 +61,6 @@ def _do_move(to_label: str):
             else:
                 flash(f"Moved to {to_label.title()}.", "success")
                 return redirect(url_for("email.mailbox_folder", folder=to_mailbox, acc=account.id))
-        finally:
-            try: imap.logout()
-            except Exception: pass
     except Exception as e:
         if _is_spa_request():
             return jsonify(ok=False, error=str(e)), 400
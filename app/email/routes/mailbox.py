@@ -10,13 +10,14 @@ from flask_login import login_required, current_user
 
 from app.email import bp
 from app.email.models.connection import EmailConnection
-from app.email.services.account import build_runtime_cfg
-from app.email.services.connection import open_imap
-from app.email.services.mailbox import list_folders_tree, list_messages, get_message
+from app.email.services.imap_pool import imap_session
+from app.email.services.mailbox import list_folders_tree, list_messages, get_message, next_cursor
 from app.email.routes._helpers import _is_spa_request
 from app.email.services.folders.specials import resolve_specials
 
 
+PAGE_SIZE = 100
+
 # -----------------------
 # Small local utilities
 # -----------------------
@@ -186,16 +187,9 @@ def mailbox_home():
         return panel_html if _is_spa_request() else render_template("dashboard.html", initial_panel=panel_html)
 
     # Resolve real Inbox path and redirect to it (prevents None folder)
-    cfg = build_runtime_cfg(account)
-    imap = open_imap(cfg)
-    try:
+    with imap_session(account) as imap:
         specials = resolve_specials(imap, account.provider or "")
         inbox_real = specials.get("inbox") or "INBOX"
-    finally:
-        try:
-            imap.logout()
-        except Exception:
-            pass
 
     return redirect(url_for("email.mailbox_folder", folder=inbox_real, acc=account.id))
 
@@ -210,6 +204,7 @@ def mailbox_folder(folder):
     has_att = bool(request.args.get("has_attach"))
     last7   = bool(request.args.get("last7"))
     expand  = request.args.get("expand") or ""
+    cursor  = request.args.get("cursor") or None
 
     account = (
         EmailConnection.query.filter_by(user_id=current_user.id, id=acc_id).first()
@@ -221,20 +216,11 @@ def mailbox_folder(folder):
 
     # Ensure a concrete folder
     if not folder:
-        cfg = build_runtime_cfg(account)
-        imap = open_imap(cfg)
-        try:
+        with imap_session(account) as imap:
             specials = resolve_specials(imap, account.provider or "")
             folder = specials.get("inbox") or "INBOX"
-        finally:
-            try:
-                imap.logout()
-            except Exception:
-                pass
-
-    cfg = build_runtime_cfg(account)
-    imap = open_imap(cfg)
-    try:
+
+    with imap_session(account) as imap:
         tree_info = list_folders_tree(imap)
         folders_tree = tree_info["tree"]
         folder_delim = tree_info["delim"]
@@ -247,14 +233,11 @@ def mailbox_folder(folder):
             unread=unread,
             has_attach=has_att,
             last7=last7,
-            limit=100,
+            limit=PAGE_SIZE,
             offset=0,
+            account=account,
+            cursor=cursor,
         )
-    finally:
-        try:
-            imap.logout()
-        except Exception:
-            pass
 
     selected_label = _label_for(folder, folders_tree, folder_delim)
 
@@ -268,6 +251,8 @@ def mailbox_folder(folder):
         selected_label=selected_label,
         messages=messages,
         expand_path=expand,
+        cursor=cursor,
+        next_cursor=next_cursor(messages, PAGE_SIZE),
     )
     return panel_html if _is_spa_request() else render_template("dashboard.html", initial_panel=panel_html)
 
@@ -300,9 +285,7 @@ def mailbox_message(folder, uid):
 
     # 2) Load folders + resolve real folder path (so 'Sent' / 'Spam' labels work)
     folders_tree, folder_delim, msg, selected_folder = [], "/", None, folder
-    cfg = build_runtime_cfg(account)
-    imap = open_imap(cfg)
-    try:
+    with imap_session(account) as imap:
         tree_info = list_folders_tree(imap)
         folders_tree = tree_info.get("tree", [])
         folder_delim = tree_info.get("delim", "/")
@@ -330,11 +313,6 @@ def mailbox_message(folder, uid):
         # path is different and mapping didn’t match for some reason, try the original.
         if msg is None and mapped_real and mapped_real != folder:
             msg = get_message(imap, folder, str(uid), message_id=mid)
-    finally:
-        try:
-            imap.logout()
-        except Exception:
-            pass
 
     panel_html = render_template(
         "email/message.html",
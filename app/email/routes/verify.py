@@ -10,6 +10,7 @@ from app.email.services.verification import test_connection
 from app.email.utils.encryption import encrypt_secret
 from app.email.utils.logging import log_event
 from app.email.models.connection import EmailConnection
+from app.email.services.imap_pool import pool as imap_pool
 from app.extensions import db
 
 
@@ -109,6 +110,7 @@ def verify_connection():
             conn.last_verified_at = datetime.utcnow()
 
             db.session.commit()
+            imap_pool.discard_account(conn.id)  # sessions logged in with the old settings
 
             # 3) Log success
             try:
@@ -0,0 +1,468 @@
+# app/email/services/header_cache.py
+"""
+Local header store per IMAP folder (email_folder_states / email_headers), so
+the mailbox listing is a database query instead of SEARCH ALL + INTERNALDATE
+for the whole folder + one header FETCH per message.
+
+Every listing first brings the folder up to date, using what the server offers:
+  - SELECT gives UIDVALIDITY, UIDNEXT, EXISTS (and HIGHESTMODSEQ on CONDSTORE
+    servers). A UIDVALIDITY change throws the folder's rows away.
+  - New messages: UID FETCH of the UIDs at or above the stored UIDNEXT, in
+    chunks of CHUNK, committed chunk by chunk. A listing request fetches at
+    most EMAIL_HEADER_CACHE_SYNC_BUDGET of them; a larger backlog (the first
+    sync of a big folder) is filled by a background thread, and until the
+    folder is complete the listing is served live.
+  - Flag changes: with QRESYNC the SELECT itself returns them (and VANISHED
+    UIDs); with CONDSTORE one UID FETCH (FLAGS) (CHANGEDSINCE m); otherwise
+    UID SEARCH UNSEEN refreshes the read state.
+  - Expunged messages: when the local row count differs from EXISTS, one
+    UID SEARCH ALL finds the rows to drop.
+
+Falls back to the live listing (returns None) when the folder cannot be
+selected, the sync fails, another sync holds the folder, or the folder is not
+completely cached yet (the progress made so far is kept).
+EMAIL_HEADER_CACHE_ENABLED = False turns it off.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.email.models.connection import EmailConnection
+from app.email.models.header_cache import EmailFolderState, EmailHeader
+from .imap_fetch import HEADER_ITEM, parse_fetch, parse_uid_set, uid_set
+from .imap_pool import forget_selection, imap_session, server_capabilities
+
+log = logging.getLogger(__name__)
+
+CHUNK = 500
+DEFAULT_BUDGET = 1000
+BACKGROUND_BATCH = 10 * CHUNK   # new messages per background round (the folder lock is released between rounds)
+LOCK_WAIT = 5.0                 # seconds a listing waits for a sync running elsewhere
+SYNC_ITEMS = f"(UID INTERNALDATE FLAGS RFC822.SIZE BODYSTRUCTURE {HEADER_ITEM})"
+
+_locks: Dict[Tuple[int, str], threading.Lock] = {}
+_locks_guard = threading.Lock()
+_filling: set = set()  # (connection_id, folder) with a background fill running
+
+
+def enabled() -> bool:
+    try:
+        return bool(current_app.config.get("EMAIL_HEADER_CACHE_ENABLED", True))
+    except RuntimeError:  # no app context
+        return False
+
+
+def _folder_lock(connection_id: int, folder: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault((int(connection_id), folder), threading.Lock())
+
+
+def _quote(folder: str) -> str:
+    safe = (folder or "").replace("\\", "\\\\").replace('"', r'\"')
+    return f'"{safe}"'
+
+
+def _code(imap, name: str) -> Optional[int]:
+    """Last numeric value of an untagged response / response code left by SELECT."""
+    try:
+        _, data = imap.response(name)
+    except Exception:
+        return None
+    for v in reversed(data or []):
+        if isinstance(v, (bytes, bytearray)):
+            v = v.decode("ascii", "ignore")
+        head = str(v or "").strip().split(" ", 1)[0]
+        if head.isdigit():
+            return int(head)
+    return None
+
+
+def _uid_search(imap, *criteria) -> Optional[List[int]]:
+    typ, data = imap.uid("search", None, *criteria)
+    if typ != "OK":
+        return None
+    return [int(u) for u in (data[0] or b"").split() if u.isdigit()] if data else []
+
+
+def _clip(value: Optional[str], n: int) -> Optional[str]:
+    return value[:n] if value else value
+
+
+# -----------------------------------------------------------------------------
+# SELECT
+# -----------------------------------------------------------------------------
+def _select(imap, folder: str, state: Optional[EmailFolderState], caps) -> Optional[dict]:
+    forget_selection(imap)
+    qresync = bool("QRESYNC" in caps and state is not None and state.uidvalidity and state.highestmodseq)
+    if qresync:
+        done = getattr(imap, "enabled", None)
+        if done is None or "QRESYNC" not in done:
+            try:
+                typ, _ = imap._simple_command("ENABLE", "QRESYNC")
+                qresync = typ == "OK"
+            except Exception:
+                qresync = False
+            if qresync and done is not None:
+                done.add("QRESYNC")
+
+    if qresync:
+        params = f" (QRESYNC ({state.uidvalidity} {state.highestmodseq}))"
+    elif "CONDSTORE" in caps or "QRESYNC" in caps:
+        params = " (CONDSTORE)"
+    else:
+        params = ""
+    typ, _ = imap.select(_quote(folder) + params, readonly=True)
+    if typ != "OK" and params:
+        qresync = False
+        typ, _ = imap.select(_quote(folder), readonly=True)
+    if typ != "OK":
+        return None
+
+    info = {
+        "uidvalidity": _code(imap, "UIDVALIDITY"),
+        "uidnext": _code(imap, "UIDNEXT"),
+        "highestmodseq": _code(imap, "HIGHESTMODSEQ"),
+        "exists": _code(imap, "EXISTS"),
+        "qresync": qresync,
+        "vanished": [],
+        "changed": [],
+    }
+    if qresync:
+        _, vanished = imap.response("VANISHED")
+        for v in vanished or ():
+            if isinstance(v, (bytes, bytearray)):
+                info["vanished"].extend(parse_uid_set(v.replace(b"(EARLIER)", b"")))
+        _, fetched = imap.response("FETCH")
+        info["changed"] = parse_fetch([f for f in fetched or () if f])
+    return info
+
+
+# -----------------------------------------------------------------------------
+# Applying changes
+# -----------------------------------------------------------------------------
+def _search_text(subject: Optional[str], from_addr: Optional[str]) -> str:
+    return f"{subject or ''}\n{from_addr or ''}".casefold()
+
+
+def _row(folder_id: int, item: dict) -> dict:
+    flags = item.get("flags") or []
+    return {
+        "folder_id": folder_id,
+        "uid": item["uid"],
+        "internaldate": item.get("internaldate"),
+        "seen": "\\Seen" in flags,
+        "flags": _clip(" ".join(flags), 255),
+        "subject": item.get("subject") or "",
+        "from_addr": item.get("from") or "",
+        "date_hdr": _clip(item.get("date") or "", 255),
+        "message_id": _clip(item.get("message_id") or "", 512),
+        "size": item.get("size"),
+        "has_attachment": bool(item.get("has_attachment")),
+        "search_text": _search_text(item.get("subject"), item.get("from")),
+    }
+
+
+_FLAGS_UPDATE = (
+    update(EmailHeader.__table__)
+    .where(EmailHeader.__table__.c.folder_id == bindparam("b_folder_id"),
+           EmailHeader.__table__.c.uid == bindparam("b_uid"))
+    .values(seen=bindparam("b_seen"), flags=bindparam("b_flags"))
+)
+
+
+def _apply_flags(state: EmailFolderState, items: Iterable[dict]) -> None:
+    # Core executemany, not the ORM bulk UPDATE by primary key: a UID we never
+    # cached (skipped in an earlier chunk) must match zero rows, not raise StaleDataError
+    params = [
+        {"b_folder_id": state.id, "b_uid": it["uid"], "b_seen": "\\Seen" in it["flags"],
+         "b_flags": _clip(" ".join(it["flags"]), 255)}
+        for it in items if it.get("flags") is not None and it["uid"] < (state.uidnext or 0)
+    ]
+    if params:
+        db.session.execute(_FLAGS_UPDATE, params)
+
+
+def _refresh_seen(imap, state: EmailFolderState) -> None:
+    unseen = _uid_search(imap, "UNSEEN")
+    if unseen is None:
+        return
+    unseen = set(unseen)
+    rows = db.session.execute(
+        select(EmailHeader.uid, EmailHeader.seen).where(EmailHeader.folder_id == state.id)
+    ).all()
+    params = [{"folder_id": state.id, "uid": uid, "seen": uid not in unseen}
+              for uid, seen in rows if seen != (uid not in unseen)]
+    if params:
+        db.session.execute(update(EmailHeader), params)
+
+
+def _drop(state: EmailFolderState, uids: List[int]) -> None:
+    for i in range(0, len(uids), CHUNK):
+        db.session.execute(delete(EmailHeader).where(
+            EmailHeader.folder_id == state.id, EmailHeader.uid.in_(uids[i:i + CHUNK])))
+
+
+def _fetch_new(imap, state: EmailFolderState, info: dict, budget: Optional[int] = None) -> bool:
+    """
+    Fetch messages with UID >= state.uidnext, at most `budget` of them (oldest
+    first); True when the folder is complete.
+    """
+    start = state.uidnext or 1
+    if info["uidnext"] is not None and info["uidnext"] <= start:
+        return True
+    uids = _uid_search(imap, "UID", f"{start}:*")
+    if uids is None:
+        return False
+    uids = sorted(u for u in uids if u >= start)
+    todo = uids[:budget] if budget else uids
+    for i in range(0, len(todo), CHUNK):
+        chunk = todo[i:i + CHUNK]
+        typ, data = imap.uid("fetch", uid_set(chunk), SYNC_ITEMS)
+        if typ != "OK":
+            return False
+        rows = [_row(state.id, it) for it in parse_fetch(data) if it["uid"] >= start]
+        if rows:
+            db.session.execute(insert(EmailHeader), rows)
+        state.uidnext = chunk[-1] + 1
+        db.session.commit()
+    if len(todo) < len(uids):
+        return False
+    if info["uidnext"] is not None:
+        state.uidnext = max(state.uidnext or 1, info["uidnext"])
+    return True
+
+
+def _local_count(state: EmailFolderState) -> int:
+    return int(db.session.execute(
+        select(func.count()).select_from(EmailHeader).where(EmailHeader.folder_id == state.id)
+    ).scalar() or 0)
+
+
+def _sync_once(imap, account, folder: str, budget: Optional[int],
+               refresh_flags: bool = True) -> Tuple[Optional[EmailFolderState], bool]:
+    """One sync step under the folder lock: (state, complete); (None, False) when it failed."""
+    state = EmailFolderState.query.filter_by(connection_id=account.id, folder=folder).first()
+    info = _select(imap, folder, state, server_capabilities(imap))
+    if info is None or info["uidvalidity"] is None:
+        return None, False
+    try:
+        if state is None:
+            state = EmailFolderState(connection_id=account.id, folder=folder)
+            db.session.add(state)
+            db.session.flush()
+        if state.uidvalidity != info["uidvalidity"]:
+            db.session.execute(delete(EmailHeader).where(EmailHeader.folder_id == state.id))
+            state.uidvalidity, state.uidnext, state.highestmodseq = info["uidvalidity"], 1, None
+
+        if state.uidnext and state.uidnext > 1:
+            if info["qresync"]:
+                _drop(state, info["vanished"])
+                _apply_flags(state, info["changed"])
+            elif state.highestmodseq and info["highestmodseq"]:
+                if info["highestmodseq"] != state.highestmodseq:
+                    typ, data = imap.uid("fetch", f"1:{state.uidnext - 1}", "(UID FLAGS)",
+                                         f"(CHANGEDSINCE {state.highestmodseq})")
+                    if typ == "OK":
+                        _apply_flags(state, parse_fetch(data))
+            elif refresh_flags:
+                _refresh_seen(imap, state)
+
+        complete = _fetch_new(imap, state, info, budget)
+
+        if complete and info["exists"] is not None and _local_count(state) != info["exists"]:
+            present = _uid_search(imap, "ALL")
+            if present is not None:
+                present = set(present)
+                cached = db.session.execute(
+                    select(EmailHeader.uid).where(EmailHeader.folder_id == state.id)
+                ).scalars().all()
+                _drop(state, [u for u in cached if u not in present])
+
+        state.highestmodseq = info["highestmodseq"] if complete else None
+        state.exists_count = info["exists"]
+        state.synced_at = datetime.utcnow()
+        db.session.commit()
+        return state, complete
+    except IntegrityError:
+        # another worker synced the same folder at the same time; use the live listing this once
+        db.session.rollback()
+        return None, False
+    except Exception:
+        db.session.rollback()
+        log.exception("header cache: sync of %r for connection %s failed", folder, account.id)
+        return None, False
+
+
+def _request_budget() -> int:
+    return max(CHUNK, int(current_app.config.get("EMAIL_HEADER_CACHE_SYNC_BUDGET", DEFAULT_BUDGET)))
+
+
+def sync_folder(imap, account, folder: str) -> Optional[EmailFolderState]:
+    """
+    Bring the folder's cached headers up to date; None when the cache cannot be
+    used. A request fetches at most EMAIL_HEADER_CACHE_SYNC_BUDGET new messages;
+    when more are waiting, or a FETCH failed, the rows fetched so far are kept,
+    a background fill is started and None is returned (the listing goes live).
+    """
+    lock = _folder_lock(account.id, folder)
+    if not lock.acquire(timeout=LOCK_WAIT):
+        return None
+    try:
+        state, complete = _sync_once(imap, account, folder, _request_budget())
+    finally:
+        lock.release()
+    if state is not None and not complete:
+        _fill_in_background(account, folder)
+        return None
+    return state
+
+
+def _fill_in_background(account, folder: str) -> None:
+    """Cache the rest of a large folder off the request thread, BACKGROUND_BATCH at a time."""
+    key = (int(account.id), folder)
+    with _locks_guard:
+        if key in _filling:
+            return
+        _filling.add(key)
+    app = current_app._get_current_object()
+    conn_id = int(account.id)
+
+    def run():
+        try:
+            with app.app_context():
+                try:
+                    acc = db.session.get(EmailConnection, conn_id)
+                    if acc is None:
+                        return
+                    with imap_session(acc) as imap:
+                        lock = _folder_lock(conn_id, folder)
+                        first = True
+                        while True:
+                            with lock:
+                                before = EmailFolderState.query.filter_by(
+                                    connection_id=conn_id, folder=folder).with_entities(EmailFolderState.uidnext).scalar()
+                                state, complete = _sync_once(imap, acc, folder, BACKGROUND_BATCH,
+                                                             refresh_flags=first)
+                            first = False
+                            # stop when done, on failure, or when a round made no progress
+                            if state is None or complete or state.uidnext == before:
+                                break
+                finally:
+                    db.session.remove()
+        except Exception:
+            log.exception("header cache: background fill of %r for connection %s failed", folder, conn_id)
+        finally:
+            with _locks_guard:
+                _filling.discard(key)
+
+    threading.Thread(target=run, name=f"email-header-fill-{conn_id}", daemon=True).start()
+
+
+# -----------------------------------------------------------------------------
+# Listing
+# -----------------------------------------------------------------------------
+def _to_dict(h: EmailHeader) -> dict:
+    return {
+        "uid": str(h.uid),
+        "subject": h.subject or "(no subject)",
+        "from": h.from_addr or "",
+        "date": h.date_hdr or "",
+        "message_id": h.message_id or "",
+        "preview": None,
+        "unread": not h.seen,
+        "has_attachment": bool(h.has_attachment),
+    }
+
+
+def list_cached(imap, account, folder: str, q: Optional[str] = None, sort: str = "date_desc",
+                unread: bool = False, has_attach: bool = False, last7: bool = False,
+                limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Optional[List[dict]]:
+    """
+    list_messages() served from the local store (None: use the live listing).
+    Filters are part of the query, so pages are full; `cursor` (uid of the
+    previous page's last row) pages by (internaldate, uid) instead of OFFSET.
+    """
+    state = sync_folder(imap, account, folder)
+    if state is None:
+        return None
+
+    query = EmailHeader.query.filter(EmailHeader.folder_id == state.id)
+    if unread:
+        query = query.filter(EmailHeader.seen.is_(False))
+    if has_attach:
+        query = query.filter(EmailHeader.has_attachment.is_(True))
+    if last7:
+        query = query.filter(EmailHeader.internaldate >= datetime.utcnow() - timedelta(days=7))
+    if q:
+        _backfill_search_text(state)
+        # both sides casefold()ed in Python: works for Cyrillic etc. on every backend
+        query = query.filter(EmailHeader.search_text.contains(q.casefold(), autoescape=True))
+
+    asc = sort == "date_asc"
+    by_date = sort in ("date_asc", "date_desc")
+    if cursor:
+        query = _after_cursor(query, state, cursor, asc, by_date)
+        if query is None:
+            return []
+
+    if sort == "date_asc":
+        query = query.order_by(EmailHeader.internaldate.asc(), EmailHeader.uid.asc())
+    elif sort == "date_desc":
+        query = query.order_by(EmailHeader.internaldate.desc(), EmailHeader.uid.desc())
+    else:
+        query = query.order_by(EmailHeader.uid.desc())
+
+    if not cursor and offset:
+        query = query.offset(max(0, int(offset)))
+    rows = query.limit(max(0, int(limit))).all()
+    return [_to_dict(h) for h in rows]
+
+
+_SEARCH_UPDATE = (
+    update(EmailHeader.__table__)
+    .where(EmailHeader.__table__.c.folder_id == bindparam("b_folder_id"),
+           EmailHeader.__table__.c.uid == bindparam("b_uid"))
+    .values(search_text=bindparam("b_search_text"))
+)
+
+
+def _backfill_search_text(state: EmailFolderState) -> None:
+    """Rows cached before search_text existed get it on the folder's first search."""
+    while True:
+        rows = db.session.execute(
+            select(EmailHeader.uid, EmailHeader.subject, EmailHeader.from_addr)
+            .where(EmailHeader.folder_id == state.id, EmailHeader.search_text.is_(None))
+            .limit(CHUNK)
+        ).all()
+        if not rows:
+            return
+        db.session.execute(_SEARCH_UPDATE, [
+            {"b_folder_id": state.id, "b_uid": uid, "b_search_text": _search_text(subject, from_addr)}
+            for uid, subject, from_addr in rows
+        ])
+        db.session.commit()
+
+
+def _after_cursor(query, state: EmailFolderState, cursor: str, asc: bool, by_date: bool):
+    try:
+        uid = int(cursor)
+    except (TypeError, ValueError):
+        return None
+    anchor = db.session.get(EmailHeader, (state.id, uid)) if by_date else None
+    if anchor is None or anchor.internaldate is None:
+        # uid order, or the anchor message is gone: UIDs follow arrival order
+        return query.filter(EmailHeader.uid > uid if asc else EmailHeader.uid < uid)
+    d = anchor.internaldate
+    if asc:
+        return query.filter(db.or_(EmailHeader.internaldate > d,
+                                   db.and_(EmailHeader.internaldate == d, EmailHeader.uid > uid)))
+    return query.filter(db.or_(EmailHeader.internaldate < d,
+                               db.and_(EmailHeader.internaldate == d, EmailHeader.uid < uid)))
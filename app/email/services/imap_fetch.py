@@ -0,0 +1,295 @@
+# app/email/services/imap_fetch.py
+"""
+Parsing of multi-message UID FETCH responses as imaplib returns them: a flat
+list where every literal is a (text-before-it, literal) tuple and the text
+after the last literal is a plain bytes element.
+
+parse_fetch() groups that list per message and pulls out the items the
+header cache and the mailbox listing ask for (UID, INTERNALDATE, FLAGS,
+RFC822.SIZE, MODSEQ, BODYSTRUCTURE, BODY[section] literals).
+parse_bodystructure() / body_parts() turn BODYSTRUCTURE into a flat part
+list numbered the way BODY[n] expects.
+"""
+from __future__ import annotations
+
+import email
+import re
+from datetime import datetime, timezone
+from email.header import decode_header, make_header
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
+
+HEADER_FIELDS = "SUBJECT FROM DATE MESSAGE-ID"
+HEADER_ITEM = f"BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})]"
+
+_MSG_START = re.compile(rb"^\d+ \(")
+_SECTION_LIT = re.compile(rb"BODY\[([^\]]*)\](?:<\d+>)? \{\d+\}$")
+_LITERAL_MARK = re.compile(rb"\{\d+\}$")
+_UID = re.compile(rb"\bUID (\d+)")
+_INTERNALDATE = re.compile(rb'\bINTERNALDATE "([^"]+)"')
+_FLAGS = re.compile(rb"\bFLAGS \(([^)]*)\)")
+_SIZE = re.compile(rb"\bRFC822\.SIZE (\d+)")
+_MODSEQ = re.compile(rb"\bMODSEQ \((\d+)\)")
+
+
+def decode_header_value(s: Optional[str]) -> str:
+    if not s:
+        return ""
+    try:
+        return str(make_header(decode_header(s)))
+    except Exception:
+        return s
+
+
+def bodystructure_has_attachment(text: str) -> bool:
+    """Same heuristic the listing has always used: an attachment disposition or a filename."""
+    bs = (text or "").lower()
+    return '"attachment"' in bs or "filename" in bs
+
+
+def internaldate_utc(value: Optional[str]) -> Optional[datetime]:
+    """INTERNALDATE ("17-Jul-1996 02:44:25 -0700") as naive UTC."""
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except Exception:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _quoted(data: bytes) -> bytes:
+    return b'"' + data.replace(b"\\", b"\\\\").replace(b'"', b'\\"') + b'"'
+
+
+def _group(data: Iterable) -> List[Dict]:
+    msgs: List[Dict] = []
+    cur = None
+    for part in data or ():
+        head = part[0] if isinstance(part, tuple) else part
+        if not isinstance(head, (bytes, bytearray)):
+            continue
+        head = bytes(head)
+        if _MSG_START.match(head):
+            cur = {"text": b"", "sections": {}}
+            msgs.append(cur)
+        if cur is None:
+            continue
+        if isinstance(part, tuple) and isinstance(part[1], (bytes, bytearray)):
+            section = _SECTION_LIT.search(head)
+            if section:
+                cur["text"] += head
+                cur["sections"][section.group(1).decode("ascii", "ignore").upper()] = bytes(part[1])
+            else:
+                # a literal inside BODYSTRUCTURE (e.g. a filename): inline it as a quoted string
+                cur["text"] += _LITERAL_MARK.sub(b"", head) + _quoted(bytes(part[1]))
+        else:
+            cur["text"] += head
+    return msgs
+
+
+def parse_fetch(data: Iterable, structure: bool = False) -> List[Dict]:
+    """
+    One dict per message in response order:
+      uid (int), internaldate (naive UTC), flags (list[str]), size, modseq,
+      has_attachment (None when BODYSTRUCTURE was not fetched),
+      sections ({"1.2": bytes, "HEADER.FIELDS (...)": bytes} for BODY[...] items),
+      subject, from, date, message_id, header_raw (when a header section was fetched),
+      bodystructure (parsed tree, only with structure=True).
+    Messages without a UID are skipped.
+    """
+    out: List[Dict] = []
+    for m in _group(data):
+        text = m["text"]
+        uid = _UID.search(text)
+        if not uid:
+            continue
+        item: Dict = {"uid": int(uid.group(1))}
+        d = _INTERNALDATE.search(text)
+        item["internaldate"] = internaldate_utc(d.group(1).decode("ascii", "ignore")) if d else None
+        f = _FLAGS.search(text)
+        item["flags"] = f.group(1).decode("utf-8", "ignore").split() if f else None
+        s = _SIZE.search(text)
+        item["size"] = int(s.group(1)) if s else None
+        ms = _MODSEQ.search(text)
+        item["modseq"] = int(ms.group(1)) if ms else None
+        i = text.find(b"BODYSTRUCTURE")
+        item["has_attachment"] = (
+            bodystructure_has_attachment(text[i:].decode("utf-8", "ignore")) if i >= 0 else None
+        )
+        if structure:
+            item["bodystructure"] = parse_bodystructure(text[i + len(b"BODYSTRUCTURE"):]) if i >= 0 else None
+        item["sections"] = m["sections"]
+        header = next((v for k, v in m["sections"].items() if k.startswith("HEADER")), None)
+        if header is not None:
+            item["header_raw"] = header
+            hdr = email.message_from_bytes(header)
+            item["subject"] = decode_header_value(hdr.get("Subject"))
+            item["from"] = decode_header_value(hdr.get("From"))
+            item["date"] = hdr.get("Date") or ""
+            item["message_id"] = (hdr.get("Message-ID") or "").strip()
+        out.append(item)
+    return out
+
+
+def uid_set(uids: Iterable[int]) -> str:
+    """Compact IMAP sequence set: [1, 2, 3, 7, 9, 10] -> "1:3,7,9:10"."""
+    ordered = sorted(set(int(u) for u in uids))
+    out: List[str] = []
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        out.append(str(ordered[i]) if i == j else f"{ordered[i]}:{ordered[j]}")
+        i = j + 1
+    return ",".join(out)
+
+
+def parse_uid_set(value) -> List[int]:
+    """"1:3,7" -> [1, 2, 3, 7] (VANISHED responses)."""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("ascii", "ignore")
+    out: List[int] = []
+    for chunk in (value or "").replace(" ", "").split(","):
+        if not chunk:
+            continue
+        if ":" in chunk:
+            a, b = chunk.split(":", 1)
+            if a.isdigit() and b.isdigit():
+                lo, hi = sorted((int(a), int(b)))
+                out.extend(range(lo, hi + 1))
+        elif chunk.isdigit():
+            out.append(int(chunk))
+    return out
+
+
+# -----------------------------------------------------------------------------
+# BODYSTRUCTURE
+# -----------------------------------------------------------------------------
+def _sexp(s: bytes, i: int) -> Tuple[Any, int]:
+    """One IMAP value at s[i:]: list, quoted string, NIL (None) or atom (str)."""
+    n = len(s)
+    while i < n and s[i] in b" \r\n":
+        i += 1
+    if i >= n:
+        return None, n
+    c = s[i]
+    if c == 0x28:  # (
+        out: List[Any] = []
+        i += 1
+        while True:
+            while i < n and s[i] in b" \r\n":
+                i += 1
+            if i >= n:
+                return out, n
+            if s[i] == 0x29:  # )
+                return out, i + 1
+            value, i = _sexp(s, i)
+            out.append(value)
+    if c == 0x22:  # "
+        buf = bytearray()
+        i += 1
+        while i < n:
+            ch = s[i]
+            if ch == 0x5C and i + 1 < n:  # backslash escape
+                buf.append(s[i + 1])
+                i += 2
+                continue
+            i += 1
+            if ch == 0x22:
+                break
+            buf.append(ch)
+        return bytes(buf).decode("utf-8", "replace"), i
+    if c == 0x29:  # stray )
+        return None, i + 1
+    j = i
+    while j < n and s[j] not in b" ()\r\n":
+        j += 1
+    atom = s[i:j].decode("ascii", "replace")
+    return (None if atom.upper() == "NIL" else atom), j
+
+
+def parse_bodystructure(text: bytes) -> Optional[list]:
+    """Parse the parenthesised value that follows the BODYSTRUCTURE keyword."""
+    value, _ = _sexp(text or b"", 0)
+    return value if isinstance(value, list) else None
+
+
+def _params(value) -> Dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    it = iter(value)
+    return {str(k).lower(): (v or "") for k, v in zip(it, it) if k}
+
+
+def _param_filename(params: Dict[str, str], key: str) -> Optional[str]:
+    """Plain, RFC 2047 encoded-word, or RFC 2231 (key*, key*0*, key*1 ...) parameter value."""
+    if params.get(key):
+        return decode_header_value(params[key])
+    pieces = []
+    for k, v in params.items():
+        if k == key + "*":
+            pieces.append((0, True, v))
+        elif k.startswith(key + "*") and k[len(key) + 1:].rstrip("*").isdigit():
+            pieces.append((int(k[len(key) + 1:].rstrip("*")), k.endswith("*"), v))
+    if not pieces:
+        return None
+    pieces.sort()
+    charset = "utf-8"
+    out = []
+    for n, encoded, v in pieces:
+        if encoded and n == 0 and v.count("'") >= 2:
+            cs, _, v = v.split("'", 2)
+            charset = cs or charset
+        out.append(unquote(v, encoding=charset, errors="replace") if encoded else v)
+    return "".join(out)
+
+
+def body_parts(node, prefix: str = "") -> List[Dict]:
+    """
+    Flatten a parsed BODYSTRUCTURE. Part ids follow IMAP section numbering
+    (and the ids the message view has always used): children of the root
+    multipart are 1..n, nested ones 2.1, 2.2, a single-part message is "1".
+    The root multipart itself is not listed; message/rfc822 parts are leaves.
+    """
+    out: List[Dict] = []
+    if not isinstance(node, list) or not node:
+        return out
+    if isinstance(node[0], list):  # multipart: child bodies, then the subtype
+        k = 0
+        while k < len(node) and isinstance(node[k], list):
+            k += 1
+        if prefix:
+            subtype = str(node[k]).lower() if k < len(node) and node[k] else "mixed"
+            out.append({"part_id": prefix, "type": "multipart", "subtype": subtype, "params": {},
+                        "encoding": "7bit", "size": 0, "disposition": "", "filename": None})
+        for i, child in enumerate(node[:k], start=1):
+            out.extend(body_parts(child, f"{prefix}.{i}" if prefix else str(i)))
+        return out
+
+    typ = str(node[0] or "").lower()
+    subtype = str(node[1] or "").lower() if len(node) > 1 else ""
+    params = _params(node[2]) if len(node) > 2 else {}
+    encoding = str(node[5] or "7bit").lower() if len(node) > 5 else "7bit"
+    size = int(node[6]) if len(node) > 6 and str(node[6] or "").isdigit() else 0
+    # extension data (md5, disposition, ...) starts after the type-specific fields
+    ext = 8 if typ == "text" else 10 if (typ, subtype) == ("message", "rfc822") else 7
+    disp = node[ext + 1] if len(node) > ext + 1 else None
+    disposition, dparams = "", {}
+    if isinstance(disp, list) and disp:
+        disposition, dparams = str(disp[0] or "").lower(), _params(disp[1] if len(disp) > 1 else None)
+    out.append({
+        "part_id": prefix or "1",
+        "type": typ,
+        "subtype": subtype,
+        "params": params,
+        "encoding": encoding,
+        "size": size,
+        "disposition": disposition,
+        "filename": _param_filename(dparams, "filename") or _param_filename(params, "name"),
+    })
+    return out
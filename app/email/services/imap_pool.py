@@ -0,0 +1,339 @@
+# app/email/services/imap_pool.py
+"""
+Reusable IMAP sessions per EmailConnection, so opening a message and then
+downloading its attachment (or any other pair of requests) does not pay a
+TCP + TLS + LOGIN handshake each time.
+
+    with imap_session(account) as imap:
+        ...   # same API as imaplib.IMAP4; do not logout()
+
+- Sessions are keyed by connection id and by a fingerprint of the runtime
+  config, so an account whose host/port/password changed never gets a
+  session logged in with the old settings (those are logged out).
+- At most EMAIL_IMAP_POOL_MAX_PER_ACCOUNT sessions per account are checked
+  out at once (servers cap simultaneous logins); further callers wait up to
+  EMAIL_IMAP_POOL_WAIT_SECONDS, then get ImapPoolTimeout.
+- A session idle for more than EMAIL_IMAP_POOL_NOOP_SECONDS is checked with
+  NOOP before it is handed out; one idle for more than
+  EMAIL_IMAP_POOL_IDLE_SECONDS is logged out by the reaper thread.
+- The selected mailbox is remembered: select() of the mailbox that is already
+  selected (same read-only flag) is not sent again.
+- A session whose block raised a connection-level error (abort, socket
+  error, timeout) is dropped instead of being returned.
+
+The pool is per process: with N workers an account can hold up to
+N * EMAIL_IMAP_POOL_MAX_PER_ACCOUNT logins. EMAIL_IMAP_POOL_ENABLED = False
+falls back to one login per block. Usable from request handlers and
+background jobs alike (build_runtime_cfg needs an app context).
+"""
+from __future__ import annotations
+
+import hashlib
+import imaplib
+import logging
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from .account import build_runtime_cfg
+from .connection import open_imap
+
+log = logging.getLogger(__name__)
+
+_settings = {
+    "enabled": True,
+    "max_per_account": 3,
+    "idle": 240.0,
+    "noop": 30.0,
+    "wait": 15.0,
+}
+
+# Errors after which the connection itself can no longer be trusted.
+_FATAL = (imaplib.IMAP4.abort, OSError, EOFError, socket.timeout)
+
+
+_QUOTED = re.compile(r'^"((?:[^"\\]|\\.)*)"(?:\s+\(.*\))?$')
+
+
+def _mailbox_key(mailbox) -> str:
+    """
+    'INBOX', '"INBOX"' and '"INBOX" (CONDSTORE)' name the same mailbox
+    (callers try both spellings; the header cache adds SELECT parameters).
+    """
+    name = mailbox.decode("utf-8", "replace") if isinstance(mailbox, bytes) else str(mailbox or "")
+    m = _QUOTED.match(name)
+    if m:
+        name = re.sub(r"\\(.)", r"\1", m.group(1))
+    return name
+
+
+class ImapPoolTimeout(RuntimeError):
+    """All of the account's sessions stayed busy for EMAIL_IMAP_POOL_WAIT_SECONDS."""
+
+
+class PooledIMAP:
+    """imaplib connection wrapper that remembers the selected mailbox."""
+
+    def __init__(self, imap, key: Tuple[int, str]):
+        self._imap = imap
+        self.key = key
+        self.selected: Optional[Tuple[str, bool]] = None
+        self.last_used = time.monotonic()
+        self.broken = False
+        self.caps: Optional[frozenset] = None
+        self.enabled: set = set()
+
+    def __getattr__(self, name):
+        return getattr(self._imap, name)
+
+    def select(self, mailbox="INBOX", readonly=False):
+        want = (_mailbox_key(mailbox), bool(readonly))
+        if self.selected == want and self._imap.state == "SELECTED":
+            # a real SELECT starts from a clean slate; so does the cached one
+            self._imap.untagged_responses = {}
+            return "OK", [b""]
+        self.selected = None
+        typ, data = self._imap.select(mailbox, readonly=readonly)
+        if typ == "OK":
+            self.selected = want
+        return typ, data
+
+    def close(self):
+        self.selected = None
+        return self._imap.close()
+
+    def unselect(self):
+        self.selected = None
+        return self._imap.unselect()
+
+    def delete(self, mailbox):
+        self.selected = None
+        return self._imap.delete(mailbox)
+
+    def rename(self, oldmailbox, newmailbox):
+        self.selected = None
+        return self._imap.rename(oldmailbox, newmailbox)
+
+    def logout(self):
+        self.broken = True  # never hand it out again
+        return self._imap.logout()
+
+    def check_alive(self) -> bool:
+        try:
+            typ, _ = self._imap.noop()
+        except Exception:
+            return False
+        self._imap.untagged_responses = {}
+        return typ == "OK"
+
+    def shutdown(self) -> None:
+        try:
+            self._imap.logout()
+        except Exception:
+            pass
+
+
+class _AccountSlot:
+    def __init__(self, limit: int):
+        self.sem = threading.BoundedSemaphore(limit)
+        self.idle: List[PooledIMAP] = []
+
+
+class ImapPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Dict[int, _AccountSlot] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.counters = {"opened": 0, "reused": 0, "discarded": 0, "expired": 0, "timeouts": 0}
+
+    # ------------------------------------------------------------------
+    def _slot(self, conn_id: int) -> _AccountSlot:
+        with self._lock:
+            slot = self._slots.get(conn_id)
+            if slot is None:
+                slot = self._slots[conn_id] = _AccountSlot(_settings["max_per_account"])
+            return slot
+
+    def _take_idle(self, slot: _AccountSlot, key) -> Tuple[Optional[PooledIMAP], List[PooledIMAP]]:
+        """Most recently used idle session for key; sessions for a stale key are returned to close."""
+        with self._lock:
+            stale = [s for s in slot.idle if s.key != key]
+            slot.idle = [s for s in slot.idle if s.key == key]
+            sess = slot.idle.pop() if slot.idle else None
+        return sess, stale
+
+    def acquire(self, conn_id: int, cfg: dict) -> PooledIMAP:
+        self._ensure_reaper()
+        slot = self._slot(conn_id)
+        if not slot.sem.acquire(timeout=_settings["wait"]):
+            self.counters["timeouts"] += 1
+            raise ImapPoolTimeout(f"IMAP pool: no free session for account {conn_id}")
+        try:
+            key = (conn_id, _fingerprint(cfg))
+            while True:
+                sess, stale = self._take_idle(slot, key)
+                for s in stale:
+                    s.shutdown()
+                if sess is None:
+                    break
+                if time.monotonic() - sess.last_used < _settings["noop"] or sess.check_alive():
+                    self.counters["reused"] += 1
+                    sess._imap.untagged_responses = {}
+                    return sess
+                self.counters["discarded"] += 1
+                sess.shutdown()
+            sess = PooledIMAP(open_imap(cfg), key)
+            self.counters["opened"] += 1
+            return sess
+        except BaseException:
+            slot.sem.release()
+            raise
+
+    def release(self, sess: PooledIMAP, discard: bool = False) -> None:
+        slot = self._slot(sess.key[0])
+        try:
+            if discard or sess.broken or sess._imap.state not in ("AUTH", "SELECTED"):
+                self.counters["discarded"] += 1
+                sess.shutdown()
+                return
+            sess.last_used = time.monotonic()
+            with self._lock:
+                slot.idle.append(sess)
+        finally:
+            slot.sem.release()
+
+    def discard_account(self, conn_id: int) -> None:
+        """Log out the account's idle sessions (e.g. after it was edited or removed)."""
+        with self._lock:
+            slot = self._slots.get(conn_id)
+            idle = slot.idle if slot else []
+            if slot:
+                slot.idle = []
+        for s in idle:
+            s.shutdown()
+
+    def reap(self) -> int:
+        now = time.monotonic()
+        expired: List[PooledIMAP] = []
+        with self._lock:
+            for slot in self._slots.values():
+                keep = []
+                for s in slot.idle:
+                    (expired if now - s.last_used >= _settings["idle"] else keep).append(s)
+                slot.idle = keep
+        for s in expired:
+            s.shutdown()
+        self.counters["expired"] += len(expired)
+        return len(expired)
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle = [s for slot in self._slots.values() for s in slot.idle]
+            for slot in self._slots.values():
+                slot.idle = []
+        for s in idle:
+            s.shutdown()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idle = sum(len(slot.idle) for slot in self._slots.values())
+        return {"accounts": len(self._slots), "idle": idle, **self.counters}
+
+    # ------------------------------------------------------------------
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._stop.clear()
+            self._reaper = threading.Thread(target=self._reap_loop, name="imap-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(max(5.0, _settings["idle"] / 4)):
+            try:
+                self.reap()
+            except Exception:
+                log.exception("imap pool: reap failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.close_all()
+
+
+pool = ImapPool()
+
+
+def server_capabilities(imap) -> frozenset:
+    """
+    Post-login CAPABILITY (imaplib keeps the pre-login list, which often lacks
+    CONDSTORE/QRESYNC); asked once per pooled session.
+    """
+    caps = getattr(imap, "caps", None)
+    if caps is not None:
+        return caps
+    names = {str(c).upper() for c in (getattr(imap, "capabilities", None) or ())}
+    try:
+        typ, data = imap.capability()
+        if typ == "OK" and data and data[0]:
+            names.update(data[0].decode("ascii", "ignore").upper().split())
+    except Exception:
+        pass
+    caps = frozenset(names)
+    if isinstance(imap, PooledIMAP):
+        imap.caps = caps
+    return caps
+
+
+def forget_selection(imap) -> None:
+    """Make the next select() go to the server (its untagged codes are needed)."""
+    if isinstance(imap, PooledIMAP):
+        imap.selected = None
+
+
+def _fingerprint(cfg: dict) -> str:
+    raw = "\x00".join(str(cfg.get(k) or "") for k in
+                      ("incoming_host", "incoming_port", "incoming_security", "email_address", "password"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def imap_session(account, cfg: Optional[dict] = None):
+    """Check out a logged-in IMAP session for an EmailConnection; returned to the pool on exit."""
+    cfg = cfg or build_runtime_cfg(account)
+    if not _settings["enabled"]:
+        imap = open_imap(cfg)
+        try:
+            yield imap
+        finally:
+            try:
+                imap.logout()
+            except Exception:
+                pass
+        return
+
+    sess = pool.acquire(int(account.id), cfg)
+    discard = False
+    try:
+        yield sess
+    except _FATAL:
+        discard = True
+        raise
+    finally:
+        pool.release(sess, discard=discard)
+
+
+def init_imap_pool(app) -> None:
+    cfg = app.config
+    _settings.update(
+        enabled=bool(cfg.get("EMAIL_IMAP_POOL_ENABLED", True)),
+        max_per_account=max(1, int(cfg.get("EMAIL_IMAP_POOL_MAX_PER_ACCOUNT", 3))),
+        idle=float(cfg.get("EMAIL_IMAP_POOL_IDLE_SECONDS", 240)),
+        noop=float(cfg.get("EMAIL_IMAP_POOL_NOOP_SECONDS", 30)),
+        wait=float(cfg.get("EMAIL_IMAP_POOL_WAIT_SECONDS", 15)),
+    )
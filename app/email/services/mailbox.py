@@ -6,10 +6,14 @@ import imaplib
 import email
 from email.message import Message
 from email.header import decode_header, make_header
-from email.utils import parsedate_to_datetime
 from datetime import datetime, timedelta
 from typing import Optional
 
+from . import header_cache
+from .imap_fetch import HEADER_ITEM, parse_fetch, uid_set
+from .imap_pool import server_capabilities
+from . import message_parts
+
 # --------------------
 # Small helpers
 # --------------------
@@ -304,11 +308,26 @@ def list_messages(
     last7: bool = False,
     limit: int = 100,
     offset: int = 0,
+    account=None,
+    cursor: str | None = None,
 ):
     """
     Return a lightweight list of messages for a folder (backward compatible signature).
     Filters/sort are optional; you can still call list_messages(imap, folder, limit=50).
+    With `account` (the EmailConnection) the list comes from the local header cache.
+
+    Filters apply before paging, so a page is only short at the end of the list.
+    `cursor` (the uid of the previous page's last message, see next_cursor())
+    continues after that message and takes precedence over `offset`.
     """
+    if account is not None and header_cache.enabled():
+        cached = header_cache.list_cached(
+            imap_conn, account, folder, q=q, sort=sort, unread=unread, has_attach=has_attach,
+            last7=last7, limit=limit, offset=offset, cursor=cursor,
+        )
+        if cached is not None:
+            return cached
+
     # 1) SELECT safely (handles names with spaces/brackets)
     if not _select_ok(imap_conn, folder, readonly=True):
         return []
@@ -319,7 +338,115 @@ def list_messages(
         base_terms.append("UNSEEN")
     if last7:
         base_terms.extend(["SINCE", _imap_since_date(7)])
+    # Gmail can filter attachments itself; elsewhere BODYSTRUCTURE is checked below
+    server_attach = has_attach and "X-GM-EXT-1" in server_capabilities(imap_conn)
+    if server_attach:
+        base_terms.extend(["X-GM-RAW", '"has:attachment"'])
+
+    # 3) Ordered UID list: server-side SORT when offered, else SEARCH + INTERNALDATE
+    uids = None
+    if sort in ("date_desc", "date_asc") and "SORT" in server_capabilities(imap_conn):
+        uids = _uid_sort(imap_conn, base_terms, q, reverse=(sort == "date_desc"))
+    if uids is None:
+        uids = _uid_search_sorted(imap_conn, base_terms, q, sort)
+    if not uids:
+        return []
+
+    # Paging (after filtering: attachment pages are filled from the following messages)
+    start = _cursor_start(uids, cursor, sort) if cursor else max(0, int(offset))
+    if has_attach and not server_attach:
+        uids_page = _attachment_page(imap_conn, uids, start, int(limit))
+    else:
+        uids_page = uids[start:start + max(0, int(limit))]
+    if not uids_page:
+        return []
+
+    # 4) One FETCH for the whole page
+    try:
+        typ, data = imap_conn.uid("fetch", ",".join(uids_page), f"(UID {HEADER_ITEM})")
+    except imaplib.IMAP4.error:
+        return []
+    if typ != "OK" or not data:
+        return []
+    by_uid = {str(it["uid"]): it for it in parse_fetch(data)}
+
+    msgs = []
+    for uid in uids_page:
+        it = by_uid.get(uid)
+        if it is None or "subject" not in it:
+            continue
+        msgs.append({
+            "uid": uid,
+            "subject": it["subject"] or "(no subject)",
+            "from": it["from"] or "",
+            "date": it["date"] or "",
+            "message_id": it["message_id"] or "",
+            "preview": None,
+        })
+    return msgs
+
+
+def next_cursor(msgs: list[dict], limit: int) -> Optional[str]:
+    """Cursor for the page after `msgs` (None when this page was the last one)."""
+    return msgs[-1]["uid"] if msgs and len(msgs) >= int(limit) else None
 
+
+def _cursor_start(uids: list[str], cursor: str, sort: str) -> int:
+    """Index after the cursor's message; if it is gone, the first uid past it in list order."""
+    try:
+        return uids.index(str(cursor)) + 1
+    except ValueError:
+        pass
+    try:
+        c = int(cursor)
+    except (TypeError, ValueError):
+        return 0
+    asc = sort == "date_asc"
+    for i, u in enumerate(uids):
+        if u.isdigit() and ((int(u) > c) if asc else (int(u) < c)):
+            return i
+    return len(uids)
+
+
+def _attachment_page(imap_conn, uids: list[str], start: int, limit: int) -> list[str]:
+    """The next `limit` uids (from `start`) whose BODYSTRUCTURE shows an attachment."""
+    page: list[str] = []
+    window = max(50, limit * 2)
+    i = start
+    while i < len(uids) and len(page) < limit:
+        chunk = uids[i:i + window]
+        i += window
+        try:
+            typ, data = imap_conn.uid("fetch", ",".join(chunk), "(UID BODYSTRUCTURE)")
+        except imaplib.IMAP4.error:
+            break
+        if typ != "OK" or not data:
+            break
+        found = {str(it["uid"]) for it in parse_fetch(data) if it.get("has_attachment")}
+        page.extend(u for u in chunk if u in found)
+        window = min(500, window * 2)  # sparse matches: look further ahead per round-trip
+    return page[:limit]
+
+
+def _imap_quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _uid_sort(imap_conn, base_terms: list[str], q: str | None, reverse: bool) -> Optional[list[str]]:
+    """UID SORT by arrival (= INTERNALDATE, the order the listing has always used); None if refused."""
+    terms = list(base_terms)
+    if q:
+        terms += ["OR", "SUBJECT", _imap_quote(q), "FROM", _imap_quote(q)]
+    try:
+        typ, data = imap_conn.uid("sort", "(REVERSE ARRIVAL)" if reverse else "(ARRIVAL)", "UTF-8", *terms)
+    except (imaplib.IMAP4.error, UnicodeEncodeError):
+        return None
+    if typ != "OK" or not data:
+        return None
+    return [u.decode(errors="ignore") for u in (data[0] or b"").split()]
+
+
+def _uid_search_sorted(imap_conn, base_terms: list[str], q: str | None, sort: str) -> list[str]:
     def _uid_search_terms(terms: list[str]) -> set[bytes]:
         # Try UTF-8 charset first
         try:
@@ -335,47 +462,16 @@ def list_messages(
 
     # Query: SUBJECT or FROM union
     if q:
-        uid_set = list(_uid_search_terms(base_terms + ["SUBJECT", q]).union(
-                       _uid_search_terms(base_terms + ["FROM", q])))
+        uid_set_ = list(_uid_search_terms(base_terms + ["SUBJECT", q]).union(
+                        _uid_search_terms(base_terms + ["FROM", q])))
     else:
         typ, data = imap_conn.uid("search", None, *base_terms)
         if typ != "OK" or not data or not data[0]:
             return []
-        uid_set = list(data[0].split())
-
-    if not uid_set:
-        return []
+        uid_set_ = list(data[0].split())
 
     # Convert bytes->str
-    uids = [u.decode(errors="ignore") if isinstance(u, (bytes, bytearray)) else str(u) for u in uid_set]
-
-    # 3) Fetch INTERNALDATE for sorting (chunked)
-    date_map: dict[str, Optional[datetime]] = {}
-
-    def _fetch_internaldate_chunk(uid_list: list[str]):
-        if not uid_list:
-            return
-        uid_batch = ",".join(uid_list)
-        typ, resp = imap_conn.uid("fetch", uid_batch, "(INTERNALDATE)")
-        if typ != "OK" or not resp:
-            return
-        for part in resp:
-            if not isinstance(part, tuple) or not part[0]:
-                continue
-            header = part[0].decode(errors="ignore") if isinstance(part[0], (bytes, bytearray)) else str(part[0])
-            m_uid = re.search(r'UID\s+(\d+)', header)
-            m_date = re.search(r'INTERNALDATE\s+"([^"]+)"', header)
-            if m_uid and m_date:
-                uid = m_uid.group(1)
-                try:
-                    dt = parsedate_to_datetime(m_date.group(1))
-                except Exception:
-                    dt = None
-                date_map[uid] = dt
-
-    CHUNK = 500
-    for i in range(0, len(uids), CHUNK):
-        _fetch_internaldate_chunk(uids[i:i+CHUNK])
+    uids = [u.decode(errors="ignore") if isinstance(u, (bytes, bytearray)) else str(u) for u in uid_set_]
 
     def _uid_int(u: str) -> int:
         try:
@@ -383,77 +479,23 @@ def list_messages(
         except Exception:
             return 0
 
-    if sort in ("date_desc", "date_asc"):
-        reverse = (sort == "date_desc")
-        uids.sort(key=lambda u: ((date_map.get(u) is None), date_map.get(u) or datetime.min, _uid_int(u)), reverse=reverse)
-    else:
+    if sort not in ("date_desc", "date_asc"):
         # Fallback: UID numeric desc
         uids.sort(key=_uid_int, reverse=True)
+        return uids
 
-    # Paging
-    start = max(0, int(offset))
-    end = max(start, start + int(limit))
-    uids_page = uids[start:end]
-
-    # 4) Build FETCH items (headers + optional BODYSTRUCTURE for attach heuristic)
-    want_bs = bool(has_attach)
-    fetch_items = "(BODY.PEEK[HEADER.FIELDS (SUBJECT FROM DATE MESSAGE-ID)]"
-    if want_bs:
-        fetch_items += " BODYSTRUCTURE"
-    fetch_items += ")"
-
-    msgs = []
-    for uid in uids_page:
-        try:
-            typ, msg_data = imap_conn.uid("fetch", uid, fetch_items)
-            if typ != "OK" or not msg_data:
-                continue
-
-            raw_header = None
-            bodystructure_text = ""
-            for part in msg_data:
-                if isinstance(part, tuple):
-                    head = part[0]
-                    body = part[1]
-                    if isinstance(head, (bytes, bytearray)) and b"BODY[HEADER.FIELDS" in head:
-                        raw_header = body
-                    else:
-                        if isinstance(body, (bytes, bytearray)):
-                            bodystructure_text += body.decode(errors="ignore")
-                elif isinstance(part, (bytes, bytearray)):
-                    bodystructure_text += part.decode(errors="ignore")
-
-            # Fallback: some servers return the header as the only tuple
-            if not raw_header:
-                tup = next((p for p in msg_data if isinstance(p, tuple)), None)
-                if tup and isinstance(tup[1], (bytes, bytearray)):
-                    raw_header = tup[1]
-            if not raw_header:
-                continue
-
-            hdr = email.message_from_bytes(raw_header)
-            subj = _decode(hdr.get("Subject"))
-            from_ = _decode(hdr.get("From"))
-            date_hdr = hdr.get("Date")
-            mid = hdr.get("Message-ID")
-
-            if has_attach:
-                bs = bodystructure_text.lower()
-                if ("\"attachment\"" not in bs) and ("filename" not in bs):
-                    continue
-
-            msgs.append({
-                "uid": uid,
-                "subject": subj or "(no subject)",
-                "from": from_ or "",
-                "date": date_hdr or "",
-                "message_id": mid or "",
-                "preview": None,
-            })
-        except Exception:
-            continue
+    # INTERNALDATE for sorting (chunked)
+    date_map: dict[str, Optional[datetime]] = {}
+    CHUNK = 500
+    ordered = sorted(uids, key=_uid_int)
+    for i in range(0, len(ordered), CHUNK):
+        typ, resp = imap_conn.uid("fetch", uid_set(_uid_int(u) for u in ordered[i:i + CHUNK]), "(UID INTERNALDATE)")
+        if typ == "OK" and resp:
+            date_map.update((str(it["uid"]), it["internaldate"]) for it in parse_fetch(resp))
 
-    return msgs
+    reverse = (sort == "date_desc")
+    uids.sort(key=lambda u: ((date_map.get(u) is None), date_map.get(u) or datetime.min, _uid_int(u)), reverse=reverse)
+    return uids
 
 # --------------------
 # Read one message
@@ -551,30 +593,56 @@ def _uid_search_by_mid(imap, mid: str) -> list[str]:
         return [u.decode(errors="ignore") for u in data[0].split()]
     return []
 
+def _get_message_partial(imap_conn, uid_str: str) -> Optional[dict]:
+    """Same dict as _build_message_dict, built from BODYSTRUCTURE and the text parts."""
+    structure = message_parts.message_structure(imap_conn, uid_str)
+    if not structure:
+        return None
+    try:
+        text = message_parts.fetch_text_parts(imap_conn, uid_str, structure["parts"])
+    except Exception:
+        return None
+    attachments = [
+        message_parts.attachment_info(p) for p in structure["parts"] if message_parts.is_attachment(p)
+    ]
+    return {
+        "headers": message_parts.view_headers(structure["header"]),
+        "plain": text["plain"],
+        "html": text["html"],
+        "attachments": attachments,
+    }
+
+
 def get_message(imap_conn, folder: str, uid: str, message_id: str | None = None):
     """
     Smart fetch:
       1) SELECT folder (quoted if needed)
-      2) UID FETCH RFC822
-      3) Fallback: FETCH by sequence number
-      4) Fallback: UID SEARCH by Message-ID (if provided), then UID FETCH
+      2) UID FETCH BODYSTRUCTURE + headers, then BODY.PEEK[n] of the text parts only
+      3) Fallback: UID FETCH RFC822
+      4) Fallback: FETCH by sequence number
+      5) Fallback: UID SEARCH by Message-ID (if provided), then UID FETCH
     """
     if not _select_ok(imap_conn, folder, readonly=True):
         return None
 
     uid_str = uid if isinstance(uid, str) else str(uid)
 
-    # 1) Try UID fetch
+    # 1) Partial fetch: attachments are listed from BODYSTRUCTURE, never downloaded here
+    msg = _get_message_partial(imap_conn, uid_str)
+    if msg:
+        return msg
+
+    # 2) Try UID fetch
     raw = _uid_fetch_rfc822(imap_conn, uid_str)
     if raw:
         return _build_message_dict(email.message_from_bytes(raw))
 
-    # 2) Fallback: treat given uid as sequence-number
+    # 3) Fallback: treat given uid as sequence-number
     raw = _seq_fetch_rfc822(imap_conn, uid_str)
     if raw:
         return _build_message_dict(email.message_from_bytes(raw))
 
-    # 3) Fallback: search by Message-ID (if available)
+    # 4) Fallback: search by Message-ID (if available)
     if message_id:
         for cand in _uid_search_by_mid(imap_conn, message_id):
             raw = _uid_fetch_rfc822(imap_conn, cand)
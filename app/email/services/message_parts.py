@@ -0,0 +1,272 @@
+# app/email/services/message_parts.py
+"""
+Partial message access driven by BODYSTRUCTURE, so neither the message view
+nor an attachment download pulls the whole RFC822 source:
+
+- message_structure(): one UID FETCH of BODYSTRUCTURE + the display headers.
+- fetch_text_parts(): BODY.PEEK[n] for just the text/plain and text/html
+  parts the view renders.
+- iter_part(): the bytes of one part, fetched as BODY.PEEK[n]<offset.len>
+  chunks and transfer-decoded (base64 / quoted-printable) incrementally.
+- PartReader: a file object over iter_part() for send_file(); it owns the
+  IMAP session until the response is closed.
+
+Part ids follow IMAP section numbering, the same ids the message view has
+always put in attachment links.
+"""
+from __future__ import annotations
+
+import binascii
+import email
+import imaplib
+import io
+import sys
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .imap_fetch import body_parts, decode_header_value, parse_fetch
+
+CHUNK_BYTES = 256 * 1024
+
+VIEW_HEADER_ITEM = "BODY.PEEK[HEADER.FIELDS (SUBJECT FROM TO CC DATE MESSAGE-ID)]"
+
+
+def message_structure(imap, uid: str) -> Optional[dict]:
+    """{"parts": [...body_parts()], "header": bytes} or None when the server gave no usable BODYSTRUCTURE."""
+    try:
+        typ, data = imap.uid("fetch", str(uid), f"(UID BODYSTRUCTURE {VIEW_HEADER_ITEM})")
+    except Exception:
+        return None
+    if typ != "OK":
+        return None
+    for item in parse_fetch(data, structure=True):
+        if str(item["uid"]) == str(uid) and item.get("bodystructure"):
+            parts = body_parts(item["bodystructure"])
+            if parts:
+                return {"parts": parts, "header": item.get("header_raw") or b""}
+    return None
+
+
+def is_attachment(part: dict) -> bool:
+    """Same rule as the full-message parse: a filename or an attachment disposition."""
+    if part["type"] == "multipart":
+        return False
+    return bool(part["filename"]) or part["disposition"] == "attachment" \
+        or (part["type"], part["subtype"]) == ("message", "rfc822")
+
+
+def find_part(parts: List[dict], part_id: str) -> Optional[dict]:
+    return next((p for p in parts if p["part_id"] == str(part_id) and p["type"] != "multipart"), None)
+
+
+def decoded_size(part: dict) -> int:
+    """Approximate decoded size from the encoded octet count BODYSTRUCTURE reports."""
+    size = int(part.get("size") or 0)
+    if part.get("encoding") == "base64":
+        # 76-character lines + CRLF (RFC 2045), 4 characters per 3 bytes
+        return size * 76 // 78 * 3 // 4
+    return size
+
+
+def attachment_info(part: dict) -> dict:
+    default = "message.eml" if part["type"] == "message" else "attachment"
+    return {
+        "part_id": part["part_id"],
+        "filename": part["filename"] or default,
+        "content_type": f"{part['type']}/{part['subtype']}" if part["type"] else "application/octet-stream",
+        "size": decoded_size(part),
+    }
+
+
+def view_headers(raw: bytes) -> dict:
+    hdr = email.message_from_bytes(raw or b"")
+    return {
+        "subject": decode_header_value(hdr.get("Subject")),
+        "from": decode_header_value(hdr.get("From")),
+        "to": decode_header_value(hdr.get("To")),
+        "cc": decode_header_value(hdr.get("Cc")),
+        "date": hdr.get("Date"),
+        "message_id": hdr.get("Message-ID"),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Transfer decoding
+# -----------------------------------------------------------------------------
+class _Base64Stream:
+    """base64 in arbitrary slices: decodes whole 4-character groups, carries the rest."""
+
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._rest + b"".join(data.split())
+        n = len(data) - len(data) % 4
+        self._rest = data[n:]
+        if not n:
+            return b""
+        try:
+            return binascii.a2b_base64(data[:n])
+        except binascii.Error:
+            return b""
+
+    def flush(self) -> bytes:
+        rest, self._rest = self._rest, b""
+        if not rest:
+            return b""
+        try:
+            return binascii.a2b_base64(rest + b"=" * (-len(rest) % 4))
+        except binascii.Error:
+            return b""
+
+
+class _QPStream:
+    """quoted-printable in arbitrary slices: decodes complete lines, carries the partial one."""
+
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._rest + data
+        cut = data.rfind(b"\n") + 1
+        if not cut:
+            # no line break yet: decode up to an "=XX" escape that may still be incomplete
+            cut = len(data)
+            eq = data.rfind(b"=", max(0, cut - 2))
+            if eq >= 0:
+                cut = eq
+        self._rest = data[cut:]
+        return binascii.a2b_qp(data[:cut]) if cut else b""
+
+    def flush(self) -> bytes:
+        rest, self._rest = self._rest, b""
+        return binascii.a2b_qp(rest) if rest else b""
+
+
+class _Passthrough:
+    def feed(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def transfer_decoder(encoding: Optional[str]):
+    enc = (encoding or "").lower()
+    if enc == "base64":
+        return _Base64Stream()
+    if enc == "quoted-printable":
+        return _QPStream()
+    return _Passthrough()
+
+
+def decode_part_bytes(data: bytes, encoding: Optional[str]) -> bytes:
+    dec = transfer_decoder(encoding)
+    return dec.feed(data or b"") + dec.flush()
+
+
+# -----------------------------------------------------------------------------
+# Fetching
+# -----------------------------------------------------------------------------
+def fetch_sections(imap, uid: str, part_ids: List[str]) -> Dict[str, bytes]:
+    """BODY.PEEK[n] for each id in one UID FETCH; {part_id: encoded bytes}."""
+    if not part_ids:
+        return {}
+    items = " ".join(f"BODY.PEEK[{pid}]" for pid in part_ids)
+    typ, data = imap.uid("fetch", str(uid), f"(UID {items})")
+    if typ != "OK":
+        return {}
+    for item in parse_fetch(data):
+        if str(item["uid"]) == str(uid):
+            return {pid: item["sections"][pid] for pid in part_ids if pid in item["sections"]}
+    return {}
+
+
+def fetch_text_parts(imap, uid: str, parts: List[dict]) -> Dict[str, Optional[str]]:
+    """{"plain": str|None, "html": str|None} from the first non-attachment part of each type."""
+    wanted: Dict[str, dict] = {}
+    for part in parts:
+        if part["type"] != "text" or is_attachment(part):
+            continue
+        if part["subtype"] in ("plain", "html") and part["subtype"] not in wanted:
+            wanted[part["subtype"]] = part
+    raw = fetch_sections(imap, uid, [p["part_id"] for p in wanted.values()])
+    out: Dict[str, Optional[str]] = {"plain": None, "html": None}
+    for subtype, part in wanted.items():
+        # an empty part comes back as "" rather than a literal
+        payload = decode_part_bytes(raw.get(part["part_id"], b""), part["encoding"])
+        charset = part["params"].get("charset") or "utf-8"
+        try:
+            out[subtype] = payload.decode(charset, "replace")
+        except LookupError:
+            out[subtype] = payload.decode("utf-8", "replace")
+    return out
+
+
+def iter_part(imap, uid: str, part: dict, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Decoded bytes of one part, fetched chunk_bytes of encoded data at a time."""
+    decoder = transfer_decoder(part.get("encoding"))
+    pid = part["part_id"]
+    offset = 0
+    while True:
+        typ, data = imap.uid("fetch", str(uid), f"(UID BODY.PEEK[{pid}]<{offset}.{chunk_bytes}>)")
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"FETCH BODY[{pid}]<{offset}> failed: {typ}")
+        chunk = b""
+        for item in parse_fetch(data):
+            if str(item["uid"]) == str(uid):
+                chunk = item["sections"].get(pid, b"")
+                break
+        if chunk:
+            out = decoder.feed(chunk)
+            if out:
+                yield out
+            offset += len(chunk)
+        if len(chunk) < chunk_bytes:
+            break
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
+class PartReader(io.RawIOBase):
+    """
+    Read-only file over a chunk iterator. `release(exc_type, exc, tb)` is
+    called exactly once - when the reader is closed, or with the error that
+    stopped the iterator - so the IMAP session behind it is returned (or
+    dropped) only after the download has finished.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], release: Optional[Callable] = None):
+        self._chunks = chunks
+        self._release = release
+        self._buf = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            try:
+                self._buf = next(self._chunks)
+            except StopIteration:
+                return 0
+            except BaseException:
+                self._done(*sys.exc_info())
+                raise
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def _done(self, *exc_info) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release(*exc_info)
+
+    def close(self) -> None:
+        if not self.closed:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+            self._done(None, None, None)
+        super().close()
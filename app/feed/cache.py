@@ -0,0 +1,241 @@
+"""
+Per-viewer response cache for GET /api/feed.
+
+Two tiers:
+  - L1: in-process LRU (FEED_CACHE_SIZE entries)
+  - L2: optional shared store (FEED_CACHE_URL=redis://...) so workers share
+    pages; without it a process-local stand-in keeps the same interface.
+
+Entries are keyed by (viewer audience signature, filters, cursor) and tagged
+with the feed "generation". Any commit that touches posts, comments,
+reactions or pins bumps the generation, and so does every feed_events
+message on the realtime hub (other workers' writes via PG NOTIFY). Stale
+generations are never served; FEED_CACHE_TTL bounds staleness from changes
+outside the feed (e.g. a user moving department).
+
+The ETag is a hash of the body, so a client polling an unchanged feed gets
+a 304 straight from L1 without running the feed queries.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import FeedPost, FeedComment, FeedReaction, FeedPinnedPost, FeedAttachment, FeedPostAllowedUser
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60
+DEFAULT_SIZE = 2048
+_GEN_KEY = "feed:gen"
+_FEED_MODELS = (FeedPost, FeedComment, FeedReaction, FeedPinnedPost, FeedAttachment, FeedPostAllowedUser)
+
+
+# -----------------------------------------------------------------------------
+# Shared stores (L2 + generation counter)
+# -----------------------------------------------------------------------------
+class LocalStore:
+    """Process-local stand-in for the shared store (same get/set/incr API)."""
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            hit = self._data.get(key)
+            if not hit:
+                return None
+            expires, value = hit
+            if expires and expires < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            return value
+
+    def set(self, key: str, value, ttl: Optional[int] = None):
+        with self._lock:
+            self._data[key] = ((time.monotonic() + ttl) if ttl else 0, value)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            _, cur = self._data.get(key, (0, 0))
+            cur = int(cur or 0) + 1
+            self._data[key] = (0, cur)
+            return cur
+
+
+class RedisStore:
+    shared = True
+
+    def __init__(self, url: str):
+        import redis  # optional dependency: pip install redis
+        self._r = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key: str):
+        return self._r.get(key)
+
+    def set(self, key: str, value, ttl: Optional[int] = None):
+        self._r.set(key, value, ex=ttl or None)
+
+    def incr(self, key: str) -> int:
+        return int(self._r.incr(key))
+
+
+# -----------------------------------------------------------------------------
+# Cache
+# -----------------------------------------------------------------------------
+class FeedCache:
+    def __init__(self, store, size: int = DEFAULT_SIZE, ttl: int = DEFAULT_TTL):
+        self.store = store
+        self.size = size
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, Tuple[int, float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._gen = 0  # local generation when the store is not shared
+
+    # --- generation ---
+    def generation(self) -> int:
+        if not self.store.shared:
+            return self._gen
+        try:
+            return int(self.store.get(_GEN_KEY) or 0)
+        except Exception:
+            return -1  # store down: never matches a cached entry
+
+    def bump(self) -> None:
+        with self._lock:
+            self._gen += 1
+            self._lru.clear()
+        if self.store.shared:
+            try:
+                self.store.incr(_GEN_KEY)
+            except Exception:
+                log.exception("feed cache: shared generation bump failed")
+
+    # --- entries ---
+    def get(self, key: str, gen: int) -> Optional[Tuple[str, bytes]]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit and hit[0] == gen and hit[1] > now:
+                self._lru.move_to_end(key)
+                return hit[2], hit[3]
+        if not self.store.shared:
+            return None
+        try:
+            raw = self.store.get("feed:resp:" + key)
+        except Exception:
+            return None
+        if not raw:
+            return None
+        try:
+            doc = json.loads(raw)
+        except Exception:
+            return None
+        if doc.get("gen") != gen:
+            return None
+        etag, body = doc["etag"], doc["body"].encode("utf-8")
+        self._remember(key, gen, etag, body)
+        return etag, body
+
+    def put(self, key: str, gen: int, body: bytes) -> str:
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        self._remember(key, gen, etag, body)
+        if self.store.shared:
+            try:
+                payload = json.dumps({"gen": gen, "etag": etag, "body": body.decode("utf-8")})
+                self.store.set("feed:resp:" + key, payload, ttl=self.ttl)
+            except Exception:
+                log.exception("feed cache: shared store write failed")
+        return etag
+
+    def _remember(self, key: str, gen: int, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._lru[key] = (gen, time.monotonic() + self.ttl, etag, body)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.size:
+                self._lru.popitem(last=False)
+
+
+def viewer_key(user, args) -> str:
+    """(audience signature, filters, cursor) -> short cache key."""
+    from .permissions import _is_feed_admin, _user_sector_ids
+    sig = {
+        "u": int(getattr(user, "id", 0) or 0),
+        "a": _is_feed_admin(user),
+        "s": sorted(_user_sector_ids(user)),
+        "q": sorted((k, v) for k, v in args.items(multi=True)),
+    }
+    return hashlib.sha1(json.dumps(sig, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def get_feed_cache() -> Optional[FeedCache]:
+    return current_app.extensions.get("feed_cache")
+
+
+def invalidate() -> None:
+    cache = get_feed_cache() if has_app_context() else None
+    if cache is not None:
+        cache.bump()
+
+
+# -----------------------------------------------------------------------------
+# Wiring
+# -----------------------------------------------------------------------------
+def _after_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _FEED_MODELS):
+            session.info["feed_cache_dirty"] = True
+            return
+
+
+def _after_commit(session):
+    if session.info.pop("feed_cache_dirty", False):
+        invalidate()
+
+
+def _after_rollback(session):
+    session.info.pop("feed_cache_dirty", None)
+
+
+def init_feed_cache(app) -> None:
+    app.config.setdefault("FEED_CACHE_ENABLED", True)
+    app.config.setdefault("FEED_CACHE_TTL", DEFAULT_TTL)
+    app.config.setdefault("FEED_CACHE_SIZE", DEFAULT_SIZE)
+    app.config.setdefault("FEED_CACHE_URL", None)
+    if not app.config["FEED_CACHE_ENABLED"]:
+        return
+
+    store = LocalStore()
+    url = app.config["FEED_CACHE_URL"]
+    if url:
+        try:
+            store = RedisStore(url)
+        except Exception:
+            app.logger.exception("feed cache: shared store %s unavailable, using in-process only", url)
+    cache = FeedCache(store, size=int(app.config["FEED_CACHE_SIZE"]), ttl=int(app.config["FEED_CACHE_TTL"]))
+    app.extensions["feed_cache"] = cache
+
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
+    # writes in other workers arrive as feed_events NOTIFY on the realtime hub
+    from app.realtime.broker import hub
+
+    def _on_hub_event(payload: Dict[str, Any]) -> None:
+        if payload.get("channel") == "feed_events":
+            cache.bump()
+
+    hub.add_listener(_on_hub_event)
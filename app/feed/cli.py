@@ -0,0 +1,36 @@
+# app/feed/cli.py
+import click
+from flask.cli import AppGroup
+
+feed_cli = AppGroup("feed", help="Feed maintenance commands")
+
+
+@feed_cli.command("rebuild-stats")
+@click.option("--batch-size", default=500, show_default=True, help="Posts per transaction.")
+def rebuild_stats(batch_size: int):
+    """Recompute feed_post_stats / feed_post_reaction_stats from source tables."""
+    from app.feed.stats import rebuild_post_stats
+
+    n = rebuild_post_stats(batch_size=batch_size)
+    click.echo(f"Rebuilt stats for {n} post(s).")
+
+
+@feed_cli.command("timeline-backfill")
+@click.option("--user-id", type=int, default=None, help="Only this user.")
+@click.option("--run/--no-run", default=True, show_default=True, help="Process the queue now instead of leaving it to the worker.")
+def timeline_backfill(user_id, run: bool):
+    """Queue a full timeline rebuild for every user (or one) - run once after enabling FEED_TIMELINE_ENABLED."""
+    from app.feed.timeline import enqueue_backfill, run_pending
+
+    n = enqueue_backfill(user_id)
+    click.echo(f"Queued {n} timeline rebuild(s).")
+    if run:
+        click.echo(f"Processed {run_pending()} job(s).")
+
+
+@feed_cli.command("timeline-work")
+def timeline_work():
+    """Process pending fan-out jobs (when FEED_TIMELINE_WORKER is off, e.g. from cron)."""
+    from app.feed.timeline import run_pending
+
+    click.echo(f"Processed {run_pending()} job(s).")
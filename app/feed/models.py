@@ -40,6 +40,10 @@ class FeedPostAllowedUser(db.Model):
 
 class FeedPost(db.Model):
     __tablename__ = "feed_posts"
+    __table_args__ = (
+        # list_posts: WHERE is_deleted = false ORDER BY created_at DESC, id DESC
+        db.Index("ix_feed_posts_live_created_id", "is_deleted", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -180,6 +184,10 @@ class FeedAttachment(db.Model):
 
 class FeedComment(db.Model):
     __tablename__ = "feed_comments"
+    __table_args__ = (
+        # list_comments: WHERE post_id = ? ORDER BY created_at DESC, id DESC (keyset)
+        db.Index("ix_feed_comments_post_created_id", "post_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(
@@ -250,4 +258,86 @@ class FeedPinnedPost(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("user_id", "post_id", name="uq_feed_pin_user_post"),
-    )
\ No newline at end of file
+    )
+
+# --- Denormalized per-post counters (maintained by app/feed/stats.py) ---
+class FeedPostStats(db.Model):
+    __tablename__ = "feed_post_stats"
+
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("feed_posts.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+    reaction_count = db.Column(db.Integer, nullable=False, default=0)  # all emojis
+    last_activity_at = db.Column(db.DateTime, nullable=True, index=True)
+
+
+class FeedPostReactionStats(db.Model):
+    __tablename__ = "feed_post_reaction_stats"
+
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("feed_posts.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    emoji = db.Column(db.String(8), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# --- Materialized home timelines (fan-out on write, see app/feed/timeline.py) ---
+class FeedTimelineEntry(db.Model):
+    __tablename__ = "feed_timeline"
+    __table_args__ = (
+        # reads: WHERE user_id = ? ORDER BY created_at DESC, post_id DESC (keyset)
+        db.Index("ix_feed_timeline_user_created_post", "user_id", "created_at", "post_id"),
+    )
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey(f"{USER_TBL}.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("feed_posts.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,  # deletion / audience change: DELETE ... WHERE post_id = ?
+    )
+    created_at = db.Column(db.DateTime, nullable=False)  # copy of feed_posts.created_at
+
+
+class FeedTimelineState(db.Model):
+    """A row means this user's timeline is complete and can serve reads."""
+    __tablename__ = "feed_timeline_state"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey(f"{USER_TBL}.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    built_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class FeedFanoutJob(db.Model):
+    """
+    Durable work item for the timeline worker.
+      kind="post": fan post_id out to its audience, user_id batches above last_user_id
+      kind="user": rebuild user_id's whole timeline (new user / department change)
+    """
+    __tablename__ = "feed_fanout_jobs"
+    __table_args__ = (
+        db.Index("ix_feed_fanout_jobs_status_id", "status", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)
+    post_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(16), nullable=False, default="pending")  # pending|running|done|failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
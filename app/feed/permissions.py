@@ -1,14 +1,22 @@
 from typing import Iterable
 from flask_login import current_user
+from sqlalchemy import func
 from sqlalchemy.orm import Query
 from app.extensions import db
-from .models import FeedPost
+from app.models import User
+from .models import FeedPost, FeedPostAllowedUser
 
-def _user_sector_ids() -> set[int]:
+def _is_feed_admin(user) -> bool:
+    # Same rule as routes/util_is_admin.py::_is_admin (used by _can_view_post)
+    return bool(getattr(user, "is_admin", False) or getattr(user, "is_superuser", False))
+
+def _user_sector_ids(user=None) -> set[int]:
+    user = user if user is not None else current_user
     sids = set()
-    sid = getattr(current_user, "sector_id", None)
-    if sid: sids.add(int(sid))
-    maybe_many: Iterable = getattr(current_user, "sector_ids", []) or []
+    for attr in ("department_id", "sector_id"):
+        sid = getattr(user, attr, None)
+        if sid: sids.add(int(sid))
+    maybe_many: Iterable = getattr(user, "sector_ids", []) or []
     try:
         for s in maybe_many:
             sids.add(int(getattr(s, "id", s)))
@@ -16,20 +24,62 @@ def _user_sector_ids() -> set[int]:
         pass
     return sids
 
-def feed_queryset_for_current_user(q: Query) -> Query:
-    role = getattr(current_user, "role", "user")
-    if role == "admin":
-        return q.filter(FeedPost.is_deleted.is_(False))
-
-    sids = _user_sector_ids()
-    return q.filter(FeedPost.is_deleted.is_(False)).filter(
-        db.or_(
-            FeedPost.audience_type == "all",
-            db.and_(FeedPost.audience_type == "sector", FeedPost.audience_id.in_(sids if sids else [-1])),
-            db.and_(FeedPost.audience_type == "users", FeedPost.allowed_users.any(id=current_user.id)),
+def _allowed_exists(user_id: int):
+    """EXISTS (feed_post_allowed_users row for this post + user) — hits the (post_id, user_id) PK."""
+    return (
+        db.session.query(FeedPostAllowedUser.post_id)
+        .filter(
+            FeedPostAllowedUser.post_id == FeedPost.id,
+            FeedPostAllowedUser.user_id == user_id,
         )
+        .exists()
     )
 
+def feed_visibility_clause(user=None):
+    """
+    SQL predicate equivalent to _can_view_post for one viewer:
+    audience 'all', 'sector' (viewer's department) or 'users' (whitelisted).
+    Returns None for admins (no restriction).
+    """
+    user = user if user is not None else current_user
+    if _is_feed_admin(user):
+        return None
+    sids = _user_sector_ids(user)
+    uid = int(getattr(user, "id", 0) or 0)
+    return db.or_(
+        FeedPost.audience_type == "all",
+        db.and_(FeedPost.audience_type == "sector", FeedPost.audience_id.in_(sids if sids else [-1])),
+        db.and_(FeedPost.audience_type == "users", _allowed_exists(uid)),
+    )
+
+def feed_tagged_clause(user=None):
+    """Posts addressed to the viewer by name (audience 'users' and whitelisted)."""
+    user = user if user is not None else current_user
+    uid = int(getattr(user, "id", 0) or 0)
+    return db.and_(FeedPost.audience_type == "users", _allowed_exists(uid))
+
+def feed_author_name_clause(name: str):
+    """Case-insensitive substring match on the author's display name (User.full_name)."""
+    full = func.trim(func.coalesce(User.first_name, "") + " " + func.coalesce(User.last_name, ""))
+    display = func.coalesce(func.nullif(full, ""), User.username, User.email, "")
+    return FeedPost.author.has(display.icontains(name, autoescape=True))
+
+def feed_queryset_for_current_user(
+    q: Query,
+    user=None,
+    tagged_only: bool = False,
+    author_name: str | None = None,
+) -> Query:
+    q = q.filter(FeedPost.is_deleted.is_(False))
+    clause = feed_visibility_clause(user)
+    if clause is not None:
+        q = q.filter(clause)
+    if tagged_only:
+        q = q.filter(feed_tagged_clause(user))
+    if author_name:
+        q = q.filter(feed_author_name_clause(author_name))
+    return q
+
 def can_manage_post(post: FeedPost) -> bool:
     role = getattr(current_user, "role", "user")
     if role == "admin": return True
@@ -38,11 +88,10 @@ def can_manage_post(post: FeedPost) -> bool:
 
 def can_view_post(post: FeedPost) -> bool:
     if post.is_deleted: return False
-    role = getattr(current_user, "role", "user")
-    if role == "admin": return True
+    if _is_feed_admin(current_user): return True
     if post.audience_type == "all": return True
     if post.audience_type == "sector":
         return post.audience_id in _user_sector_ids()
     if post.audience_type == "users":
-        return any(u.id == current_user.id for u in post.allowed_users)
+        return any(rel.user_id == current_user.id for rel in post.allowed_users)
     return False
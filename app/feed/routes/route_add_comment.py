@@ -9,7 +9,10 @@ from app.feed import bp
 from app.feed.models import FeedPost, FeedComment
 from app.feed.routes.util_has_col import _has_col
 from app.feed.routes.perms_can_view_post import _can_view_post
+from app.feed.routes.util_post_audience import _post_audience
 from app.feed.routes.serializers_safe_author_dict import _safe_author_dict
+from app.feed.stats import record_comment
+from app.realtime.broker import emit
 
 @bp.post("/<int:post_id>/comments")
 @bp.post("/<int:post_id>/comments/")
@@ -35,6 +38,13 @@ def add_comment(post_id: int):
 
         c = FeedComment(**fields)
         db.session.add(c)
+        record_comment(post_id, +1, at=c.created_at)
+        db.session.flush()
+        emit("feed_events", {
+            "type": "comment", "id": c.id, "post_id": post_id,
+            "author_id": current_user.id, "created_at": c.created_at.isoformat(),
+            **_post_audience(p),
+        })
         db.session.commit()
 
         return jsonify({
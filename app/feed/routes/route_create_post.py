@@ -11,15 +11,18 @@ from app.feed import bp
 from app.feed.models import FeedPost, FeedPostAllowedUser
 from app.feed.routes.util_has_col import _has_col
 from app.feed.routes.serializers_post_to_dict import _post_to_dict
+from app.feed.routes.util_post_audience import _post_audience
 from app.feed.routes.posts_attach_local_uploads_to_post import (
     _attach_local_uploads_to_post,
 )
 from app.feed.routes.posts_attach_drive_items_to_post import (
     _attach_drive_items_to_post,
 )
+from app.feed.stats import init_post_stats
+from app.feed.timeline import enqueue_post
 
 # SSE broadcaster
-from app.realtime.broker import hub
+from app.realtime.broker import emit
 
 
 # ---------------------------------------------------------
@@ -85,6 +88,7 @@ def create_post():
         p = FeedPost(**p_fields)
         db.session.add(p)
         db.session.flush()  # need p.id for attachments
+        init_post_stats(p.id)
 
         # -------------------------------------------------
         # Attachments
@@ -118,31 +122,21 @@ def create_post():
                     add_user(uid)
 
         # -------------------------------------------------
-        # Finalize DB
+        # Finalize DB (fan-out job and SSE event commit with the post)
         # -------------------------------------------------
-        db.session.commit()
+        enqueue_post(p.id)
+        db.session.flush()
 
         # Serialize for frontend
         serialized = _post_to_dict(p, with_rel=True, u=current_user)
 
         # -------------------------------------------------
-        # SSE realtime event
-        #   app/realtime/api.py listens via hub.poll(...)
-        #   and sends:
-        #       event: feed_events
-        #       data: {"channel":"feed_events","type":"feed:new_post", ...}
-        # -------------------------------------------------
-        try:
-            hub.publish(
-                {
-                    "channel": "feed_events",
-                    "type": "feed:new_post",
-                    "post": serialized,
-                }
-            )
-        except Exception:
-            # Realtime failure must NOT break post creation
-            current_app.logger.exception("Failed to publish feed:new_post SSE event")
+        # SSE realtime event (sent to every worker on commit)
+        #   event: feed_events
+        #   data: {"channel":"feed_events","type":"feed:new_post", ...}
+        # -------------------------------------------------
+        emit("feed_events", {"type": "feed:new_post", "id": p.id, "post": serialized, **_post_audience(p)})
+        db.session.commit()
 
         return jsonify(serialized), 201
 
@@ -10,6 +10,7 @@ from app.feed.models import FeedComment
 from app.feed.routes.comments_get_comment_flat import _get_comment_flat
 from app.feed.routes.util_can_edit_comment import _can_edit_comment
 from app.feed.routes.util_has_col import _has_col
+from app.feed.stats import record_comment
 
 @bp.route("/comments/<int:comment_id>", methods=["DELETE", "POST"])
 @login_required
@@ -24,12 +25,15 @@ def delete_comment_flat(comment_id: int):
     if not _can_edit_comment(current_user, c):
         return jsonify({"error": "Forbidden"}), 403
 
+    post_id = c.post_id
     if _has_col(FeedComment, "is_deleted"):
         c.is_deleted = True
         if _has_col(FeedComment, "updated_at"):
             c.updated_at = datetime.utcnow()
+        record_comment(post_id, -1)
         db.session.commit()
     else:
         db.session.delete(c)
+        record_comment(post_id, -1)
         db.session.commit()
     return jsonify({"ok": True}), 200
@@ -10,6 +10,7 @@ from app.feed.models import FeedPost, FeedComment
 from app.feed.routes.comments_get_comment_nested import _get_comment_nested
 from app.feed.routes.util_can_edit_comment import _can_edit_comment
 from app.feed.routes.util_has_col import _has_col
+from app.feed.stats import record_comment
 
 @bp.route("/<int:post_id>/comments/<int:comment_id>", methods=["DELETE", "POST"])
 @login_required
@@ -31,8 +32,10 @@ def delete_comment_nested(post_id: int, comment_id: int):
         c.is_deleted = True
         if _has_col(FeedComment, "updated_at"):
             c.updated_at = datetime.utcnow()
+        record_comment(post_id, -1)
         db.session.commit()
     else:
         db.session.delete(c)
+        record_comment(post_id, -1)
         db.session.commit()
     return jsonify({"ok": True}), 200
@@ -9,6 +9,7 @@ from app.feed import bp
 from app.feed.models import FeedPost
 from app.feed.routes.util_has_col import _has_col
 from app.feed.routes.util_can_edit_post import _can_edit_post
+from app.feed.timeline import remove_post
 
 @bp.route("/<int:post_id>", methods=["DELETE", "POST"])
 @login_required
@@ -26,6 +27,7 @@ def delete_post(post_id: int):
     if not _can_edit_post(current_user, p):
         return jsonify({"error": "Forbidden"}), 403
 
+    remove_post(p.id)
     if _has_col(FeedPost, "is_deleted"):
         p.is_deleted = True
         if _has_col(FeedPost, "updated_at"):
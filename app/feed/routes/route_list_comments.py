@@ -1,20 +1,35 @@
 # app/feed/routes/route_list_comments.py
 from __future__ import annotations
-from datetime import datetime
-from flask import jsonify
+from flask import jsonify, request
 from flask_login import login_required, current_user
 from flask import current_app
 from app.feed import bp
 from app.extensions import db
 from app.feed.models import FeedPost, FeedComment
 from app.feed.routes.util_has_col import _has_col
+from app.feed.routes.util_parse_int import _parse_int
+from app.feed.routes.util_cursor_decode import _cursor_decode
+from app.feed.routes.util_cursor_encode import _cursor_encode
 from app.feed.routes.perms_can_view_post import _can_view_post
-from app.feed.routes.serializers_safe_author_dict import _safe_author_dict
+from app.feed.routes.serializers_comments_to_dicts import _comments_to_dicts
+
+COMMENTS_PAGE_DEFAULT = 50
+COMMENTS_PAGE_MAX = 200
+
 
 @bp.get("/<int:post_id>/comments")
 @bp.get("/<int:post_id>/comments/")
 @login_required
 def list_comments(post_id: int):
+    """
+    Latest comments of a post, oldest-first within the page.
+
+    GET /api/feed/<id>/comments?limit=50             -> newest `limit` comments
+    GET /api/feed/<id>/comments?before=<cursor>      -> the page before that ("load older")
+
+    Response: {"items": [...], "older": <cursor|null>, "has_more": bool}
+    Keyset on (created_at, id) over ix_feed_comments_post_created_id.
+    """
     try:
         p = db.session.get(FeedPost, post_id)
         if not p:
@@ -24,20 +39,28 @@ def list_comments(post_id: int):
         if not _can_view_post(current_user, p):
             return jsonify({"error": "Forbidden"}), 403
 
-        q = FeedComment.query.filter_by(post_id=post_id)
+        limit = max(1, min(_parse_int(request.args.get("limit"), COMMENTS_PAGE_DEFAULT), COMMENTS_PAGE_MAX))
+
+        q = FeedComment.query.filter(FeedComment.post_id == post_id)
         if _has_col(FeedComment, "is_deleted"):
-            q = q.filter_by(is_deleted=False)
-        q = q.order_by(FeedComment.created_at.asc(), FeedComment.id.asc())
-
-        comments = q.all()
-        return jsonify({"items": [{
-            "id": getattr(c, "id", None),
-            "post_id": getattr(c, "post_id", None),
-            "html": getattr(c, "html", "") or "",
-            "created_at": (getattr(c, "created_at", None) or datetime.utcnow()).isoformat(),
-            "updated_at": (getattr(c, "updated_at", None) or getattr(c, "created_at", None) or datetime.utcnow()).isoformat(),
-            "author": _safe_author_dict(getattr(c, "author", None)),
-        } for c in comments]})
+            q = q.filter(FeedComment.is_deleted.is_(False))
+
+        before_dt, before_id = _cursor_decode(request.args.get("before"))
+        if before_dt is not None and before_id is not None:
+            q = q.filter(db.or_(
+                FeedComment.created_at < before_dt,
+                db.and_(FeedComment.created_at == before_dt, FeedComment.id < before_id),
+            ))
+
+        rows = q.order_by(FeedComment.created_at.desc(), FeedComment.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        page = list(reversed(rows[:limit]))
+
+        return jsonify({
+            "items": _comments_to_dicts(page),
+            "older": _cursor_encode(page[0]) if has_more and page else None,
+            "has_more": has_more,
+        })
     except Exception as e:
         current_app.logger.exception("list_comments failed")
         return jsonify({"error": "internal", "detail": str(e)}), 500
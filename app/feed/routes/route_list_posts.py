@@ -14,8 +14,10 @@ from app.feed.routes.util_parse_int import _parse_int
 from app.feed.routes.util_has_col import _has_col
 from app.feed.routes.util_cursor_decode import _cursor_decode
 from app.feed.routes.util_cursor_encode import _cursor_encode
-from app.feed.routes.perms_can_view_post import _can_view_post
-from app.feed.routes.serializers_post_to_dict import _post_to_dict
+from app.feed.permissions import feed_queryset_for_current_user
+from app.feed.cache import get_feed_cache, viewer_key
+from app.feed.timeline import timeline_queryset
+from app.feed.routes.serializers_posts_to_dicts import _posts_to_dicts
 
 
 def _apply_date_preset(query, preset: str):
@@ -66,111 +68,103 @@ def _apply_date_preset(query, preset: str):
     return query
 
 
+def _list_posts_payload() -> dict:
+    # --- basic paging ---
+    limit = max(1, min(_parse_int(request.args.get("limit"), 10), 50))
+    cursor = request.args.get("cursor")
+    cur_dt, cur_id = _cursor_decode(cursor)
+
+    # --- filters from query string ---
+    date_preset = request.args.get("date_preset", "").strip().lower()
+    author_name = (request.args.get("author_name") or "").strip().lower()
+    tagged_only_raw = (request.args.get("tagged_only") or "").strip().lower()
+    tagged_only = tagged_only_raw in {"1", "true", "yes", "on"}
+    search_q = (request.args.get("q") or "").strip()
+
+    # --- base query: materialized timeline if built, else visibility in SQL ---
+    tl = timeline_queryset(current_user, tagged_only=tagged_only, author_name=author_name or None)
+    if tl is not None:
+        q, created_col, id_col = tl
+    else:
+        q = feed_queryset_for_current_user(
+            FeedPost.query,
+            user=current_user,
+            tagged_only=tagged_only,
+            author_name=author_name or None,
+        )
+        created_col, id_col = FeedPost.created_at, FeedPost.id
+
+    # apply date filter first
+    if date_preset:
+        q = _apply_date_preset(q, date_preset)
+
+    # keyword search in title/html (best-effort)
+    if search_q:
+        like = f"%{search_q}%"
+        conds = []
+        if _has_col(FeedPost, "title"):
+            conds.append(FeedPost.title.ilike(like))
+        if _has_col(FeedPost, "html"):
+            conds.append(FeedPost.html.ilike(like))
+        if conds:
+            q = q.filter(or_(*conds))
+
+    # existing cursor-based pagination (created_at + id)
+    if cur_dt is not None and cur_id is not None and _has_col(FeedPost, "created_at"):
+        q = q.filter(
+            or_(
+                created_col < cur_dt,
+                and_(created_col == cur_dt, id_col < cur_id),
+            )
+        )
+
+    # ordering
+    if _has_col(FeedPost, "created_at"):
+        q = q.order_by(created_col.desc(), id_col.desc())
+    else:
+        q = q.order_by(FeedPost.id.desc())
+
+    # every filter is in the query, so limit+1 rows give a full page + has_more
+    items: List[FeedPost] = q.limit(limit + 1).all()
+
+    sliced = items[:limit]
+    next_cursor = _cursor_encode(sliced[-1]) if len(items) > limit else None
+    return {
+        "items": _posts_to_dicts(sliced, with_rel=True, u=current_user),
+        "next_cursor": next_cursor,
+        "done": next_cursor is None,
+    }
+
+
+def _cached_response(etag: str, body: bytes):
+    """200 with the cached body, or 304 when the client already has it."""
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = current_app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
 @bp.get("")
 @bp.get("/")
 @login_required
 def list_posts():
     try:
-        # --- basic paging ---
-        limit = max(1, min(_parse_int(request.args.get("limit"), 10), 50))
-        cursor = request.args.get("cursor")
-        cur_dt, cur_id = _cursor_decode(cursor)
-
-        # --- filters from query string ---
-        date_preset = request.args.get("date_preset", "").strip().lower()
-        author_name = (request.args.get("author_name") or "").strip().lower()
-        tagged_only_raw = (request.args.get("tagged_only") or "").strip().lower()
-        tagged_only = tagged_only_raw in {"1", "true", "yes", "on"}
-        search_q = (request.args.get("q") or "").strip()
-
-        # --- base query ---
-        q = FeedPost.query
-        if _has_col(FeedPost, "is_deleted"):
-            q = q.filter_by(is_deleted=False)
-
-        # apply date filter first
-        if date_preset:
-            q = _apply_date_preset(q, date_preset)
-
-        # keyword search in title/html (best-effort)
-        if search_q:
-            like = f"%{search_q}%"
-            conds = []
-            if _has_col(FeedPost, "title"):
-                conds.append(FeedPost.title.ilike(like))
-            if _has_col(FeedPost, "html"):
-                conds.append(FeedPost.html.ilike(like))
-            if conds:
-                q = q.filter(or_(*conds))
-
-        # existing cursor-based pagination (created_at + id)
-        if cur_dt is not None and cur_id is not None and _has_col(FeedPost, "created_at"):
-            q = q.filter(
-                or_(
-                    FeedPost.created_at < cur_dt,
-                    and_(FeedPost.created_at == cur_dt, FeedPost.id < cur_id),
-                )
-            )
-
-        # ordering
-        if _has_col(FeedPost, "created_at"):
-            q = q.order_by(FeedPost.created_at.desc(), FeedPost.id.desc())
-        else:
-            q = q.order_by(FeedPost.id.desc())
-
-        # --- collect items, enforcing permissions, tagged_only and author_name ---
-        items: List[FeedPost] = []
-
-        # We still use limit+1 on the SQL side, then filter in Python.
-        # If many posts are filtered out, the page may have fewer than `limit` items,
-        # but it will never show posts the user shouldn’t see.
-        for p in q.limit(limit + 1).all():
-            # permission guard
-            if not _can_view_post(current_user, p):
-                continue
-
-            # tagged_only: only posts where audience_type=="users" AND current user in allowed_users
-            if tagged_only:
-                audience_type = getattr(p, "audience_type", None)
-                if audience_type != "users":
-                    # skip global/all-employee posts when "TO" filter is active
-                    continue
-                allowed = getattr(p, "allowed_users", []) or []
-                if not any(getattr(u, "id", None) == current_user.id for u in allowed):
-                    continue
-
-            # author_name filter (by full_name or first+last, case-insensitive)
-            if author_name:
-                a = getattr(p, "author", None)
-                if not a:
-                    continue
-                full_name = (
-                    getattr(a, "full_name", None)
-                    or getattr(a, "name", None)
-                    or (
-                        (
-                            (getattr(a, "first_name", "") or "") + " " +
-                            (getattr(a, "last_name", "") or "")
-                        ).strip()
-                    )
-                    or getattr(a, "email", None)
-                    or ""
-                )
-                if author_name not in full_name.lower():
-                    continue
-
-            items.append(p)
-            if len(items) >= limit + 1:
-                break
-
-        sliced = items[:limit]
-        next_cursor = _cursor_encode(sliced[-1]) if len(items) > limit else None
-        resp = {
-            "items": [_post_to_dict(p, with_rel=True, u=current_user) for p in sliced],
-            "next_cursor": next_cursor,
-            "done": next_cursor is None,
-        }
-        return jsonify(resp)
+        cache = get_feed_cache()
+        if cache is None:
+            return jsonify(_list_posts_payload())
+
+        # generation is read before the queries: a write that lands while we
+        # build the page bumps it, so this entry can never be served stale
+        key = viewer_key(current_user, request.args)
+        gen = cache.generation()
+        hit = cache.get(key, gen)
+        if hit is None:
+            body = jsonify(_list_posts_payload()).get_data()
+            hit = (cache.put(key, gen, body), body)
+        return _cached_response(*hit)
     except Exception as e:
         current_app.logger.exception("list_posts failed")
         return jsonify({"error": "internal", "detail": str(e)}), 500
@@ -9,7 +9,9 @@ from app.feed import bp
 from app.feed.models import FeedPost, FeedReaction
 from app.feed.routes.util_has_col import _has_col
 from app.feed.routes.perms_can_view_post import _can_view_post
-from app.feed.routes.reactions_reaction_count import _reaction_count
+from app.feed.routes.util_post_audience import _post_audience
+from app.feed.stats import record_reaction, load_post_stats
+from app.realtime.broker import emit
 
 @bp.post("/<int:post_id>/react")
 @login_required
@@ -34,14 +36,21 @@ def react_post(post_id: int):
 
         if existing:
             db.session.delete(existing)
+            record_reaction(p.id, "👍", -1)
             reacted = False
         else:
-            db.session.add(FeedReaction(post_id=p.id, user_id=current_user.id, emoji="👍", created_at=datetime.utcnow()))
+            now = datetime.utcnow()
+            db.session.add(FeedReaction(post_id=p.id, user_id=current_user.id, emoji="👍", created_at=now))
+            record_reaction(p.id, "👍", +1, at=now)
             reacted = True
 
+        emit("feed_events", {
+            "type": "reaction", "post_id": p.id, "user_id": current_user.id,
+            "emoji": "👍", "reacted": reacted, **_post_audience(p),
+        })
         db.session.commit()
 
-        like_count = _reaction_count(p.id)
+        like_count = load_post_stats([p.id])[p.id]["reactions"].get("👍", 0)
         return jsonify({"ok": True, "counts": {"👍": like_count}, "reacted": reacted})
     except Exception as e:
         current_app.logger.exception("react_post failed")
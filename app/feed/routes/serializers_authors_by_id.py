@@ -0,0 +1,17 @@
+# app/feed/routes/serializers_authors_by_id.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable
+
+from app.models import User
+
+
+def _authors_by_id(ids: Iterable[int | None]) -> Dict[int, Any]:
+    """Load every referenced author in one query (for _safe_author_dict)."""
+    wanted = {int(i) for i in ids if i is not None}
+    if not wanted:
+        return {}
+    try:
+        return {a.id: a for a in User.query.filter(User.id.in_(wanted)).all()}
+    except Exception:
+        return {}
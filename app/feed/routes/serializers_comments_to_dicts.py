@@ -0,0 +1,33 @@
+# app/feed/routes/serializers_comments_to_dicts.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+from app.feed.models import FeedComment
+from app.feed.routes.serializers_safe_author_dict import _safe_author_dict
+from app.feed.routes.serializers_authors_by_id import _authors_by_id
+
+
+def _comments_to_dicts(comments: Iterable["FeedComment"]) -> List[Dict[str, Any]]:
+    """
+    Serialize a page of comments with one author query (same shape as
+    _comment_to_dict(c, with_rel=True)) instead of a lazy load per comment.
+    """
+    comments = [c for c in comments if c is not None]
+    authors = _authors_by_id(getattr(c, "author_id", None) for c in comments)
+
+    out: List[Dict[str, Any]] = []
+    for c in comments:
+        created = getattr(c, "created_at", None)
+        updated = getattr(c, "updated_at", None) or created
+        author_id = getattr(c, "author_id", None)
+        out.append({
+            "id": c.id,
+            "post_id": c.post_id,
+            "html": getattr(c, "html", "") or "",
+            "created_at": created.isoformat() if created else None,
+            "updated_at": updated.isoformat() if updated else None,
+            "author": _safe_author_dict(authors.get(int(author_id)) if author_id is not None else None),
+            "attachments": [],
+        })
+    return out
@@ -0,0 +1,188 @@
+# app/feed/routes/serializers_posts_to_dicts.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Set
+from datetime import datetime
+
+from app.extensions import db
+from app.models import User
+from app.feed.models import (
+    FeedPost,
+    FeedPostAllowedUser,
+    FeedAttachment,
+    FeedReaction,
+    FeedPinnedPost,
+)
+from app.feed.stats import load_post_stats
+from app.feed.routes.serializers_safe_author_dict import _safe_author_dict
+from app.feed.routes.serializers_authors_by_id import _authors_by_id
+
+
+def _attachment_dict(att: "FeedAttachment") -> Dict[str, Any]:
+    return {
+        "id": getattr(att, "id", None),
+        "file_name": getattr(att, "file_name", None),
+        "file_type": getattr(att, "file_type", None) or "",
+        "file_size": getattr(att, "file_size", None),
+        "file_url": getattr(att, "file_url", None),
+        "preview_url": getattr(att, "preview_url", None),
+        "uploaded_at": (getattr(att, "uploaded_at", None) or datetime.utcnow()).isoformat(),
+    }
+
+
+def _allowed_full_name(uid: int, first_name: str | None, last_name: str | None, email: str | None) -> str:
+    fn = (first_name or "").strip()
+    ln = (last_name or "").strip()
+    if fn or ln:
+        return (fn + " " + ln).strip()
+    return email or f"ID {uid}"
+
+
+def _posts_to_dicts(
+    posts: Iterable["FeedPost"],
+    with_rel: bool = True,
+    u: "User | None" = None,
+) -> List[Dict[str, Any]]:
+    """
+    Serialize a whole page of posts with a fixed number of grouped queries
+    (allowed users, authors, attachments, reaction/comment counts, viewer
+    flags) instead of several queries per post. Output matches _post_to_dict.
+    """
+    posts = [p for p in posts if p is not None]
+    if not posts:
+        return []
+
+    ids: List[int] = [int(p.id) for p in posts]
+    viewer_id = getattr(u, "id", None) if u is not None else None
+
+    # ------------------------------------------------------
+    # Allowed users for audience_type="users" (one joined query)
+    # ------------------------------------------------------
+    users_ids = [int(p.id) for p in posts if getattr(p, "audience_type", None) == "users"]
+    allowed_rows: Dict[int, List[tuple]] = {pid: [] for pid in users_ids}
+    if users_ids:
+        try:
+            rows = (
+                db.session.query(
+                    FeedPostAllowedUser.post_id,
+                    FeedPostAllowedUser.user_id,
+                    User.first_name,
+                    User.last_name,
+                    User.email,
+                )
+                .outerjoin(User, User.id == FeedPostAllowedUser.user_id)
+                .filter(FeedPostAllowedUser.post_id.in_(users_ids))
+                .order_by(FeedPostAllowedUser.post_id, FeedPostAllowedUser.added_at, FeedPostAllowedUser.user_id)
+                .all()
+            )
+            for pid, uid, fn, ln, email in rows:
+                allowed_rows[int(pid)].append((uid, fn, ln, email))
+        except Exception:
+            allowed_rows = {pid: [] for pid in users_ids}
+
+    authors: Dict[int, Any] = {}
+    attachments: Dict[int, List[Dict[str, Any]]] = {pid: [] for pid in ids}
+    like_counts: Dict[int, int] = {}
+    comment_counts: Dict[int, int] = {}
+    reacted: Set[int] = set()
+    pinned: Set[int] = set()
+
+    if with_rel:
+        # --- authors ---
+        authors = _authors_by_id(getattr(p, "author_id", None) for p in posts)
+
+        # --- attachments ---
+        try:
+            for att in (FeedAttachment.query
+                        .filter(FeedAttachment.post_id.in_(ids))
+                        .order_by(FeedAttachment.post_id, FeedAttachment.id)
+                        .all()):
+                attachments[int(att.post_id)].append(_attachment_dict(att))
+        except Exception:
+            attachments = {pid: [] for pid in ids}
+
+        # --- 👍 / comment counts from the denormalized stats tables ---
+        try:
+            stats = load_post_stats(ids)
+            like_counts = {pid: st["reactions"].get("👍", 0) for pid, st in stats.items()}
+            comment_counts = {pid: st["comments"] for pid, st in stats.items()}
+        except Exception:
+            like_counts, comment_counts = {}, {}
+
+        # --- viewer flags ---
+        if viewer_id:
+            try:
+                reacted = {
+                    int(pid) for (pid,) in db.session.query(FeedReaction.post_id).filter(
+                        FeedReaction.post_id.in_(ids),
+                        FeedReaction.user_id == viewer_id,
+                        FeedReaction.emoji == "👍",
+                    )
+                }
+            except Exception:
+                reacted = set()
+            try:
+                pinned = {
+                    int(pid) for (pid,) in db.session.query(FeedPinnedPost.post_id).filter(
+                        FeedPinnedPost.post_id.in_(ids),
+                        FeedPinnedPost.user_id == viewer_id,
+                    )
+                }
+            except Exception:
+                pinned = set()
+
+    # ------------------------------------------------------
+    # Assemble in memory
+    # ------------------------------------------------------
+    out: List[Dict[str, Any]] = []
+    for p in posts:
+        pid = int(p.id)
+        author_id = getattr(p, "author_id", None)
+
+        data: Dict[str, Any] = {
+            "id": pid,
+            "title": getattr(p, "title", "") or "",
+            "html": getattr(p, "html", "") or "",
+            "audience_type": getattr(p, "audience_type", "all"),
+            "audience_id": getattr(p, "audience_id", None),
+            "created_at": (getattr(p, "created_at", None) or datetime.utcnow()).isoformat(),
+            "updated_at": (
+                getattr(p, "updated_at", None)
+                or getattr(p, "created_at", None)
+                or datetime.utcnow()
+            ).isoformat(),
+            "is_deleted": bool(getattr(p, "is_deleted", False)),
+        }
+
+        allowed_ids: List[int] = []
+        allowed_users: List[Dict[str, Any]] = []
+        for uid, fn, ln, email in allowed_rows.get(pid, []):
+            try:
+                uid_int = int(uid)
+            except (TypeError, ValueError):
+                continue
+            if uid_int not in allowed_ids:
+                allowed_ids.append(uid_int)
+            # UI list never repeats the author ("Creator > Creator, User1")
+            if author_id is not None and uid_int == int(author_id):
+                continue
+            if not any(uo.get("id") == uid_int for uo in allowed_users):
+                allowed_users.append({"id": uid_int, "full_name": _allowed_full_name(uid_int, fn, ln, email)})
+
+        data["allowed_user_ids"] = allowed_ids
+        if viewer_id and (viewer_id == author_id or viewer_id in allowed_ids):
+            data["allowed_users"] = allowed_users
+        else:
+            data["allowed_users"] = []
+
+        if with_rel:
+            data["author"] = _safe_author_dict(authors.get(int(author_id)) if author_id is not None else None)
+            data["attachments"] = attachments.get(pid, [])
+            data["reactions_summary"] = {"👍": int(like_counts.get(pid, 0))}
+            data["user_reacted"] = pid in reacted
+            data["comments_count"] = int(comment_counts.get(pid, 0))
+            data["user_pinned"] = pid in pinned
+
+        out.append(data)
+
+    return out
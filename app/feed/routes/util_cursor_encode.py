@@ -7,5 +7,9 @@ def _cursor_encode(post: FeedPost | None) -> str | None:
     if not post:
         return None
     dt = getattr(post, "created_at", None) or datetime.utcnow()
-    ms = int(dt.timestamp() * 1000)
+    # naive datetimes are UTC here (datetime.utcnow); _cursor_decode uses utcfromtimestamp
+    if dt.tzinfo is None:
+        ms = int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+    else:
+        ms = int(dt.timestamp() * 1000)
     return f"{ms}.{post.id}"
@@ -0,0 +1,15 @@
+# app/feed/routes/util_post_audience.py
+from __future__ import annotations
+from typing import Any, Dict
+from app.extensions import db
+from app.feed.models import FeedPost, FeedPostAllowedUser
+
+def _post_audience(p: "FeedPost") -> Dict[str, Any]:
+    """Routing fields for realtime events about p: the hub only delivers them to viewers who may see p."""
+    at = (getattr(p, "audience_type", "all") or "all").strip()
+    out: Dict[str, Any] = {"audience_type": at, "audience_id": getattr(p, "audience_id", None)}
+    if at == "users":
+        out["audience_users"] = [
+            uid for (uid,) in db.session.query(FeedPostAllowedUser.user_id).filter_by(post_id=p.id)
+        ]
+    return out
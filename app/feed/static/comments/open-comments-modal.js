@@ -129,33 +129,58 @@ export function openCommentsModal({ FEED_API, postId, focus }) {
     }
   }).catch(()=> { postBox.innerHTML = `<div class="text-danger">Не може да се вчита објавата.</div>`; });
 
-  // list & render
-  const refreshComments = () => {
-    apiGet(`${FEED}/${postId}/comments`).then(data => {
-      const items = data.items || [];
-      if (!items.length) { listBox.innerHTML = `<div class="text-muted">Нема коментари.</div>`; return; }
-      listBox.innerHTML = "";
-      const tree = buildCommentTree(items);
-      tree.roots.forEach(root => {
-        const { renderCommentNode } = window.__comments_cache__ || {};
-        // lazy import avoids circular import if someone bundles differently
-        const render = renderCommentNode
-          ? renderCommentNode
-          : (awaitImportRenderNode());
-        Promise.resolve(render).then(fn => {
-          const node = fn(root);
-          listBox.appendChild(node);
-          const { fillReplies } = window.__comments_cache__ || {};
-          const doFill = fillReplies ? fillReplies : (awaitImportFillReplies());
-          Promise.resolve(doFill).then(fill => {
-            const autoExpand = (lastRepliedParentId && String(lastRepliedParentId) === String(root.id));
-            fill(node, root.id, tree, autoExpand);
-          });
+  // list & render: newest page first, "load older" prepends earlier pages
+  const PAGE = 50;
+  let loaded = [];       // comments shown so far (oldest -> newest)
+  let olderCursor = null;
+
+  const renderComments = () => {
+    if (!loaded.length) { listBox.innerHTML = `<div class="text-muted">Нема коментари.</div>`; return; }
+    listBox.innerHTML = "";
+    if (olderCursor) {
+      listBox.appendChild(el(`<div class="text-center mb-2"><button type="button" class="btn btn-link btn-sm" data-action="load-older">Прикажи постари коментари</button></div>`));
+    }
+    const tree = buildCommentTree(loaded);
+    tree.roots.forEach(root => {
+      const { renderCommentNode } = window.__comments_cache__ || {};
+      // lazy import avoids circular import if someone bundles differently
+      const render = renderCommentNode
+        ? renderCommentNode
+        : (awaitImportRenderNode());
+      Promise.resolve(render).then(fn => {
+        const node = fn(root);
+        listBox.appendChild(node);
+        const { fillReplies } = window.__comments_cache__ || {};
+        const doFill = fillReplies ? fillReplies : (awaitImportFillReplies());
+        Promise.resolve(doFill).then(fill => {
+          const autoExpand = (lastRepliedParentId && String(lastRepliedParentId) === String(root.id));
+          fill(node, root.id, tree, autoExpand);
         });
       });
+    });
+  };
+
+  // reload the newest comments, keeping as many as are already on screen
+  const refreshComments = () => {
+    const limit = Math.min(Math.max(loaded.length, PAGE), 200);
+    apiGet(`${FEED}/${postId}/comments?limit=${limit}`).then(data => {
+      loaded = data.items || [];
+      olderCursor = data.older || null;
+      renderComments();
     }).catch(()=> { listBox.innerHTML = `<div class="text-danger">Не може да се вчитаат коментарите.</div>`; });
   };
 
+  const loadOlder = (btn) => {
+    if (!olderCursor) return;
+    btnBusy(btn, true);
+    apiGet(`${FEED}/${postId}/comments?limit=${PAGE}&before=${encodeURIComponent(olderCursor)}`).then(data => {
+      const seen = new Set(loaded.map(c => String(c.id)));
+      loaded = (data.items || []).filter(c => !seen.has(String(c.id))).concat(loaded);
+      olderCursor = data.older || null;
+      renderComments();
+    }).catch(()=> { btnBusy(btn, false); toast("Не може да се вчитаат коментарите."); });
+  };
+
   // Small dynamic import helpers to keep main file slim in initial parse
   function awaitImportRenderNode() {
     return import("./render-node.js").then(m => {
@@ -172,6 +197,10 @@ export function openCommentsModal({ FEED_API, postId, focus }) {
 
   // delegated interactions on comments list
   listBox.addEventListener("click", (e) => {
+    // Load older page
+    const olderBtn = e.target.closest('[data-action="load-older"]');
+    if (olderBtn) { e.preventDefault(); loadOlder(olderBtn); return; }
+
     // Reply
     const replyBtn = e.target.closest('[data-action="reply"]');
     if (replyBtn) {
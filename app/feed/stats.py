@@ -0,0 +1,255 @@
+# app/feed/stats.py
+"""
+Denormalized per-post counters (feed_post_stats + feed_post_reaction_stats).
+
+Writers call record_comment()/record_reaction() inside their own transaction,
+after adding/deleting the row and before commit, so the counter moves together
+with the data. Increments are single UPDATE ... SET n = n + :d statements; a
+post without a stats row yet is initialized from a real COUNT(*), so legacy
+posts heal themselves on first activity; readers that aggregate the counter
+tables directly call backfill_post_stats() first. rebuild_post_stats()
+recomputes everything (see `flask feed rebuild-stats`).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.feed.models import (
+    FeedPost,
+    FeedComment,
+    FeedReaction,
+    FeedPostStats,
+    FeedPostReactionStats,
+)
+
+
+def _count_comments(post_ids: Iterable[int]) -> Dict[int, int]:
+    q = db.session.query(FeedComment.post_id, func.count(FeedComment.id)).filter(
+        FeedComment.post_id.in_(list(post_ids))
+    )
+    if hasattr(FeedComment, "is_deleted"):
+        q = q.filter(FeedComment.is_deleted.is_(False))
+    return {int(pid): int(n) for pid, n in q.group_by(FeedComment.post_id).all()}
+
+
+def _count_reactions(post_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    out: Dict[int, Dict[str, int]] = {}
+    rows = (
+        db.session.query(FeedReaction.post_id, FeedReaction.emoji, func.count(FeedReaction.id))
+        .filter(FeedReaction.post_id.in_(list(post_ids)))
+        .group_by(FeedReaction.post_id, FeedReaction.emoji)
+        .all()
+    )
+    for pid, emoji, n in rows:
+        out.setdefault(int(pid), {})[emoji] = int(n)
+    return out
+
+
+def _last_activity(post_ids: Iterable[int]) -> Dict[int, datetime]:
+    ids = list(post_ids)
+    out: Dict[int, datetime] = {}
+    for model in (FeedComment, FeedReaction):
+        rows = (
+            db.session.query(model.post_id, func.max(model.created_at))
+            .filter(model.post_id.in_(ids))
+            .group_by(model.post_id)
+            .all()
+        )
+        for pid, ts in rows:
+            if ts is not None and (int(pid) not in out or ts > out[int(pid)]):
+                out[int(pid)] = ts
+    return out
+
+
+def _insert_from_source(post_id: int) -> bool:
+    """
+    Create the stats rows for one post from the source tables (already flushed).
+    False when a concurrent writer created them first: it counted before our
+    uncommitted row existed, so the caller must still apply its own delta.
+    """
+    comments = _count_comments([post_id]).get(post_id, 0)
+    reactions = _count_reactions([post_id]).get(post_id, {})
+    last = _last_activity([post_id]).get(post_id)
+    try:
+        with db.session.begin_nested():
+            db.session.add(FeedPostStats(
+                post_id=post_id,
+                comment_count=comments,
+                reaction_count=sum(reactions.values()),
+                last_activity_at=last,
+            ))
+            for emoji, n in reactions.items():
+                db.session.add(FeedPostReactionStats(post_id=post_id, emoji=emoji, count=n))
+    except IntegrityError:
+        return False
+    return True
+
+
+def init_post_stats(post_id: int) -> None:
+    """Zero row for a freshly created post (call before commit)."""
+    db.session.add(FeedPostStats(post_id=post_id, comment_count=0, reaction_count=0))
+
+
+def record_comment(post_id: int, delta: int, at: Optional[datetime] = None) -> None:
+    """Move comment_count by delta after a comment insert (+1) or delete (-1)."""
+    db.session.flush()
+    values = {"comment_count": FeedPostStats.comment_count + delta}
+    if delta > 0:
+        values["last_activity_at"] = at or datetime.utcnow()
+    stmt = update(FeedPostStats).where(FeedPostStats.post_id == post_id).values(**values)
+    res = db.session.execute(stmt)
+    if not res.rowcount and not _insert_from_source(post_id):
+        db.session.execute(stmt)
+
+
+def record_reaction(post_id: int, emoji: str, delta: int, at: Optional[datetime] = None) -> None:
+    """Move the per-emoji and total reaction counters by delta."""
+    db.session.flush()
+    values = {"reaction_count": FeedPostStats.reaction_count + delta}
+    if delta > 0:
+        values["last_activity_at"] = at or datetime.utcnow()
+    stmt = update(FeedPostStats).where(FeedPostStats.post_id == post_id).values(**values)
+    res = db.session.execute(stmt)
+    if not res.rowcount:
+        if _insert_from_source(post_id):
+            return
+        db.session.execute(stmt)
+
+    res = db.session.execute(
+        update(FeedPostReactionStats)
+        .where(FeedPostReactionStats.post_id == post_id, FeedPostReactionStats.emoji == emoji)
+        .values(count=FeedPostReactionStats.count + delta)
+    )
+    if not res.rowcount and delta > 0:
+        try:
+            with db.session.begin_nested():
+                db.session.add(FeedPostReactionStats(post_id=post_id, emoji=emoji, count=delta))
+        except IntegrityError:
+            db.session.execute(
+                update(FeedPostReactionStats)
+                .where(FeedPostReactionStats.post_id == post_id, FeedPostReactionStats.emoji == emoji)
+                .values(count=FeedPostReactionStats.count + delta)
+            )
+
+
+def load_post_stats(post_ids: Iterable[int]) -> Dict[int, Dict]:
+    """
+    {post_id: {"comments": int, "reactions": {emoji: int}, "last_activity_at": dt|None}}
+    in two queries. Posts without a stats row (created before the table existed)
+    fall back to a grouped aggregate so the numbers are always right.
+    """
+    ids: List[int] = [int(i) for i in post_ids]
+    if not ids:
+        return {}
+
+    out: Dict[int, Dict] = {}
+    for row in FeedPostStats.query.filter(FeedPostStats.post_id.in_(ids)).all():
+        out[int(row.post_id)] = {
+            "comments": int(row.comment_count or 0),
+            "reactions": {},
+            "last_activity_at": row.last_activity_at,
+        }
+    if out:
+        for row in FeedPostReactionStats.query.filter(FeedPostReactionStats.post_id.in_(list(out))).all():
+            if row.count:
+                out[int(row.post_id)]["reactions"][row.emoji] = int(row.count)
+
+    missing = [pid for pid in ids if pid not in out]
+    if missing:
+        comments = _count_comments(missing)
+        reactions = _count_reactions(missing)
+        last = _last_activity(missing)
+        for pid in missing:
+            out[pid] = {
+                "comments": comments.get(pid, 0),
+                "reactions": reactions.get(pid, {}),
+                "last_activity_at": last.get(pid),
+            }
+    return out
+
+
+def backfill_post_stats(since: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """
+    Create the missing stats rows for posts that have none (created before the
+    tables existed, or outside the feed API), optionally only those created
+    since `since`. Commits per batch; returns the number of posts filled.
+    """
+    q = (
+        db.session.query(FeedPost.id)
+        .outerjoin(FeedPostStats, FeedPostStats.post_id == FeedPost.id)
+        .filter(FeedPostStats.post_id.is_(None))
+    )
+    if since is not None:
+        q = q.filter(FeedPost.created_at >= since)
+
+    done = 0
+    while True:
+        ids = [pid for (pid,) in q.order_by(FeedPost.id).limit(batch_size).all()]
+        if not ids:
+            break
+
+        comments = _count_comments(ids)
+        reactions = _count_reactions(ids)
+        last = _last_activity(ids)
+        try:
+            with db.session.begin_nested():
+                for pid in ids:
+                    rx = reactions.get(pid, {})
+                    db.session.add(FeedPostStats(
+                        post_id=pid,
+                        comment_count=comments.get(pid, 0),
+                        reaction_count=sum(rx.values()),
+                        last_activity_at=last.get(pid),
+                    ))
+                    for emoji, n in rx.items():
+                        db.session.add(FeedPostReactionStats(post_id=pid, emoji=emoji, count=n))
+        except IntegrityError:
+            # a concurrent writer initialized some of them: go one post at a time
+            for pid in ids:
+                _insert_from_source(pid)
+        db.session.commit()
+        done += len(ids)
+    return done
+
+
+def rebuild_post_stats(batch_size: int = 500) -> int:
+    """Recompute every stats row from feed_comments / feed_reactions. Returns posts processed."""
+    done = 0
+    last_id = 0
+    while True:
+        ids = [
+            pid for (pid,) in db.session.query(FeedPost.id)
+            .filter(FeedPost.id > last_id)
+            .order_by(FeedPost.id)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            break
+
+        comments = _count_comments(ids)
+        reactions = _count_reactions(ids)
+        last = _last_activity(ids)
+
+        db.session.execute(delete(FeedPostReactionStats).where(FeedPostReactionStats.post_id.in_(ids)))
+        db.session.execute(delete(FeedPostStats).where(FeedPostStats.post_id.in_(ids)))
+        for pid in ids:
+            rx = reactions.get(pid, {})
+            db.session.add(FeedPostStats(
+                post_id=pid,
+                comment_count=comments.get(pid, 0),
+                reaction_count=sum(rx.values()),
+                last_activity_at=last.get(pid),
+            ))
+            for emoji, n in rx.items():
+                db.session.add(FeedPostReactionStats(post_id=pid, emoji=emoji, count=n))
+        db.session.commit()
+
+        done += len(ids)
+        last_id = ids[-1]
+    return done
@@ -0,0 +1,309 @@
+"""
+Materialized per-user home timelines (fan-out on write). Optional: enable with
+FEED_TIMELINE_ENABLED=True.
+
+  - create_post enqueues a "post" job in the same transaction as the post; the
+    worker inserts feed_timeline rows for the audience in user-id batches
+    (FEED_TIMELINE_BATCH), committing progress per batch so a crash resumes.
+  - a new user, or a change of department_id / is_admin, enqueues a "user" job
+    that rebuilds that user's timeline from the live visibility rules, and
+    drops their feed_timeline_state row so reads fall back until it is done.
+  - delete_post removes the post's rows in its own transaction.
+
+list_posts reads the timeline (one range scan on (user_id, created_at, post_id))
+only for users that have a feed_timeline_state row; everyone else gets the
+query-time visibility filter from permissions.py, so enabling this on a live
+database is safe before `flask feed timeline-backfill` has finished.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, delete, event, insert, inspect, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import User
+from .models import (
+    FeedPost,
+    FeedPostAllowedUser,
+    FeedTimelineEntry,
+    FeedTimelineState,
+    FeedFanoutJob,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH = 1000
+MAX_ATTEMPTS = 5
+STALE_AFTER = timedelta(minutes=5)  # "running" jobs not touched for this long are re-claimed
+
+
+def enabled() -> bool:
+    return has_app_context() and bool(current_app.config.get("FEED_TIMELINE_ENABLED"))
+
+
+# -----------------------------------------------------------------------------
+# Writers (called inside the caller's transaction)
+# -----------------------------------------------------------------------------
+def enqueue_post(post_id: int) -> None:
+    if not enabled():
+        return
+    db.session.add(FeedFanoutJob(kind="post", post_id=post_id))
+    db.session.info["feed_fanout_wake"] = True
+
+
+def remove_post(post_id: int) -> None:
+    if not enabled():
+        return
+    db.session.execute(delete(FeedTimelineEntry).where(FeedTimelineEntry.post_id == post_id))
+
+
+def _enqueue_user_on(connection, user_id: int) -> None:
+    connection.execute(delete(FeedTimelineState.__table__).where(FeedTimelineState.user_id == user_id))
+    connection.execute(insert(FeedFanoutJob.__table__).values(
+        kind="user", user_id=user_id, last_user_id=0, status="pending", attempts=0,
+        created_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+    ))
+
+
+def _user_after_insert(mapper, connection, target):
+    if enabled():
+        _enqueue_user_on(connection, target.id)
+        db.session.info["feed_fanout_wake"] = True
+
+
+def _user_after_update(mapper, connection, target):
+    if not enabled():
+        return
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in ("department_id", "is_admin")):
+        _enqueue_user_on(connection, target.id)
+        db.session.info["feed_fanout_wake"] = True
+
+
+# -----------------------------------------------------------------------------
+# Reads
+# -----------------------------------------------------------------------------
+def timeline_queryset(user, tagged_only: bool = False, author_name: Optional[str] = None) -> Optional[Tuple]:
+    """
+    (query, created_col, id_col) over the user's materialized timeline, or None
+    when the timeline is disabled / not built yet for this user.
+    """
+    if not enabled():
+        return None
+    uid = int(getattr(user, "id", 0) or 0)
+    if not uid or db.session.get(FeedTimelineState, uid) is None:
+        return None
+
+    from .permissions import feed_tagged_clause, feed_author_name_clause
+    q = (
+        FeedPost.query
+        .join(FeedTimelineEntry, and_(FeedTimelineEntry.post_id == FeedPost.id, FeedTimelineEntry.user_id == uid))
+        .filter(FeedPost.is_deleted.is_(False))
+    )
+    if tagged_only:
+        q = q.filter(feed_tagged_clause(user))
+    if author_name:
+        q = q.filter(feed_author_name_clause(author_name))
+    return q, FeedTimelineEntry.created_at, FeedTimelineEntry.post_id
+
+
+# -----------------------------------------------------------------------------
+# Jobs
+# -----------------------------------------------------------------------------
+def _recipients(post: FeedPost):
+    """SELECT of user ids that may see the post (mirrors feed_visibility_clause)."""
+    q = select(User.id)
+    if post.audience_type == "sector":
+        q = q.where(or_(User.department_id == post.audience_id, User.is_admin.is_(True)))
+    elif post.audience_type == "users":
+        allowed = select(FeedPostAllowedUser.user_id).where(FeedPostAllowedUser.post_id == post.id)
+        q = q.where(or_(User.id.in_(allowed), User.is_admin.is_(True)))
+    return q
+
+
+def _run_post_job(job: FeedFanoutJob, batch: int) -> None:
+    post = db.session.get(FeedPost, job.post_id)
+    while post is not None and not post.is_deleted:
+        ids = db.session.execute(
+            _recipients(post).where(User.id > job.last_user_id).order_by(User.id).limit(batch)
+        ).scalars().all()
+        if not ids:
+            break
+        have = set(db.session.execute(
+            select(FeedTimelineEntry.user_id).where(
+                FeedTimelineEntry.post_id == post.id, FeedTimelineEntry.user_id.in_(ids)
+            )
+        ).scalars())
+        rows = [{"user_id": uid, "post_id": post.id, "created_at": post.created_at} for uid in ids if uid not in have]
+        if rows:
+            db.session.execute(insert(FeedTimelineEntry), rows)
+        job.last_user_id = ids[-1]
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        _invalidate_cache()
+
+
+def _run_user_job(job: FeedFanoutJob) -> None:
+    user = db.session.get(User, job.user_id)
+    db.session.execute(delete(FeedTimelineEntry).where(FeedTimelineEntry.user_id == job.user_id))
+    if user is not None:
+        from .permissions import feed_queryset_for_current_user
+        visible = feed_queryset_for_current_user(FeedPost.query, user=user).with_entities(
+            literal(user.id), FeedPost.id, FeedPost.created_at
+        )
+        db.session.execute(
+            insert(FeedTimelineEntry).from_select(["user_id", "post_id", "created_at"], visible)
+        )
+        db.session.merge(FeedTimelineState(user_id=user.id, built_at=datetime.utcnow()))
+    db.session.commit()
+    _invalidate_cache()
+
+
+def _invalidate_cache() -> None:
+    from .cache import invalidate
+    invalidate()
+
+
+def _claim_next() -> Optional[FeedFanoutJob]:
+    now = datetime.utcnow()
+    claimable = or_(
+        FeedFanoutJob.status == "pending",
+        and_(FeedFanoutJob.status == "running", FeedFanoutJob.updated_at < now - STALE_AFTER),
+    )
+    while True:
+        job_id = db.session.execute(
+            select(FeedFanoutJob.id).where(claimable).order_by(FeedFanoutJob.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+        claimed = db.session.execute(
+            update(FeedFanoutJob)
+            .where(FeedFanoutJob.id == job_id, claimable)
+            .values(status="running", attempts=FeedFanoutJob.attempts + 1, updated_at=now)
+        ).rowcount
+        db.session.commit()
+        if claimed == 1:  # another worker may have taken it in between
+            return db.session.get(FeedFanoutJob, job_id)
+
+
+def run_pending(max_jobs: Optional[int] = None) -> int:
+    """Process queued fan-out jobs; returns how many finished."""
+    batch = int(current_app.config.get("FEED_TIMELINE_BATCH", DEFAULT_BATCH))
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = _claim_next()
+        if job is None:
+            break
+        try:
+            if job.kind == "post":
+                _run_post_job(job, batch)
+            elif job.kind == "user":
+                _run_user_job(job)
+            job.status = "done"
+            job.error = None
+            db.session.commit()
+            done += 1
+        except Exception as e:
+            db.session.rollback()
+            log.exception("feed fan-out job %s failed", job.id)
+            job = db.session.get(FeedFanoutJob, job.id)
+            if job is not None:
+                job.status = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+                job.error = str(e)[:2000]
+                db.session.commit()
+            if max_jobs is None:
+                break  # let the next wake-up retry instead of spinning
+    return done
+
+
+def enqueue_backfill(user_id: Optional[int] = None) -> int:
+    """Queue "user" jobs for one user or everybody (`flask feed timeline-backfill`)."""
+    q = select(User.id).order_by(User.id)
+    if user_id is not None:
+        q = q.where(User.id == user_id)
+    ids = db.session.execute(q).scalars().all()
+    now = datetime.utcnow()
+    if ids:
+        db.session.execute(insert(FeedFanoutJob), [
+            {"kind": "user", "user_id": uid, "last_user_id": 0, "status": "pending",
+             "attempts": 0, "created_at": now, "updated_at": now}
+            for uid in ids
+        ])
+    db.session.commit()
+    return len(ids)
+
+
+# -----------------------------------------------------------------------------
+# Worker
+# -----------------------------------------------------------------------------
+class _FanoutWorker:
+    """Daemon thread: runs jobs when woken after a commit, and polls for jobs from other processes."""
+
+    def __init__(self, app):
+        self.app = app
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="feed-fanout", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _loop(self):
+        poll = float(self.app.config.get("FEED_TIMELINE_POLL_SECONDS", 5.0))
+        while True:
+            self._wake.wait(timeout=poll)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    run_pending()
+                except Exception:
+                    log.exception("feed fan-out worker iteration failed")
+                finally:
+                    db.session.remove()
+
+
+def _after_commit(session):
+    if session.info.pop("feed_fanout_wake", False) and has_app_context():
+        worker = current_app.extensions.get("feed_fanout_worker")
+        if worker is not None:
+            worker.wake()
+
+
+def _after_rollback(session):
+    session.info.pop("feed_fanout_wake", None)
+
+
+def init_timeline(app) -> None:
+    app.config.setdefault("FEED_TIMELINE_ENABLED", False)
+    app.config.setdefault("FEED_TIMELINE_WORKER", True)
+    app.config.setdefault("FEED_TIMELINE_BATCH", DEFAULT_BATCH)
+    app.config.setdefault("FEED_TIMELINE_POLL_SECONDS", 5.0)
+
+    if not event.contains(User, "after_insert", _user_after_insert):
+        event.listen(User, "after_insert", _user_after_insert)
+        event.listen(User, "after_update", _user_after_update)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
+    if not (app.config["FEED_TIMELINE_ENABLED"] and app.config["FEED_TIMELINE_WORKER"]):
+        return
+    worker = _FanoutWorker(app)
+    app.extensions["feed_fanout_worker"] = worker
+
+    @app.before_request
+    def _start_feed_fanout_worker():
+        worker.start()
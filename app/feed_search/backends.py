@@ -0,0 +1,225 @@
+"""
+Pluggable search backends for feed_search.
+
+Every backend takes the already-visibility-filtered FeedPost query (see
+app/feed/permissions.py::feed_queryset_for_current_user) and adds its own match
+condition, score and snippet columns, so permission rules stay in one place and
+paging happens in the same SQL statement as the match.
+
+  - PostgresFTSBackend: feed_posts.tsv (generated tsvector) + GIN index
+  - SqliteFTS5Backend:  feed_posts_fts FTS5 table (title + tag-stripped body)
+  - IlikeBackend:       substring scan, used when no index is installed
+"""
+from __future__ import annotations
+
+import html as _html
+import re
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.orm import Query
+
+from app.extensions import db
+from app.feed.models import FeedPost
+from .fts import pg_config, sqlite_fts_exists, install_search
+
+MARK_START = "\x02"
+MARK_END = "\x03"
+_BACKEND_TTL = 300  # seconds before availability is re-checked
+
+
+def _tokens(term: str) -> List[str]:
+    return re.findall(r"\w+", term or "", flags=re.UNICODE)[:16]
+
+
+def render_snippet(raw: Optional[str]) -> str:
+    """Markers -> <mark>, everything else (including leftover HTML) escaped."""
+    if not raw:
+        return ""
+    s = re.sub(r"<[^>]*>", " ", raw)
+    # fragments may start/end inside a tag: "class='x'>text" / "text<a href"
+    if ">" in s.split("<", 1)[0]:
+        s = s.split(">", 1)[1]
+    s = re.sub(r"<[^>]*$", " ", s)
+    s = re.sub(r"\s+", " ", _html.unescape(s)).strip()
+    s = _html.escape(s)
+    return s.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def _parse_dt(value: str) -> datetime:
+    try:
+        from dateutil.parser import isoparse  # optional
+        return isoparse(value)  # type: ignore
+    except Exception:
+        return datetime.fromisoformat(value)
+
+
+class SearchBackend(ABC):
+    name = "base"
+    ranked = False
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def match(self, q: Query, tokens: List[str]) -> Tuple[Query, Any, Any]:
+        """Return (query with match condition, score column | None, snippet column | None)."""
+
+    def search(
+        self,
+        base: Query,
+        term: str,
+        sort: str = "relevance",
+        cursor: Optional[Dict[str, str]] = None,
+        limit: int = 10,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        tokens = _tokens(term)
+        if not tokens:
+            return [], None
+        cursor = cursor or {}
+
+        q, score, snippet = self.match(base, tokens)
+        by_rank = sort == "relevance" and score is not None
+        if score is not None:
+            q = q.add_columns(score.label("score"))
+        if snippet is not None:
+            q = q.add_columns(snippet.label("snippet"))
+
+        if by_rank:
+            if cursor.get("after_score") is not None and cursor.get("after_id"):
+                s, i = float(cursor["after_score"]), int(cursor["after_id"])
+                q = q.filter(db.or_(score < s, db.and_(score == s, FeedPost.id < i)))
+            q = q.order_by(score.desc(), FeedPost.id.desc())
+        else:
+            if cursor.get("after_created") and cursor.get("after_id"):
+                ac, i = _parse_dt(cursor["after_created"]), int(cursor["after_id"])
+                q = q.filter(db.or_(
+                    FeedPost.created_at < ac,
+                    db.and_(FeedPost.created_at == ac, FeedPost.id < i),
+                ))
+            q = q.order_by(FeedPost.created_at.desc(), FeedPost.id.desc())
+
+        rows = q.limit(limit + 1).all()
+        hits: List[Dict[str, Any]] = []
+        for row in rows[:limit]:
+            if score is None and snippet is None:
+                post, data = row, {}
+            else:
+                post, data = row[0], row._mapping
+            raw = data.get("snippet")
+            hits.append({
+                "post": post,
+                "score": float(data["score"]) if data.get("score") is not None else None,
+                "snippet": render_snippet(raw) if raw else self.fallback_snippet(post, tokens),
+            })
+
+        next_cursor = None
+        if len(rows) > limit and hits:
+            last = hits[-1]
+            if by_rank:
+                next_cursor = {"after_score": repr(last["score"]), "after_id": last["post"].id}
+            else:
+                next_cursor = {"after_created": last["post"].created_at.isoformat(), "after_id": last["post"].id}
+        return hits, next_cursor
+
+    def fallback_snippet(self, post: FeedPost, tokens: List[str], width: int = 240) -> str:
+        plain = re.sub(r"\s+", " ", _html.unescape(re.sub(r"<[^>]*>", " ", post.html or ""))).strip()
+        low = plain.lower()
+        pos = min((low.find(t.lower()) for t in tokens if low.find(t.lower()) >= 0), default=0)
+        start = max(0, pos - width // 3)
+        excerpt = plain[start:start + width]
+        for t in sorted(set(tokens), key=len, reverse=True):
+            excerpt = re.sub(f"({re.escape(t)})", MARK_START + r"\1" + MARK_END, excerpt, flags=re.IGNORECASE)
+        return ("…" if start else "") + render_snippet(excerpt) + ("…" if start + width < len(plain) else "")
+
+
+class IlikeBackend(SearchBackend):
+    name = "ilike"
+
+    def match(self, q, tokens):
+        for t in tokens:
+            like = f"%{t}%"
+            q = q.filter(db.or_(FeedPost.title.ilike(like), FeedPost.html.ilike(like)))
+        return q, None, None
+
+
+class SqliteFTS5Backend(SearchBackend):
+    name = "sqlite_fts5"
+    ranked = True
+
+    def available(self) -> bool:
+        with db.engine.connect() as conn:
+            if not sqlite_fts_exists(conn):
+                # dev databases: creating the FTS table is cheap, do it on first use
+                install_search()
+        return True
+
+    def match(self, q, tokens):
+        fts_tbl = table("feed_posts_fts", column("rowid"))
+        fts = literal_column("feed_posts_fts")
+        expr = " ".join('"%s"*' % t for t in tokens)
+        q = q.join(fts_tbl, fts_tbl.c.rowid == FeedPost.id).filter(fts.op("MATCH")(expr))
+        # bm25: lower is better (title weighted 10x) -> negate so every backend sorts score DESC
+        score = func.bm25(fts, 10.0, 1.0) * -1
+        snippet = func.snippet(fts, 1, MARK_START, MARK_END, "…", 32)
+        return q, score, snippet
+
+
+class PostgresFTSBackend(SearchBackend):
+    name = "postgres_fts"
+    ranked = True
+
+    def available(self) -> bool:
+        row = db.session.execute(text("""
+            SELECT to_regclass('public.idx_feed_posts_fts') IS NOT NULL
+               AND EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name='feed_posts' AND column_name='tsv')
+        """)).scalar()
+        return bool(row)
+
+    def match(self, q, tokens):
+        cfg = literal_column(f"'{pg_config()}'::regconfig")
+        tsq = func.to_tsquery(cfg, " & ".join(f"{t}:*" for t in tokens))
+        tsv = literal_column("feed_posts.tsv")
+        q = q.filter(tsv.op("@@")(tsq))
+        score = func.ts_rank_cd(tsv, tsq)
+        body = func.regexp_replace(func.coalesce(FeedPost.html, ""), "<[^>]+>", " ", "g")
+        snippet = func.ts_headline(
+            cfg, body, tsq,
+            f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=12, "
+            "MaxFragments=2, FragmentDelimiter=\" … \"",
+        )
+        return q, score, snippet
+
+
+def get_backend() -> SearchBackend:
+    """Best available backend for the current database, cached per process."""
+    cached = current_app.extensions.get("feed_search_backend")
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    forced = (current_app.config.get("FEED_SEARCH_BACKEND") or "").strip().lower()
+    dialect = db.engine.dialect.name
+    candidates: List[SearchBackend] = []
+    if forced != "ilike":
+        if dialect == "postgresql":
+            candidates.append(PostgresFTSBackend())
+        elif dialect == "sqlite":
+            candidates.append(SqliteFTS5Backend())
+
+    backend: SearchBackend = IlikeBackend()
+    for cand in candidates:
+        try:
+            if cand.available():
+                backend = cand
+                break
+        except Exception:
+            current_app.logger.exception("feed search backend %s unavailable", cand.name)
+            db.session.rollback()
+
+    current_app.extensions["feed_search_backend"] = (backend, time.monotonic() + _BACKEND_TTL)
+    return backend
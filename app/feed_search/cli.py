@@ -0,0 +1,23 @@
+# app/feed_search/cli.py
+import click
+from flask.cli import AppGroup
+
+feed_search_cli = AppGroup("feed-search", help="Feed full-text search index commands")
+
+
+@feed_search_cli.command("install")
+def install():
+    """Create the FTS index (Postgres tsvector+GIN or SQLite FTS5 + triggers)."""
+    from app.feed_search.fts import install_search
+
+    install_search()
+    click.echo("Feed search index installed.")
+
+
+@feed_search_cli.command("rebuild")
+def rebuild():
+    """Drop and rebuild the FTS index from feed_posts."""
+    from app.feed_search.fts import rebuild_search
+
+    rebuild_search()
+    click.echo("Feed search index rebuilt.")
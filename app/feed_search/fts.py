@@ -1,11 +1,27 @@
+import html as _html
+import re
 from textwrap import dedent
-from sqlalchemy import text
+from flask import current_app
+from sqlalchemy import event, inspect, text
 from app.extensions import db
+from app.feed.models import FeedPost
 
-SQL = dedent("""
+# Text search configuration for PostgreSQL. Posts are mostly Macedonian, so the
+# language-neutral 'simple' config is the default; override with FEED_SEARCH_PG_CONFIG.
+DEFAULT_PG_CONFIG = "simple"
+
+
+def pg_config() -> str:
+    cfg = (current_app.config.get("FEED_SEARCH_PG_CONFIG") or DEFAULT_PG_CONFIG).strip()
+    if not re.fullmatch(r"[a-z_]+", cfg):
+        raise ValueError(f"Invalid text search config: {cfg!r}")
+    return cfg
+
+
+PG_SQL = dedent("""
 -- Full-text search for feed_posts
 -- Requires PostgreSQL.
--- Language: english (adjust to your needs).
+-- Language: {cfg} (FEED_SEARCH_PG_CONFIG).
 
 -- Add generated tsvector column (safe if already exists)
 DO $$
@@ -17,8 +33,8 @@ BEGIN
     ALTER TABLE feed_posts
       ADD COLUMN tsv tsvector
       GENERATED ALWAYS AS (
-        setweight(to_tsvector('english', coalesce(title,'')), 'A') ||
-        setweight(to_tsvector('english', regexp_replace(coalesce(html,''), '<[^>]+>', ' ', 'g')), 'B')
+        setweight(to_tsvector('{cfg}', coalesce(title,'')), 'A') ||
+        setweight(to_tsvector('{cfg}', regexp_replace(coalesce(html,''), '<[^>]+>', ' ', 'g')), 'B')
       ) STORED;
   END IF;
 END$$;
@@ -28,6 +44,153 @@ DROP INDEX IF EXISTS idx_feed_posts_fts;
 CREATE INDEX idx_feed_posts_fts ON feed_posts USING GIN (tsv);
 """)
 
+# Rebuild = drop the generated column so PG_SQL recreates it (new config / corrupt data)
+PG_DROP_SQL = dedent("""
+DROP INDEX IF EXISTS idx_feed_posts_fts;
+ALTER TABLE feed_posts DROP COLUMN IF EXISTS tsv;
+""")
+
+# SQLite: FTS5 table with its own content (rowid = feed_posts.id) holding the
+# title and the tag-stripped body. SQLite has no regexp_replace for a trigger to
+# strip markup with, so the rows are written by the FeedPost mapper listeners
+# below, on the flushing connection, like app/search/indexer.py does.
+SQLITE_SQL = dedent("""
+CREATE VIRTUAL TABLE IF NOT EXISTS feed_posts_fts USING fts5(
+  title, body,
+  tokenize='unicode61 remove_diacritics 2'
+);
+""")
+
+# Earlier installs: external-content table over the raw html + sync triggers
+SQLITE_LEGACY_SQL = dedent("""
+DROP TRIGGER IF EXISTS trg_feed_posts_fts_ai;
+DROP TRIGGER IF EXISTS trg_feed_posts_fts_ad;
+DROP TRIGGER IF EXISTS trg_feed_posts_fts_au;
+DROP TABLE IF EXISTS feed_posts_fts;
+""")
+
+SQLITE_BATCH = 500
+
+
+def plain_text(value) -> str:
+    """Post html -> the text a reader sees (tags dropped, entities decoded)."""
+    if not value:
+        return ""
+    s = re.sub(r"<[^>]+>", " ", value)
+    return re.sub(r"\s+", " ", _html.unescape(s)).strip()
+
+
+def _sqlite_statements(sql: str):
+    # sqlite3 executes one statement at a time; trigger bodies contain ';'
+    buf = []
+    for line in sql.strip().splitlines():
+        buf.append(line)
+        stmt = "\n".join(buf).strip()
+        if stmt.endswith(";") and (not stmt.upper().startswith("CREATE TRIGGER") or stmt.upper().endswith("END;")):
+            yield stmt
+            buf = []
+
+
+def _sqlite_fts_sql(conn):
+    row = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='feed_posts_fts'"
+    )).first()
+    return None if row is None else (row[0] or "")
+
+
+def sqlite_fts_exists(conn) -> bool:
+    """True once the current (plain-text) index is installed; a legacy table does not count."""
+    sql = _sqlite_fts_sql(conn)
+    return sql is not None and "content=" not in sql
+
+
+def _sqlite_fill(conn) -> None:
+    """(Re)write every feed_posts_fts row from feed_posts, in id batches."""
+    conn.execute(text("DELETE FROM feed_posts_fts"))
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, title, html FROM feed_posts WHERE id > :last ORDER BY id LIMIT :n"
+        ), {"last": last_id, "n": SQLITE_BATCH}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text("INSERT INTO feed_posts_fts(rowid, title, body) VALUES (:id, :title, :body)"),
+            [{"id": r[0], "title": r[1] or "", "body": plain_text(r[2])} for r in rows],
+        )
+        last_id = rows[-1][0]
+
+
 def install_search():
+    """Create the search index for the current dialect (idempotent)."""
+    dialect = db.engine.dialect.name
     with db.engine.begin() as conn:
-        conn.execute(text(SQL))
+        if dialect == "postgresql":
+            conn.execute(text(PG_SQL.format(cfg=pg_config())))
+        elif dialect == "sqlite":
+            if _sqlite_fts_sql(conn) is not None and not sqlite_fts_exists(conn):
+                for stmt in _sqlite_statements(SQLITE_LEGACY_SQL):
+                    conn.execute(text(stmt))
+            fresh = not sqlite_fts_exists(conn)
+            for stmt in _sqlite_statements(SQLITE_SQL):
+                conn.execute(text(stmt))
+            if fresh:
+                _sqlite_fill(conn)
+        else:
+            raise RuntimeError(f"Full-text search not supported on {dialect}")
+    _reset_backend_cache()
+
+
+def rebuild_search():
+    """Rebuild the index from feed_posts (e.g. after bulk imports or a config change)."""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        with db.engine.begin() as conn:
+            conn.execute(text(PG_DROP_SQL))
+        install_search()
+    elif dialect == "sqlite":
+        install_search()
+        with db.engine.begin() as conn:
+            _sqlite_fill(conn)
+            conn.execute(text("INSERT INTO feed_posts_fts(feed_posts_fts) VALUES ('optimize')"))
+    else:
+        raise RuntimeError(f"Full-text search not supported on {dialect}")
+    _reset_backend_cache()
+
+
+def _reset_backend_cache():
+    try:
+        current_app.extensions.pop("feed_search_backend", None)
+    except RuntimeError:
+        pass
+
+
+# -----------------------------------------------------------------------------
+# SQLite index maintenance
+# -----------------------------------------------------------------------------
+def _sqlite_index_post(connection, target, delete_only: bool = False) -> None:
+    if connection.dialect.name != "sqlite" or not sqlite_fts_exists(connection):
+        return
+    connection.execute(text("DELETE FROM feed_posts_fts WHERE rowid = :id"), {"id": target.id})
+    if not delete_only:
+        connection.execute(
+            text("INSERT INTO feed_posts_fts(rowid, title, body) VALUES (:id, :title, :body)"),
+            {"id": target.id, "title": target.title or "", "body": plain_text(target.html)},
+        )
+
+
+@event.listens_for(FeedPost, "after_insert")
+def _fts_after_insert(mapper, connection, target):
+    _sqlite_index_post(connection, target)
+
+
+@event.listens_for(FeedPost, "after_update")
+def _fts_after_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.title.history.has_changes() or state.attrs.html.history.has_changes():
+        _sqlite_index_post(connection, target)
+
+
+@event.listens_for(FeedPost, "after_delete")
+def _fts_after_delete(mapper, connection, target):
+    _sqlite_index_post(connection, target, delete_only=True)
@@ -37,10 +37,8 @@
     if (reset){ cursor = null; list.innerHTML = ""; }
     const url = new URL(API + "/", window.location.origin);
     url.searchParams.set("q", q);
-    if (cursor?.after_created && cursor?.after_id){
-      url.searchParams.set("after_created", cursor.after_created);
-      url.searchParams.set("after_id", cursor.after_id);
-    }
+    // cursor is opaque: {after_score|after_created, after_id}
+    Object.entries(cursor || {}).forEach(([k, v]) => url.searchParams.set(k, v));
     const res = await jfetch(url.toString());
     if (!res.ok) return;
     cursor = res.next || null;
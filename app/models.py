@@ -7,6 +7,7 @@ from werkzeug.utils import secure_filename
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from . import blobs
 from .extensions import db
 
 from sqlalchemy.orm import validates, relationship, backref
@@ -558,7 +559,7 @@ class Attachment(db.Model):
 
         # Save
         abs_path = os.path.join(upload_root, stored)
-        file_storage.save(abs_path)
+        blobs.save(file_storage, abs_path)
 
         # Create row
         att = cls(
@@ -0,0 +1,24 @@
+# app/notifications/cli.py
+import click
+from flask.cli import AppGroup
+
+notifications_cli = AppGroup("notifications", help="Notification maintenance commands")
+
+
+@notifications_cli.command("archive")
+@click.option("--days", type=int, default=None, help="Age in days (default NOTIF_RETENTION_DAYS).")
+@click.option("--batch-size", type=int, default=None, help="Rows per transaction (default NOTIF_RETENTION_BATCH).")
+@click.option("--dry-run", is_flag=True, help="Only count what would be moved.")
+def archive(days, batch_size, dry_run: bool):
+    """Move old read notifications to notifications_archive."""
+    from flask import current_app
+    from app.notifications.retention import archive_read_notifications, count_archivable
+
+    days = days if days is not None else int(current_app.config.get("NOTIF_RETENTION_DAYS", 0) or 0)
+    if days <= 0:
+        raise click.UsageError("Pass --days N or set NOTIF_RETENTION_DAYS.")
+    if dry_run:
+        click.echo(f"{count_archivable(days)} read notification(s) older than {days} day(s) would be archived.")
+        return
+    n = archive_read_notifications(days=days, batch_size=batch_size)
+    click.echo(f"Archived {n} notification(s).")
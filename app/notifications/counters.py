@@ -0,0 +1,256 @@
+# app/notifications/counters.py
+"""
+Per-user badge counters (user_counters), so the count endpoints every open tab
+asks for are a primary-key lookup instead of a COUNT(*).
+
+A counter is registered with the model it counts, the attribute deciding
+membership and the SQL condition to rebuild it from:
+  notifications  Notification rows with is_read = false
+  invitations    EventAttendee rows still INVITED (registered by callendar)
+
+A Session after_flush hook keeps them in step for every ORM write path
+(create_notification, the calendar fallbacks, mark-read, RSVPs, cascades):
+rows entering the set +1, leaving it or deleted -1. Bulk statements bypass
+the ORM and call adjust() / adjust_many() themselves (mark_all_read(),
+create_notifications_bulk()). A missing row is built from COUNT(*) the first
+time it is touched.
+
+Each change is emitted after commit as notif_events
+{"type": "unread_changed", "user_id", "counter", "count"}: browsers update
+their badge from it and every worker's hub listener refreshes its in-process
+cache (entries otherwise expire after NOTIF_COUNTER_CACHE_SECONDS).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event, func, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from app.extensions import db
+from app.realtime.broker import emit
+from .models import Notification, UserCounter
+
+_T = UserCounter.__table__
+_RECOUNT = object()  # delta marker: previous value unknown, rebuild from COUNT(*)
+
+
+@dataclass(frozen=True)
+class CounterSpec:
+    name: str
+    model: type
+    attr: str
+    member: Callable[[Any], bool]  # attribute value -> counted?
+    condition: Callable[[], Any]  # SQL condition of counted rows (user_id is added)
+
+
+_specs: Dict[str, CounterSpec] = {}
+_cache: Dict[Tuple[str, int], Tuple[float, int]] = {}
+_cache_lock = threading.Lock()
+_settings = {"ttl": 30.0}
+
+
+def register_counter(name: str, model: type, attr: str, member: Callable[[Any], bool],
+                     condition: Callable[[], Any]) -> None:
+    _specs[name] = CounterSpec(name, model, attr, member, condition)
+
+
+# -----------------------------------------------------------------------------
+# In-process cache
+# -----------------------------------------------------------------------------
+def _cache_put(name: str, user_id: int, value: int) -> None:
+    with _cache_lock:
+        _cache[(name, int(user_id))] = (time.monotonic() + _settings["ttl"], int(value))
+
+
+def _cache_get(name: str, user_id: int) -> Optional[int]:
+    with _cache_lock:
+        hit = _cache.get((name, int(user_id)))
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Storage (all inside the caller's transaction)
+# -----------------------------------------------------------------------------
+def _count(conn, spec: CounterSpec, user_id: int) -> int:
+    q = (select(func.count()).select_from(spec.model)
+         .where(spec.model.user_id == user_id, spec.condition()))
+    return int(conn.execute(q).scalar() or 0)
+
+
+def _create(conn, spec: CounterSpec, user_id: int) -> Optional[int]:
+    """Insert the row from COUNT(*); None when another transaction created it first."""
+    n = _count(conn, spec, user_id)
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(_T).values(user_id=user_id, name=spec.name, value=n, updated_at=datetime.utcnow()))
+    except IntegrityError:
+        return None
+    return n
+
+
+def _create_many(conn, spec: CounterSpec, user_ids: list) -> Optional[Dict[int, int]]:
+    """_create() for several users: one grouped COUNT(*) and one INSERT."""
+    counts = dict.fromkeys(user_ids, 0)
+    q = (select(spec.model.user_id, func.count()).where(spec.model.user_id.in_(user_ids), spec.condition())
+         .group_by(spec.model.user_id))
+    counts.update({int(uid): int(n) for uid, n in conn.execute(q)})
+    now = datetime.utcnow()
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(_T), [{"user_id": uid, "name": spec.name, "value": n, "updated_at": now}
+                                      for uid, n in counts.items()])
+    except IntegrityError:
+        return None
+    return counts
+
+
+def _store(conn, spec: CounterSpec, user_id: int, delta) -> int:
+    """Apply delta (or _RECOUNT) to the row, creating it when missing; returns the new value."""
+    while True:
+        value = _count(conn, spec, user_id) if delta is _RECOUNT else _T.c.value + delta
+        new = conn.execute(
+            update(_T).where(_T.c.user_id == user_id, _T.c.name == spec.name)
+            .values(value=value, updated_at=datetime.utcnow())
+            .returning(_T.c.value)
+        ).scalar()
+        if new is None:
+            new = _create(conn, spec, user_id)  # the count already includes this change
+        if new is not None:
+            return int(new)
+
+
+def adjust(session, user_id: int, name: str, delta) -> int:
+    """Change a counter inside session's transaction and emit unread_changed on commit."""
+    value = _store(session.connection(), _specs[name], int(user_id), delta)
+    emit("notif_events", {"type": "unread_changed", "user_id": int(user_id), "counter": name, "count": value},
+         session=session)
+    return value
+
+
+def adjust_many(session, name: str, deltas: Dict[int, int]) -> Dict[int, int]:
+    """adjust() for many users: one UPDATE per distinct delta, then the missing rows one by one."""
+    if name not in _specs:
+        return {}
+    conn = session.connection()
+    by_delta: Dict[int, list] = {}
+    for user_id, d in deltas.items():
+        if d:
+            by_delta.setdefault(int(d), []).append(int(user_id))
+    values: Dict[int, int] = {}
+    for d, user_ids in by_delta.items():
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i:i + 500]
+            res = conn.execute(
+                update(_T).where(_T.c.name == name, _T.c.user_id.in_(chunk))
+                .values(value=_T.c.value + d, updated_at=datetime.utcnow())
+                .returning(_T.c.user_id, _T.c.value)
+            )
+            values.update({int(uid): int(v) for uid, v in res})
+            missing = [uid for uid in chunk if uid not in values]
+            if missing:
+                created = _create_many(conn, _specs[name], missing)
+                if created is None:  # raced with another transaction: row by row
+                    created = {uid: _store(conn, _specs[name], uid, d) for uid in missing}
+                values.update(created)
+    for user_id, value in values.items():
+        emit("notif_events", {"type": "unread_changed", "user_id": user_id, "counter": name, "count": value},
+             session=session)
+    return values
+
+
+def get(name: str, user_id: int, commit: bool = True) -> int:
+    """Current value: cache, else the counter row (built from COUNT(*) if missing)."""
+    hit = _cache_get(name, user_id)
+    if hit is not None:
+        return hit
+    row = (select(_T.c.value).where(_T.c.user_id == int(user_id), _T.c.name == name))
+    value = db.session.execute(row).scalar()
+    if value is None:
+        value = _create(db.session.connection(), _specs[name], int(user_id))
+        if value is None:
+            value = db.session.execute(row).scalar()
+        if commit:
+            db.session.commit()
+    _cache_put(name, user_id, value)
+    return int(value)
+
+
+def mark_all_read(user_id: int) -> int:
+    """Bulk mark-read (caller commits); returns the number of notifications changed."""
+    n = (Notification.query.filter_by(user_id=user_id, is_read=False)
+         .update({"is_read": True}, synchronize_session=False))
+    if n:
+        adjust(db.session(), user_id, "notifications", -n)
+    return n
+
+
+# -----------------------------------------------------------------------------
+# Wiring
+# -----------------------------------------------------------------------------
+def _deltas(session) -> Dict[Tuple[str, int], Any]:
+    out: Dict[Tuple[str, int], Any] = {}
+
+    def add(spec, obj, d):
+        key = (spec.name, int(obj.user_id))
+        if d is _RECOUNT or out.get(key) is _RECOUNT:
+            out[key] = _RECOUNT
+        elif d:
+            out[key] = out.get(key, 0) + d
+
+    for spec in _specs.values():
+        for obj in session.new:
+            if isinstance(obj, spec.model) and spec.member(getattr(obj, spec.attr)):
+                add(spec, obj, +1)
+        for obj in session.deleted:
+            if isinstance(obj, spec.model):
+                old = inspect(obj).attrs[spec.attr].loaded_value
+                add(spec, obj, _RECOUNT if old is NO_VALUE else -int(spec.member(old)))
+        for obj in session.dirty:
+            if not isinstance(obj, spec.model):
+                continue
+            hist = inspect(obj).attrs[spec.attr].history
+            if not hist.added:
+                continue
+            if not hist.deleted:
+                add(spec, obj, _RECOUNT)  # changed without being loaded first
+                continue
+            add(spec, obj, int(spec.member(hist.added[0])) - int(spec.member(hist.deleted[0])))
+    return out
+
+
+def _after_flush(session, flush_context):
+    if not _specs:
+        return
+    for (name, user_id), delta in _deltas(session).items():
+        adjust(session, user_id, name, delta)
+
+
+def _on_hub_event(payload: Dict[str, Any]) -> None:
+    if payload.get("channel") == "notif_events" and payload.get("type") == "unread_changed":
+        try:
+            _cache_put(payload["counter"], int(payload["user_id"]), int(payload["count"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+
+def init_counters(app) -> None:
+    app.config.setdefault("NOTIF_COUNTER_CACHE_SECONDS", 30)
+    _settings["ttl"] = float(app.config["NOTIF_COUNTER_CACHE_SECONDS"])
+
+    register_counter("notifications", Notification, "is_read",
+                     member=lambda v: not v, condition=lambda: Notification.is_read.is_(False))
+
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+    from app.realtime.broker import hub
+    hub.add_listener(_on_hub_event)
@@ -44,10 +44,8 @@ def _iso_utc_z(dt: datetime) -> str:
     return dt.isoformat().replace("+00:00", "Z")
 
 
-class Notification(db.Model):
-    __tablename__ = "notifications"
-
-    id = db.Column(db.Integer, primary_key=True)
+class _NotificationFields:
+    """Columns and to_dict() shared by the hot table and its archive."""
     user_id = db.Column(db.Integer, index=True, nullable=False)
 
     # ✅ make sure we NEVER insert NULL here
@@ -81,3 +79,37 @@ class Notification(db.Model):
             # legacy
             "created_at": created.isoformat(),
         }
+
+
+class Notification(_NotificationFields, db.Model):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        # list (user_id [, is_read] ORDER BY created_at DESC, id DESC) and unread counts
+        db.Index("ix_notifications_user_read_created_id", "user_id", "is_read", "created_at", "id"),
+        # reminder de-dupe (user_id, title, created_at >= since)
+        db.Index("ix_notifications_user_title_created", "user_id", "title", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+
+class NotificationArchive(_NotificationFields, db.Model):
+    """Read notifications moved out of the hot table by app.notifications.retention (same ids)."""
+    __tablename__ = "notifications_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UserCounter(db.Model):
+    """
+    Per-user badge counters ("notifications" = unread notifications,
+    "invitations" = pending calendar invitations), kept in step with their
+    tables by app.notifications.counters.
+    """
+    __tablename__ = "user_counters"
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
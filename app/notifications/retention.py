@@ -0,0 +1,74 @@
+# app/notifications/retention.py
+"""
+Keeps the hot notifications table small: read notifications older than
+NOTIF_RETENTION_DAYS are moved to notifications_archive (same id, same
+columns + archived_at) in batches of NOTIF_RETENTION_BATCH rows, one
+transaction per batch, so no long lock is held on the table.
+
+Unread rows are never moved (the unread counters stay valid). Runs daily
+from the app scheduler when NOTIF_RETENTION_DAYS > 0, or by hand:
+`flask notifications archive [--days N] [--dry-run]`.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select
+
+from app.extensions import db
+from .models import Notification, NotificationArchive
+
+DEFAULT_BATCH = 1000
+
+_COLUMNS = ("id", "user_id", "kind", "title", "body", "link_url", "meta", "is_read", "created_at")
+
+
+def _cutoff(days: int) -> datetime:
+    return datetime.utcnow() - timedelta(days=int(days))
+
+
+def _candidates(cutoff: datetime):
+    return (Notification.is_read.is_(True), Notification.created_at < cutoff)
+
+
+def count_archivable(days: int) -> int:
+    q = select(func.count()).select_from(Notification).where(*_candidates(_cutoff(days)))
+    return int(db.session.execute(q).scalar() or 0)
+
+
+def archive_read_notifications(days: Optional[int] = None, batch_size: Optional[int] = None,
+                               max_batches: Optional[int] = None) -> int:
+    """Move read notifications older than `days` to the archive; returns rows moved."""
+    cfg = current_app.config
+    days = int(days if days is not None else cfg.get("NOTIF_RETENTION_DAYS", 0) or 0)
+    batch_size = int(batch_size or cfg.get("NOTIF_RETENTION_BATCH", DEFAULT_BATCH))
+    if days <= 0:
+        return 0
+
+    cutoff = _cutoff(days)
+    src = [getattr(Notification, c) for c in _COLUMNS]
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            select(Notification.id).where(*_candidates(cutoff)).order_by(Notification.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        try:
+            now = datetime.utcnow()
+            db.session.execute(insert(NotificationArchive).from_select(
+                [*_COLUMNS, "archived_at"],
+                select(*src, literal(now, NotificationArchive.archived_at.type)).where(Notification.id.in_(ids)),
+            ))
+            db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            # e.g. another worker archived the same batch first (primary key clash)
+            db.session.rollback()
+            current_app.logger.exception("notifications retention: batch starting at id %s failed", ids[0])
+            break
+        moved += len(ids)
+        batches += 1
+    return moved
@@ -5,8 +5,8 @@ from typing import List, Dict, Any, Tuple
 from flask import jsonify, request, render_template, abort, current_app
 from flask_login import login_required, current_user
 
-from . import bp
-from .models import Notification
+from . import bp, counters
+from .models import Notification, NotificationArchive
 from app.extensions import db
 
 
@@ -40,6 +40,9 @@ def index():
 @login_required
 def view(nid: int):
     n = Notification.query.filter_by(id=nid, user_id=current_user.id).first()
+    if not n:
+        # old read notifications live in the archive (app.notifications.retention)
+        n = NotificationArchive.query.filter_by(id=nid, user_id=current_user.id).first()
     if not n:
         abort(404)
     panel = render_template("notifications/view.html", n=n)
@@ -107,11 +110,23 @@ def api_list_notifications():
     return jsonify({"items": _serialize_list(rows)})
 
 
+def counter_response(body: Dict[str, Any], etag: str):
+    """JSON counter with an ETag; 304 when the client already has this value."""
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = jsonify(body)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
 @bp.route("/api/notifications/count", methods=["GET"])
 @login_required
 def api_notifications_count():
-    unread = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
-    return jsonify({"unread": unread})
+    # kept by app.notifications.counters; changes are also pushed as notif_events "unread_changed"
+    unread = counters.get("notifications", current_user.id)
+    return counter_response({"unread": unread}, f"notifications-{current_user.id}-{unread}")
 
 
 @bp.route("/api/notifications/<int:nid>/read", methods=["POST"])
@@ -129,7 +144,7 @@ def api_notifications_mark_read(nid: int):
 @bp.route("/api/notifications/read-all", methods=["POST"])
 @login_required
 def api_notifications_mark_all_read():
-    Notification.query.filter_by(user_id=current_user.id, is_read=False).update({"is_read": True})
+    counters.mark_all_read(current_user.id)
     db.session.commit()
     return jsonify({"ok": True})
 
@@ -1,8 +1,13 @@
 # app/notifications/service.py
 from __future__ import annotations
-from typing import Dict, Any, Optional, List
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional, List, Tuple, Union
 from flask import current_app
+from sqlalchemy import insert
 from app.extensions import db
+from app.realtime.broker import emit
 from .models import Notification
 
 # -------------------------------------------------------------------
@@ -16,6 +21,8 @@ TEMPLATES: Dict[str, str] = {
     "generic":         "ℹ️ {message}",
 }
 
+DEFAULT_TITLE = "Нотификација"
+
 RESPONSE_DISPLAY = {
     "ACCEPTED":  "ПРИФАТЕН",
     "DECLINED":  "ОДБИЕН",
@@ -122,13 +129,75 @@ def create_notification(
     n = Notification(
         user_id=user_id,
         kind=kind_val,  # ✅ never NULL
-        title=(title or "Нотификација").strip(),
+        title=(title or DEFAULT_TITLE).strip(),
         body=(rendered_text or None),
         link_url=(link_url or None),
         meta=(meta or None),
         is_read=False,
     )
     db.session.add(n)
+    db.session.flush()
+    emit("notif_events", {
+        "type": n.kind, "id": n.id, "user_id": n.user_id,
+        "title": n.title, "link_url": n.link_url,
+    })
     if commit:
         db.session.commit()
     return n
+
+
+Recipient = Union[int, Tuple[int, Optional[Dict[str, Any]]]]
+
+
+def create_notifications_bulk(
+    recipients: Iterable[Recipient],
+    *,
+    title: str,
+    body: Optional[str] = None,
+    link_url: Optional[str] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    kind: Optional[str] = None,
+    commit: bool = True,
+) -> List[int]:
+    """
+    create_notification() for many users in one INSERT (batched VALUES) and one
+    commit; returns the new ids.
+    - recipients: user ids, or (user_id, extra_meta) pairs for per-user context;
+      the body is rendered once per distinct meta.
+    - Unread counters and notif_events go out in one batch with the commit.
+    """
+    base = dict(meta or {})
+    title_val = (title or DEFAULT_TITLE).strip()
+    fixed_body = body.strip() if body else ""
+    now = datetime.utcnow()
+
+    rendered: Dict[str, Tuple[str, Optional[str]]] = {}  # context -> (kind, body)
+    rows: List[Dict[str, Any]] = []
+    for r in recipients:
+        user_id, extra = (r, None) if isinstance(r, int) else r
+        m = {**base, **extra} if extra else base
+        key = json.dumps(m, sort_keys=True, default=str)
+        if key not in rendered:
+            rendered[key] = (_derive_kind(m, fallback=(kind or None)), fixed_body or render_context_text(m) or None)
+        kind_val, text = rendered[key]
+        rows.append({
+            "user_id": int(user_id), "kind": kind_val, "title": title_val, "body": text,
+            "link_url": link_url or None, "meta": m or None, "is_read": False, "created_at": now,
+        })
+    if not rows:
+        return []
+
+    from .counters import adjust_many
+    # RETURNING carries user_id/kind, so row order does not matter and the
+    # driver can batch the VALUES (no per-row fallback for sorted RETURNING)
+    stmt = insert(Notification).returning(Notification.id, Notification.user_id, Notification.kind)
+    created = db.session.execute(stmt, rows).all()
+    adjust_many(db.session(), "notifications", Counter(row["user_id"] for row in rows))
+    for nid, user_id, kind_val in created:
+        emit("notif_events", {
+            "type": kind_val, "id": nid, "user_id": user_id,
+            "title": title_val, "link_url": link_url or None,
+        })
+    if commit:
+        db.session.commit()
+    return [row[0] for row in created]
@@ -8,4 +8,5 @@ bp = Blueprint(
     static_url_path="/static/realtime"
 )
 
+from . import models  # noqa: E402,F401
 from . import api  # noqa: E402
@@ -1,10 +1,13 @@
+import hmac
 import json
 from datetime import datetime
-from flask import Response, stream_with_context, request, jsonify
+from flask import Response, current_app, stream_with_context, request, jsonify
 from flask_login import login_required, current_user
 
+from app.decorators import _is_admin
 from . import bp
-from .broker import hub
+from .broker import hub, sse_frame, sse_bytes, parse_event_id, RESYNC_FRAME
+from .metrics import render_prometheus
 from .triggers import install_triggers  # one-time installer
 
 @bp.before_app_request
@@ -17,24 +20,45 @@ def stream():
     """
     SSE: emits events from channels:
       - feed_events: {type: "post|comment|reaction", id, post_id?, actor_id?, ...}
+                     {type: "post_activity", post_id, comments, comment_ids, reactions: {emoji: delta}}
+                     (further comments / reactions within REALTIME_COALESCE_MS of one on the same post)
       - notif_events: {type: "post_created|comment_added|reacted", id, user_id, post_id, ...}
+    Only the user's own notifications and feed events for posts they can see are sent.
+    On reconnect (Last-Event-ID header or ?last_event_id=) missed events are
+    replayed first, or an "event: resync" tells the client to refetch.
     """
-    sid = hub.subscribe()
+    from app.feed.permissions import _is_feed_admin, _user_sector_ids
+    viewer = dict(
+        user_id=current_user.id,
+        sector_ids=_user_sector_ids(current_user),
+        is_admin=_is_feed_admin(current_user),
+    )
+    sid = hub.subscribe(**viewer)
+
+    # subscribed first, so nothing falls between the backlog and the live queue
+    last_id = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    backlog = hub.backlog(last_id, **viewer) if last_id is not None else []
 
     def gen():
         try:
             # send a hello
             yield f"event: hello\ndata: {json.dumps({'time': datetime.utcnow().isoformat()})}\n\n"
+            if backlog is None:
+                yield RESYNC_FRAME
+            replayed = {e["event_id"] for e in backlog or ()}
+            for e in backlog or ():
+                yield sse_frame(e)
             while True:
                 evt = hub.poll(sid, timeout=15.0)
                 if evt is None:
                     # keep-alive
                     yield ": keep-alive\n\n"
                     continue
-                # Optional: light authorization filter per event
-                # (We keep everything; your SPA decides what to use.)
-                yield f"event: {evt.get('channel','evt')}\n"
-                yield f"data: {json.dumps(evt, ensure_ascii=False)}\n\n"
+                if evt.get("event_id") in replayed:
+                    continue
+                # Only events this user may see reach the queue (hub routing)
+                yield sse_bytes(evt)
+                hub.observe_delivery(evt)
         finally:
             hub.unsubscribe(sid)
 
@@ -53,3 +77,27 @@ def install():
         return jsonify({"ok": False, "error": "forbidden"}), 403
     install_triggers()
     return jsonify({"ok": True})
+
+
+def _metrics_allowed() -> bool:
+    """Admins, or a scraper presenting REALTIME_METRICS_TOKEN as a bearer token."""
+    token = current_app.config.get("REALTIME_METRICS_TOKEN")
+    auth = request.headers.get("Authorization", "")
+    if token and auth.startswith("Bearer ") and hmac.compare_digest(auth[7:].strip(), str(token)):
+        return True
+    return current_user.is_authenticated and _is_admin(current_user)
+
+@bp.get("/metrics")
+def metrics():
+    """Hub introspection (admin): counters, queue depths, lag histogram, ?detail=1 lists subscribers."""
+    if not _metrics_allowed():
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+    detail = request.args.get("detail") in ("1", "true", "yes")
+    return jsonify({"ok": True, **hub.metrics(detail=detail)})
+
+@bp.get("/metrics.prom")
+def metrics_prom():
+    """The same numbers in the Prometheus text exposition format."""
+    if not _metrics_allowed():
+        return Response("forbidden\n", status=403, mimetype="text/plain")
+    return Response(render_prometheus(hub.metrics()), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,220 @@
+# app/realtime/asgi.py
+"""
+Async SSE endpoint: GET /api/realtime/stream served from one asyncio event
+loop instead of one gunicorn sync worker per open browser tab.
+
+It is a plain ASGI application (no framework needed); run it with any ASGI
+server, e.g. `uvicorn asgi:application` (see asgi.py at the project root):
+
+  - next to gunicorn: route /api/realtime/stream to it in the reverse proxy;
+    every other path stays on the WSGI app.
+  - single process: create_asgi_app(flask_app, mount_wsgi=True) hands every
+    other path to the Flask app through asgiref's WsgiToAsgi (optional
+    dependency: pip install asgiref).
+
+Authentication is Flask-Login's own: the request's cookies are replayed into a
+Flask request context (session cookie, remember-me cookie, session protection
+and the user_loader all apply) on a worker thread, once per connection.
+
+Events come from the same hub / transport as the WSGI endpoint; the hub's
+publishing thread hands them to the loop with one call_soon_threadsafe per
+burst, not one per connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+from datetime import datetime
+from urllib.parse import parse_qs
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.extensions import db
+from .broker import hub, sse_frame, sse_bytes, parse_event_id, RESYNC_FRAME
+
+log = logging.getLogger(__name__)
+
+STREAM_PATH = "/api/realtime/stream"
+KEEPALIVE_SECONDS = 15.0
+QUEUE_SIZE = 1000
+
+
+class _LoopBridge:
+    """Moves events from the hub's publishing thread onto the event loop in batches."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._pending: List[Tuple[asyncio.Queue, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def push(self, aq: asyncio.Queue, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append((aq, payload))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._flush)
+
+    def _flush(self) -> None:
+        with self._lock:
+            items, self._pending, self._scheduled = self._pending, [], False
+        for aq, payload in items:
+            try:
+                aq.put_nowait(payload)
+            except asyncio.QueueFull:
+                pass  # raced past the full() check in put_nowait(); the client is far behind anyway
+
+
+class _AsyncSubscriberQueue:
+    """What the hub sees for an async subscriber: put_nowait() from any thread."""
+
+    def __init__(self, bridge: _LoopBridge, maxsize: int = QUEUE_SIZE):
+        self.bridge = bridge
+        self.aq: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, payload: Dict[str, Any]) -> None:
+        if self.aq.full():
+            raise queue.Full
+        self.bridge.push(self.aq, payload)
+
+    @property
+    def maxsize(self) -> int:
+        return self.aq.maxsize
+
+    def qsize(self) -> int:
+        return self.aq.qsize()  # delivered to the loop; a burst still in the bridge is not counted
+
+
+def _viewer(flask_app, headers: Dict[str, str], client: Optional[Tuple[str, int]]):
+    """(user_id, sector_ids, is_admin) for the request's Flask-Login user, or None."""
+    from flask_login import current_user
+    from app.feed.permissions import _is_feed_admin, _user_sector_ids
+
+    environ = {"REMOTE_ADDR": client[0] if client else "127.0.0.1"}
+    try:
+        with flask_app.test_request_context(STREAM_PATH, headers=headers, environ_base=environ):
+            user = current_user._get_current_object()
+            if not getattr(user, "is_authenticated", False):
+                return None
+            return int(user.id), tuple(_user_sector_ids(user)), _is_feed_admin(user)
+    finally:
+        with flask_app.app_context():
+            db.session.remove()
+
+
+def _backlog(flask_app, last_id: int, viewer):
+    user_id, sectors, is_admin = viewer
+    with flask_app.app_context():
+        try:
+            return hub.backlog(last_id, user_id=user_id, sector_ids=sectors, is_admin=is_admin)
+        finally:
+            db.session.remove()
+
+
+async def _send_json(send, status: int, body: Dict[str, Any]) -> None:
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps(body).encode("utf-8")})
+
+
+def create_asgi_app(flask_app, mount_wsgi: bool = False):
+    wsgi = None
+    if mount_wsgi:
+        from asgiref.wsgi import WsgiToAsgi  # optional dependency: pip install asgiref
+        wsgi = WsgiToAsgi(flask_app)
+
+    state: Dict[str, Any] = {"bridge": None}
+
+    def _bridge() -> _LoopBridge:
+        if state["bridge"] is None:
+            with flask_app.app_context():
+                hub.start()
+            state["bridge"] = _LoopBridge(asyncio.get_running_loop())
+        return state["bridge"]
+
+    async def lifespan(receive, send):
+        while True:
+            msg = await receive()
+            if msg["type"] == "lifespan.startup":
+                _bridge()
+                await send({"type": "lifespan.startup.complete"})
+            elif msg["type"] == "lifespan.shutdown":
+                hub.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def stream(scope, receive, send):
+        if scope["method"] != "GET":
+            await _send_json(send, 405, {"error": "method not allowed"})
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        loop = asyncio.get_running_loop()
+        viewer = await loop.run_in_executor(None, _viewer, flask_app, headers, scope.get("client"))
+        if viewer is None:
+            await _send_json(send, 401, {"error": "unauthorized"})
+            return
+
+        user_id, sectors, is_admin = viewer
+        q = _AsyncSubscriberQueue(_bridge())
+        sid = hub.subscribe(user_id=user_id, sector_ids=sectors, is_admin=is_admin, queue=q)
+
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        last_id = parse_event_id(headers.get("last-event-id") or (query.get("last_event_id") or [None])[0])
+        backlog = []
+        if last_id is not None:
+            backlog = await loop.run_in_executor(None, _backlog, flask_app, last_id, viewer)
+
+        async def wait_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        gone = asyncio.ensure_future(wait_disconnect())
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ]})
+            hello = f"event: hello\ndata: {json.dumps({'time': datetime.utcnow().isoformat()})}\n\n"
+            if backlog is None:
+                hello += RESYNC_FRAME
+            replayed = {e["event_id"] for e in backlog or ()}
+            hello += "".join(sse_frame(e) for e in backlog or ())
+            await send({"type": "http.response.body", "body": hello.encode("utf-8"), "more_body": True})
+            while not gone.done():
+                getter = asyncio.ensure_future(q.aq.get())
+                done, _ = await asyncio.wait({getter, gone}, timeout=KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    if gone in done:
+                        break
+                    evt, chunk = None, b": keep-alive\n\n"
+                else:
+                    evt = getter.result()
+                    if evt.get("event_id") in replayed:
+                        continue
+                    chunk = sse_bytes(evt)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if evt is not None:
+                    hub.observe_delivery(evt)
+        except OSError:
+            pass  # client went away mid-send
+        finally:
+            gone.cancel()
+            hub.unsubscribe(sid)
+
+    async def application(scope, receive, send):
+        if scope["type"] == "lifespan":
+            await lifespan(receive, send)
+        elif scope["type"] == "http" and scope["path"].rstrip("/") == STREAM_PATH:
+            await stream(scope, receive, send)
+        elif wsgi is not None:
+            await wsgi(scope, receive, send)
+        elif scope["type"] == "http":
+            await _send_json(send, 404, {"error": "not found"})
+
+    return application
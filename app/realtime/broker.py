@@ -1,46 +1,177 @@
 import json
+import logging
 import threading
 import time
+from collections import Counter, deque
 from queue import Queue, Empty
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
+
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
-from sqlalchemy import text
 from app.extensions import db
+from .metrics import Histogram, LAG_BUCKETS, FANOUT_BUCKETS
 
-CHANNELS = ("feed_events", "notif_events")
+log = logging.getLogger(__name__)
 
 class _Hub:
     """
-    Simple pub/sub hub + PG LISTEN bridge.
-    - Per-connection queues (for SSE clients)
-    - Background thread: LISTEN on PG channels and publish to subscribers
+    Simple in-process pub/sub hub.
+    - Per-connection queues (for SSE clients) and in-process listeners
+    - Events from other workers arrive through the configured transport
+      (transports.py: PG LISTEN/NOTIFY, SQLite outbox or in-process only)
+
+    Subscribers are indexed by user id, sector and admin flag, so an event is
+    only copied into the queues of the viewers allowed to see it:
+      notif_events   -> the payload's user_id
+      feed_events    -> by audience_type: "all" everyone; "sector" that
+                        audience_id's members; "users" the audience_users ids.
+                        Admins get every feed event; events without audience
+                        fields go to admins only.
+    A subscriber without a user (internal use) receives everything.
+
+    Events carry a monotonically increasing "event_id" (assigned by the
+    transport) and the last REALTIME_REPLAY_SIZE per channel are kept so a
+    reconnecting stream can replay what it missed (backlog()).
+
+    Comment / reaction bursts on one post are coalesced: the first event of a
+    burst goes out as is, the ones following within coalesce_window seconds
+    (REALTIME_COALESCE_MS) are merged into one "post_activity" delta per
+    window. Listeners and the replay buffer still see every single event.
+    Each delivered event is JSON-encoded once and the bytes shared by every
+    subscriber (Event.frame()).
+
+    metrics() reports subscribers, queue depths, per-channel in / out / dropped
+    counts, transport reconnects and the publish-to-deliver lag histogram
+    (GET /api/realtime/metrics, /api/realtime/metrics.prom).
     """
     def __init__(self):
         self._subs = {}  # id -> Queue
+        self._by_user: Dict[int, set] = {}
+        self._by_sector: Dict[int, set] = {}
+        self._admins: set = set()
+        self._firehose: set = set()
+        self._keys: Dict[str, tuple] = {}  # id -> (user_id, sector_ids) for unsubscribe
+        self._since: Dict[str, float] = {}  # id -> subscribe time (epoch seconds)
+        self._listeners = []  # in-process callbacks (e.g. cache invalidation)
         self._lock = threading.Lock()
-        self._listener_thread: Optional[threading.Thread] = None
-        self._stop = threading.Event()
+        self._transport = None
+        self.replay_size = 1000
+        self._history: Dict[str, deque] = {}  # channel -> recent events (with event_id)
+        self._floor: Optional[int] = None  # every event with a higher id is in _history
+        self.coalesce_window = 0.25  # seconds; 0 delivers every event on its own
+        self._bursts: Dict[int, "_Burst"] = {}  # post_id -> open coalescing window
+        self._flush_cond = threading.Condition(self._lock)
+        self._flusher: Optional[threading.Thread] = None
+        self.counters = {"received": 0, "delivered": 0, "dropped": 0, "reconnects": 0, "errors": 0,
+                         "coalesced": 0, "listener_errors": 0}
+        self.channels: Dict[str, Dict[str, int]] = {}  # channel -> {"in", "out", "dropped"}
+        self.deliver_lag = Histogram(LAG_BUCKETS)
+        self.fanout_time = Histogram(FANOUT_BUCKETS)
 
     def start(self):
-        if self._listener_thread and self._listener_thread.is_alive():
-            return
-        self._stop.clear()
-        self._listener_thread = threading.Thread(target=self._pg_listener_loop, daemon=True)
-        self._listener_thread.start()
+        """Start receiving from other workers (call inside an app context)."""
+        from .transports import get_transport
+        self._transport = get_transport()
+        self._transport.start()
 
     def stop(self):
-        self._stop.set()
+        if self._transport is not None:
+            self._transport.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "subscribers": len(self._subs),
+                "transport": getattr(self._transport, "name", None),
+            }
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _channel(self, channel: Optional[str]) -> Dict[str, int]:
+        """Per-channel counters (call with the lock held)."""
+        c = self.channels.get(channel or "")
+        if c is None:
+            c = self.channels[channel or ""] = {"in": 0, "out": 0, "dropped": 0}
+        return c
+
+    def observe_delivery(self, evt: Dict[str, Any]) -> None:
+        """Record publish-to-deliver lag once a stream has written evt."""
+        published = getattr(evt, "published", None)
+        if published is not None:
+            self.deliver_lag.observe(time.monotonic() - published)
+
+    def metrics(self, detail: bool = False) -> Dict[str, Any]:
+        """Counters, queue depths and histograms; detail adds one row per subscriber."""
+        with self._lock:
+            subs = list(self._subs.items())
+            keys = dict(self._keys)
+            since = dict(self._since)
+            admins = set(self._admins)
+            out = {
+                "subscribers": len(subs),
+                "transport": getattr(self._transport, "name", None),
+                "counters": dict(self.counters),
+                "channels": {k: dict(v) for k, v in self.channels.items()},
+                "coalesce_window": self.coalesce_window,
+                "open_bursts": len(self._bursts),
+                "replay_buffered": {k: len(v) for k, v in self._history.items()},
+            }
+        depth_total = depth_max = saturated = 0
+        rows = []
+        for sid, q in subs:
+            depth, cap = _queue_depth(q)
+            depth_total += depth
+            depth_max = max(depth_max, depth)
+            if cap and depth >= 0.9 * cap:
+                saturated += 1
+            if detail:
+                user_id, sectors = keys.get(sid, (None, ()))
+                rows.append({"id": sid, "user_id": user_id, "sectors": list(sectors), "admin": sid in admins,
+                             "since": since.get(sid), "queue_depth": depth, "queue_size": cap})
+        out["queues"] = {"depth_total": depth_total, "depth_max": depth_max, "saturated": saturated}
+        out["deliver_lag"] = self.deliver_lag.snapshot()
+        out["fanout"] = self.fanout_time.snapshot()
+        if detail:
+            out["subscriber_list"] = sorted(rows, key=lambda r: -r["queue_depth"])
+        return out
 
-    def subscribe(self) -> str:
-        q = Queue(maxsize=1000)
+    def subscribe(self, user_id: Optional[int] = None, sector_ids: Iterable[int] = (), is_admin: bool = False,
+                  queue=None) -> str:
+        """queue: anything with put_nowait() (raising when full); default a Queue(maxsize=1000) for poll()."""
+        q = queue if queue is not None else Queue(maxsize=1000)
         sid = f"s_{time.time_ns()}"
+        sectors = tuple(int(s) for s in sector_ids)
         with self._lock:
             self._subs[sid] = q
+            self._keys[sid] = (user_id, sectors)
+            self._since[sid] = time.time()
+            if user_id is None:
+                self._firehose.add(sid)
+            else:
+                self._by_user.setdefault(int(user_id), set()).add(sid)
+                for sec in sectors:
+                    self._by_sector.setdefault(sec, set()).add(sid)
+                if is_admin:
+                    self._admins.add(sid)
         return sid
 
     def unsubscribe(self, sid: str):
         with self._lock:
-            self._subs.pop(sid, None)
+            if self._subs.pop(sid, None) is None:
+                return
+            user_id, sectors = self._keys.pop(sid)
+            self._since.pop(sid, None)
+            self._firehose.discard(sid)
+            self._admins.discard(sid)
+            if user_id is not None:
+                _discard(self._by_user, int(user_id), sid)
+            for sec in sectors:
+                _discard(self._by_sector, sec, sid)
 
     def poll(self, sid: str, timeout=15.0) -> Optional[Dict[str, Any]]:
         q = None
@@ -53,42 +184,337 @@ class _Hub:
         except Empty:
             return None
 
+    def add_listener(self, fn):
+        """Call fn(payload) for every published event (must be quick, never raise)."""
+        with self._lock:
+            if fn not in self._listeners:
+                self._listeners.append(fn)
+
+    def _remember(self, payload: Dict[str, Any]) -> None:
+        """Keep payload in its channel's replay buffer (call with the lock held)."""
+        eid = payload.get("event_id")
+        if not isinstance(eid, int):
+            return
+        buf = self._history.get(payload.get("channel"))
+        if buf is None:
+            buf = self._history[payload.get("channel")] = deque(maxlen=self.replay_size)
+        if self._floor is None:
+            self._floor = eid - 1
+        if len(buf) == buf.maxlen:
+            self._floor = max(self._floor, buf[0]["event_id"])
+        buf.append(payload)
+
+    def backlog(self, last_id: int, user_id: Optional[int] = None, sector_ids: Iterable[int] = (),
+                is_admin: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events after last_id this viewer may see, oldest first; None when they
+        cannot be recovered (the client should refetch). Falls back to the
+        transport's history (e.g. the outbox table) beyond the in-memory buffer,
+        so call it inside an app context.
+        """
+        with self._lock:
+            events = None
+            if self._floor is not None and last_id >= self._floor:
+                events = [p for buf in self._history.values() for p in buf if p["event_id"] > last_id]
+        if events is None:
+            events = self._transport.history(last_id, self.replay_size) if self._transport else None
+            if events is None:
+                return None
+        sectors = {int(s) for s in sector_ids}
+        events = [p for p in events if _eligible(p, user_id, sectors, is_admin)]
+        events.sort(key=lambda p: p["event_id"])
+        return [_public(p) for p in events]
+
+    def _recipients(self, payload: Dict[str, Any]):
+        """Queues of the subscribers allowed to see payload (call with the lock held)."""
+        channel = payload.get("channel")
+        if channel == "notif_events":
+            sids = set(self._firehose)
+            uid = payload.get("user_id")
+            if uid is not None:
+                sids |= self._by_user.get(int(uid), set())
+        elif channel == "feed_events":
+            at = payload.get("audience_type")
+            if at == "all":
+                return list(self._subs.values())
+            sids = self._firehose | self._admins
+            if at == "sector" and payload.get("audience_id") is not None:
+                sids |= self._by_sector.get(int(payload["audience_id"]), set())
+            elif at == "users":
+                for uid in payload.get("audience_users") or ():
+                    sids |= self._by_user.get(int(uid), set())
+        else:
+            return list(self._subs.values())
+        return [self._subs[sid] for sid in sids]
+
     def publish(self, payload: Dict[str, Any]):
-        # Fan out non-blocking
+        # Fan out non-blocking, to eligible subscribers only
         with self._lock:
-            subs = list(self._subs.values())
-        for q in subs:
+            self._channel(payload.get("channel"))["in"] += 1
+            listeners = list(self._listeners)
+            self._remember(payload)
+            held = self._coalesce(payload)
+            subs = None if held else self._recipients(payload)
+        failed = 0
+        for fn in listeners:
             try:
-                q.put_nowait(payload)
+                fn(payload)
             except Exception:
-                # queue full: drop event for that client
-                pass
+                failed += 1
+                log.debug("realtime: listener %r failed", fn, exc_info=True)
+        if failed:
+            self._count("listener_errors", failed)
+        if subs is not None:
+            self._fanout(subs, payload)
 
-    def _pg_listener_loop(self):
-        # Dedicated raw connection for async notifications
-        while not self._stop.is_set():
+    def _fanout(self, subs, payload: Dict[str, Any]) -> None:
+        evt = Event(_public(payload))  # one object (and one encoded frame) for every queue
+        evt.published = t0 = time.monotonic()
+        delivered = dropped = 0
+        for q in subs:
             try:
-                # Use the DBAPI connection underneath SQLAlchemy
-                with db.engine.connect() as conn:
-                    raw = conn.connection
-                    cursor = raw.cursor()
-                    for ch in CHANNELS:
-                        cursor.execute(f'LISTEN "{ch}";')
-                    conn.commit()
-
-                    # polling loop
-                    while not self._stop.is_set():
-                        raw.poll()
-                        while raw.notifies:
-                            n = raw.notifies.pop(0)
-                            try:
-                                data = json.loads(n.payload)
-                                self.publish({"channel": n.channel, **data})
-                            except Exception:
-                                self.publish({"channel": n.channel, "type": "raw", "payload": n.payload})
-                        time.sleep(0.2)
+                q.put_nowait(evt)
+                delivered += 1
             except Exception:
-                # Backoff on error
-                time.sleep(1.0)
+                # queue full: drop event for that client
+                dropped += 1
+        self.fanout_time.observe(time.monotonic() - t0)
+        with self._lock:
+            self.counters["delivered"] += delivered
+            self.counters["dropped"] += dropped
+            ch = self._channel(payload.get("channel"))
+            ch["out"] += delivered
+            ch["dropped"] += dropped
+        if dropped:
+            log.debug("realtime: %s event dropped for %d full subscriber queue(s)", payload.get("channel"), dropped)
+
+    # -- coalescing -----------------------------------------------------------
+    def _coalesce(self, payload: Dict[str, Any]) -> bool:
+        """True when payload was merged into an open window (call with the lock held)."""
+        if (self.coalesce_window <= 0 or payload.get("channel") != "feed_events"
+                or payload.get("type") not in COALESCE_TYPES or payload.get("post_id") is None):
+            return False
+        post_id = int(payload["post_id"])
+        burst = self._bursts.get(post_id)
+        if burst is None:
+            # leading edge: deliver now, merge whatever follows within the window
+            self._bursts[post_id] = _Burst(post_id, time.monotonic() + self.coalesce_window)
+            self._start_flusher()
+            self._flush_cond.notify()
+            return False
+        burst.add(payload)
+        self.counters["coalesced"] += 1
+        return True
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="realtime-coalesce", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._flush_cond:
+                while not self._bursts:
+                    self._flush_cond.wait()
+                now = time.monotonic()
+                due = [b for b in self._bursts.values() if b.deadline <= now]
+                if not due:
+                    self._flush_cond.wait(min(b.deadline for b in self._bursts.values()) - now)
+                    continue
+                ready = []
+                for b in due:
+                    if b.events:
+                        # still busy: keep throttling this post for another window
+                        self._bursts[b.post_id] = _Burst(b.post_id, now + self.coalesce_window)
+                        delta = b.payload()
+                        ready.append((self._recipients(delta), delta))
+                    else:
+                        del self._bursts[b.post_id]
+            for subs, delta in ready:
+                try:
+                    self._fanout(subs, delta)
+                except Exception:
+                    log.exception("realtime: coalesced delivery failed")
+
+
+COALESCE_TYPES = {"comment", "reaction"}
+_AUDIENCE_KEYS = ("audience_type", "audience_id", "audience_users")
+
+
+class _Burst:
+    """Comment / reaction events on one post merged into a single post_activity delta."""
+    __slots__ = ("post_id", "deadline", "events", "event_id", "comments", "comment_ids", "reactions", "audience")
+
+    def __init__(self, post_id: int, deadline: float):
+        self.post_id = post_id
+        self.deadline = deadline
+        self.events = 0
+        self.event_id: Optional[int] = None
+        self.comments = 0
+        self.comment_ids: List[int] = []
+        self.reactions: Counter = Counter()
+        self.audience: Dict[str, Any] = {}
+
+    def add(self, payload: Dict[str, Any]) -> None:
+        self.events += 1
+        eid = payload.get("event_id")
+        if isinstance(eid, int) and (self.event_id is None or eid > self.event_id):
+            self.event_id = eid
+        if payload.get("type") == "comment":
+            self.comments += 1
+            if payload.get("id") is not None:
+                self.comment_ids.append(payload["id"])
+        else:
+            self.reactions[payload.get("emoji") or "👍"] += 1 if payload.get("reacted", True) else -1
+        self.audience = {k: payload[k] for k in _AUDIENCE_KEYS if k in payload}
+
+    def payload(self) -> Dict[str, Any]:
+        out = {
+            "channel": "feed_events", "type": "post_activity", "post_id": self.post_id,
+            "events": self.events, "comments": self.comments, "comment_ids": self.comment_ids,
+            "reactions": {k: v for k, v in self.reactions.items() if v},
+            **self.audience,
+        }
+        if self.event_id is not None:
+            out["event_id"] = self.event_id  # the merged events are still replayable one by one
+        return out
+
+
+class Event(dict):
+    """A published payload as queued for subscribers; frame() encodes it once for all of them."""
+    __slots__ = ("_frame", "published")
+
+    def frame(self) -> bytes:
+        try:
+            return self._frame
+        except AttributeError:
+            self._frame = sse_frame(self).encode("utf-8")
+            return self._frame
+
+
+def _eligible(payload: Dict[str, Any], user_id: Optional[int], sectors: set, is_admin: bool) -> bool:
+    """Single-viewer form of _Hub._recipients (used for replay)."""
+    if user_id is None:
+        return True
+    channel = payload.get("channel")
+    if channel == "notif_events":
+        return payload.get("user_id") is not None and int(payload["user_id"]) == int(user_id)
+    if channel == "feed_events":
+        at = payload.get("audience_type")
+        if at == "all" or is_admin:
+            return True
+        if at == "sector":
+            return payload.get("audience_id") is not None and int(payload["audience_id"]) in sectors
+        if at == "users":
+            return int(user_id) in {int(u) for u in payload.get("audience_users") or ()}
+        return False
+    return True
+
+
+def _public(payload: Dict[str, Any]) -> Dict[str, Any]:
+    if "audience_users" in payload:  # routing only; not sent to browsers
+        return {k: v for k, v in payload.items() if k != "audience_users"}
+    return payload
+
+
+def parse_event_id(raw) -> Optional[int]:
+    """Last-Event-ID header / ?last_event_id= value, or None."""
+    try:
+        return int(str(raw).strip()) if raw not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def sse_frame(evt: Dict[str, Any]) -> str:
+    """One text/event-stream message: event name = channel, id = event_id (for Last-Event-ID)."""
+    eid = evt.get("event_id")
+    head = f"id: {eid}\n" if eid is not None else ""
+    return f"{head}event: {evt.get('channel', 'evt')}\ndata: {json.dumps(evt, ensure_ascii=False)}\n\n"
+
+
+def sse_bytes(evt: Dict[str, Any]) -> bytes:
+    """Encoded sse_frame(); hub events reuse the bytes encoded for the first subscriber."""
+    if isinstance(evt, Event):
+        return evt.frame()
+    return sse_frame(evt).encode("utf-8")
+
+
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"  # missed events are gone: the client should refetch
+
+
+def _queue_depth(q) -> tuple:
+    """(queued events, capacity or 0) for a subscriber queue."""
+    try:
+        return q.qsize(), getattr(q, "maxsize", 0) or 0
+    except Exception:
+        return 0, 0
+
+
+def _discard(index: Dict[int, set], key: int, sid: str) -> None:
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(sid)
+        if not ids:
+            index.pop(key, None)
+
 
 hub = _Hub()
+
+
+# -----------------------------------------------------------------------------
+# Publishing from application code
+# -----------------------------------------------------------------------------
+def emit(channel: str, payload: Dict[str, Any], session=None) -> None:
+    """
+    Publish {"channel": channel, **payload} to every worker's SSE clients once
+    the current transaction commits (right away when none is open). Rolled
+    back work publishes nothing.
+    """
+    from .transports import get_transport
+
+    session = session if session is not None else db.session()
+    if session.in_transaction():
+        session.info.setdefault("realtime_events", []).append((channel, payload))
+        return
+    try:
+        get_transport().send_now([(channel, payload)])
+    except Exception:
+        log.exception("realtime: publishing %s event failed", channel)
+
+
+def _before_commit(session):
+    events = session.info.get("realtime_events")
+    if events and has_app_context():
+        from .transports import get_transport
+        get_transport().write(session, events)
+
+
+def _after_commit(session):
+    events = session.info.pop("realtime_events", None)
+    if events and has_app_context():
+        from .transports import get_transport
+        try:
+            get_transport().after_commit(events)
+        except Exception:
+            log.exception("realtime: local delivery failed")
+
+
+def _after_rollback(session):
+    session.info.pop("realtime_events", None)
+
+
+def init_realtime(app) -> None:
+    app.config.setdefault("REALTIME_TRANSPORT", "auto")  # auto|pg|outbox|local
+    app.config.setdefault("REALTIME_DB_TRIGGERS", False)  # install_triggers() in use: skip duplicate NOTIFYs
+    app.config.setdefault("REALTIME_OUTBOX_POLL_SECONDS", 0.5)
+    app.config.setdefault("REALTIME_OUTBOX_KEEP_SECONDS", 300)
+    app.config.setdefault("REALTIME_REPLAY_SIZE", 1000)  # events kept per channel for Last-Event-ID replay
+    app.config.setdefault("REALTIME_METRICS_TOKEN", None)  # bearer token for scrapers; admins need none
+    app.config.setdefault("REALTIME_COALESCE_MS", 250)  # comment/reaction burst window per post; 0 = off
+    hub.replay_size = int(app.config["REALTIME_REPLAY_SIZE"])
+    hub.coalesce_window = max(0, int(app.config["REALTIME_COALESCE_MS"])) / 1000.0
+
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,95 @@
+# app/realtime/metrics.py
+"""
+Hub instrumentation: a minimal histogram and the Prometheus text rendering of
+_Hub.metrics() (served by /api/realtime/metrics and /api/realtime/metrics.prom).
+No client library needed.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FANOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics), safe to observe from any thread."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative: List[Tuple[str, int]] = []
+        acc = 0
+        for le, n in zip([*map(str, self.buckets), "+Inf"], counts):
+            acc += n
+            cumulative.append((le, acc))
+        return {"buckets": cumulative, "sum": round(total, 6), "count": acc}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**kw) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in kw.items()]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus(m: Dict[str, Any]) -> str:
+    out: List[str] = []
+
+    def metric(name: str, kind: str, help_: str, samples: Iterable[Tuple[Dict[str, Any], Any]]):
+        out.append(f"# HELP {name} {help_}")
+        out.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            out.append(f"{name}{_labels(**labels)} {value}")
+
+    def histogram(name: str, help_: str, snap: Dict[str, Any]):
+        out.append(f"# HELP {name} {help_}")
+        out.append(f"# TYPE {name} histogram")
+        for le, n in snap["buckets"]:
+            out.append(f'{name}_bucket{{le="{le}"}} {n}')
+        out.append(f"{name}_sum {snap['sum']}")
+        out.append(f"{name}_count {snap['count']}")
+
+    q = m["queues"]
+    metric("realtime_subscribers", "gauge", "Connected SSE subscribers.", [({}, m["subscribers"])])
+    metric("realtime_queue_depth_total", "gauge", "Events waiting in all subscriber queues.", [({}, q["depth_total"])])
+    metric("realtime_queue_depth_max", "gauge", "Deepest subscriber queue.", [({}, q["depth_max"])])
+    metric("realtime_queue_saturated", "gauge", "Subscribers whose queue is at least 90% full.", [({}, q["saturated"])])
+
+    ch = m["channels"]
+    metric("realtime_events_in_total", "counter", "Events published into the hub.",
+           [({"channel": c}, v["in"]) for c, v in ch.items()])
+    metric("realtime_events_out_total", "counter", "Events queued for subscribers.",
+           [({"channel": c}, v["out"]) for c, v in ch.items()])
+    metric("realtime_events_dropped_total", "counter", "Events dropped because a subscriber queue was full.",
+           [({"channel": c}, v["dropped"]) for c, v in ch.items()])
+    metric("realtime_events_coalesced_total", "counter", "Comment/reaction events merged into post_activity.",
+           [({}, m["counters"]["coalesced"])])
+    metric("realtime_transport_received_total", "counter", "Events received from other workers.",
+           [({"transport": m["transport"] or ""}, m["counters"]["received"])])
+    metric("realtime_transport_reconnects_total", "counter", "Transport listener reconnects.",
+           [({"transport": m["transport"] or ""}, m["counters"]["reconnects"])])
+    metric("realtime_transport_errors_total", "counter", "Transport listener errors.",
+           [({"transport": m["transport"] or ""}, m["counters"]["errors"])])
+    metric("realtime_listener_errors_total", "counter", "Exceptions raised by in-process listeners.",
+           [({}, m["counters"]["listener_errors"])])
+
+    histogram("realtime_deliver_lag_seconds", "Hub publish to frame written on the stream.", m["deliver_lag"])
+    histogram("realtime_fanout_seconds", "Time to queue one event for all its recipients.", m["fanout"])
+    return "\n".join(out) + "\n"
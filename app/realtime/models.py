@@ -0,0 +1,19 @@
+# app/realtime/models.py
+from datetime import datetime
+
+from app.extensions import db
+
+
+class RealtimeOutbox(db.Model):
+    """
+    Cross-process event log for the "outbox" realtime transport (SQLite / no
+    LISTEN/NOTIFY). Rows are written in the publishing transaction, tailed by
+    every worker's hub and pruned after REALTIME_OUTBOX_KEEP_SECONDS.
+    """
+    __tablename__ = "realtime_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    origin = db.Column(db.String(32), nullable=False)  # writer process token (it already delivered locally)
+    channel = db.Column(db.String(32), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -68,6 +68,11 @@
       _emit("notif_events", payload);
     });
 
+    // Reconnected too late to replay what was missed (Last-Event-ID): refetch lists
+    es.addEventListener("resync", () => {
+      _emit("resync", {});
+    });
+
     // Fallback generic messages (if ever sent without event:)
     es.onmessage = (e) => {
       try {
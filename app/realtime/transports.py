@@ -0,0 +1,379 @@
+# app/realtime/transports.py
+"""
+How realtime events travel between processes. The hub (broker.py) only fans
+events out to this process' SSE clients and listeners; a transport carries
+them to every worker.
+
+  pg      PostgreSQL NOTIFY, sent inside the publishing transaction; a LISTEN
+          thread (select() on the socket, backoff on reconnect) feeds the hub.
+  outbox  rows in realtime_outbox written inside the publishing transaction,
+          tailed by every worker (REALTIME_OUTBOX_POLL_SECONDS) and pruned
+          after REALTIME_OUTBOX_KEEP_SECONDS. The writer delivers to its own
+          clients right after commit. Works on SQLite.
+  local   single process: delivered to the hub after commit, nothing else.
+
+REALTIME_TRANSPORT picks one ("auto": pg on PostgreSQL, outbox otherwise).
+
+Every event gets an "event_id" that increases across all workers (outbox row
+id, PostgreSQL sequence realtime_event_id_seq, or a per-process counter for
+local) so SSE clients can resume with Last-Event-ID; history() lets the hub
+replay beyond its in-memory buffer where the transport can.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import random
+import select as _select
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, text
+
+from app.extensions import db
+from .models import RealtimeOutbox
+
+log = logging.getLogger(__name__)
+
+CHANNELS = ("feed_events", "notif_events")
+BACKOFF_BASE = 0.5   # seconds; doubled per failed attempt, with full jitter
+BACKOFF_MAX = 30.0
+
+Event = Tuple[str, Dict[str, Any]]  # (channel, payload)
+
+_lock = threading.Lock()
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+class Transport:
+    """In-process only; the base for the cross-process transports."""
+    name = "local"
+
+    def __init__(self, hub, engine=None):
+        self.hub = hub
+        self.engine = engine
+        self._ids = itertools.count(int(time.time() * 1000))  # ids keep growing across restarts
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def write(self, session, events: List[Event]) -> None:
+        """Called from before_commit: persist/send inside the publishing transaction."""
+
+    def after_commit(self, events: List[Event]) -> None:
+        self._deliver_local(events)
+
+    def send_now(self, events: List[Event]) -> None:
+        """Publish outside any transaction."""
+        self._deliver_local(events)
+
+    def history(self, after_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Events with event_id > after_id (at most limit), or None when unknown."""
+        return None
+
+    def _deliver_local(self, events: List[Event]) -> None:
+        for channel, payload in events:
+            eid = payload.get("event_id")
+            if eid is None:
+                eid = next(self._ids)
+            self.hub.publish({"channel": channel, **payload, "event_id": eid})
+
+
+LocalTransport = Transport
+
+
+class PgNotifyTransport(Transport):
+    name = "pg"
+    MAX_PAYLOAD = 7900  # NOTIFY payloads must stay below 8000 bytes
+    TRIGGER_TYPES = {"feed_events": {"post", "comment", "reaction"}}  # covered by install_triggers()
+
+    def __init__(self, hub, engine, db_triggers: bool = False):
+        super().__init__(hub, engine)
+        self.db_triggers = db_triggers
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = socket.socketpair()
+
+    # --- sending ---
+    NOTIFY_SQL = text(
+        "SELECT pg_notify(:channel, jsonb_set(CAST(:body AS jsonb), '{event_id}', "
+        "to_jsonb(nextval('realtime_event_id_seq')))::text)"
+    )
+
+    NOTIFY_MANY_SQL = text(
+        "SELECT pg_notify(c, jsonb_set(CAST(b AS jsonb), '{event_id}', "
+        "to_jsonb(nextval('realtime_event_id_seq')))::text) "
+        "FROM unnest(CAST(:channels AS text[]), CAST(:bodies AS text[])) WITH ORDINALITY AS t(c, b, n)"
+    )
+
+    def _notifies(self, events: List[Event]):
+        pairs = []
+        for channel, payload in events:
+            if self.db_triggers and payload.get("type") in self.TRIGGER_TYPES.get(channel, ()):
+                continue  # the table trigger already notifies
+            body = _dumps(payload)
+            if len(body.encode("utf-8")) > self.MAX_PAYLOAD:
+                slim = {k: v for k, v in payload.items()
+                        if isinstance(v, (str, int, float, bool, type(None))) and len(str(v)) <= 200}
+                body = _dumps({**slim, "truncated": True})
+            pairs.append((channel, body))
+        if len(pairs) == 1:
+            yield self.NOTIFY_SQL.bindparams(channel=pairs[0][0], body=pairs[0][1])
+        elif pairs:
+            # a transaction's events (e.g. a bulk notification) in one round trip
+            yield self.NOTIFY_MANY_SQL.bindparams(channels=[c for c, _ in pairs], bodies=[b for _, b in pairs])
+
+    def write(self, session, events: List[Event]) -> None:
+        for stmt in self._notifies(events):
+            session.execute(stmt)
+
+    def after_commit(self, events: List[Event]) -> None:
+        pass  # the LISTEN connection hears our own NOTIFYs too
+
+    def send_now(self, events: List[Event]) -> None:
+        with self.engine.begin() as conn:
+            for stmt in self._notifies(events):
+                conn.execute(stmt)
+
+    def history(self, after_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        # NOTIFYs are not stored; we can only tell whether anything was sent since
+        try:
+            with self.engine.connect() as conn:
+                last = conn.execute(text("SELECT last_value, is_called FROM realtime_event_id_seq")).one()
+        except Exception:
+            return None
+        return [] if (not last.is_called or last.last_value <= after_id) else None
+
+    # --- receiving ---
+    def start(self) -> None:
+        with _lock:
+            if self._thread and self._thread.is_alive():
+                return
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text("CREATE SEQUENCE IF NOT EXISTS realtime_event_id_seq"))
+            except Exception:
+                log.exception("realtime: could not create realtime_event_id_seq")
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="realtime-listen", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        try:
+            self._wake_w.send(b"x")
+        except OSError:
+            pass
+
+    def _loop(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                # Dedicated connection in autocommit so notifications are never held by a transaction
+                with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    raw = conn.connection.dbapi_connection
+                    for ch in CHANNELS:
+                        conn.exec_driver_sql(f'LISTEN "{ch}"')
+                    if attempt:
+                        self.hub._count("reconnects")
+                        log.info("realtime: LISTEN connection restored after %d attempt(s)", attempt)
+                    attempt = 0
+                    self._drain(raw)  # anything that arrived while (re)connecting
+                    while not self._stop.is_set():
+                        ready, _, _ = _select.select([raw, self._wake_r], [], [])
+                        if self._wake_r in ready:
+                            self._wake_r.recv(64)
+                        if raw in ready:
+                            raw.poll()
+                            self._drain(raw)
+            except Exception:
+                self.hub._count("errors")
+                attempt += 1
+                delay = _backoff(attempt)
+                log.warning("realtime: LISTEN connection failed (attempt %d), retrying in %.1fs",
+                            attempt, delay, exc_info=attempt == 1)
+                self._stop.wait(delay)
+
+    def _drain(self, raw) -> None:
+        while raw.notifies:
+            n = raw.notifies.pop(0)
+            self.hub._count("received")
+            try:
+                data = json.loads(n.payload)
+                self.hub.publish({"channel": n.channel, **data})
+            except Exception:
+                self.hub.publish({"channel": n.channel, "type": "raw", "payload": n.payload})
+
+
+class OutboxTransport(Transport):
+    name = "outbox"
+    BATCH = 500
+
+    def __init__(self, hub, engine, poll_seconds: float = 0.5, keep_seconds: int = 300):
+        super().__init__(hub, engine)
+        self.poll_seconds = poll_seconds
+        self.keep = timedelta(seconds=keep_seconds)
+        self.origin = uuid.uuid4().hex
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _rows(self, events: List[Event]):
+        now = datetime.utcnow()
+        return [{"origin": self.origin, "channel": ch, "payload": _dumps(p), "created_at": now} for ch, p in events]
+
+    _INSERT = insert(RealtimeOutbox.__table__).returning(RealtimeOutbox.id, sort_by_parameter_order=True)
+
+    @staticmethod
+    def _numbered(events: List[Event], ids) -> None:
+        for i, eid in enumerate(ids):
+            channel, payload = events[i]
+            events[i] = (channel, {**payload, "event_id": eid})
+
+    # SQLite: a single writer numbers one INSERT's rows consecutively, so the
+    # ids can be sorted instead of asking for ordered RETURNING (which
+    # SQLAlchemy can only do there one row per statement)
+    _INSERT_SQLITE = insert(RealtimeOutbox.__table__).returning(RealtimeOutbox.id)
+
+    def _insert(self, conn, events: List[Event]) -> None:
+        if conn.dialect.name == "sqlite":
+            ids = sorted(conn.execute(self._INSERT_SQLITE, self._rows(events)).scalars().all())
+        else:
+            ids = conn.execute(self._INSERT, self._rows(events)).scalars().all()
+        self._numbered(events, ids)
+
+    def write(self, session, events: List[Event]) -> None:
+        # events is the session's pending list: after_commit() then delivers them with their ids
+        self._insert(session.connection(), events)
+
+    def send_now(self, events: List[Event]) -> None:
+        events = list(events)
+        with self.engine.begin() as conn:
+            self._insert(conn, events)
+        self._deliver_local(events)
+
+    def history(self, after_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        with self.engine.connect() as conn:
+            first = conn.execute(select(func.min(RealtimeOutbox.id))).scalar()
+            if first is None:
+                return []
+            if first > after_id + 1:
+                return None  # pruned
+            rows = conn.execute(
+                select(RealtimeOutbox.id, RealtimeOutbox.channel, RealtimeOutbox.payload)
+                .where(RealtimeOutbox.id > after_id)
+                .order_by(RealtimeOutbox.id)
+                .limit(limit + 1)
+            ).all()
+        if len(rows) > limit:
+            return None
+        return [self._decode(r) for r in rows]
+
+    @staticmethod
+    def _decode(row) -> Dict[str, Any]:
+        try:
+            return {"channel": row.channel, **json.loads(row.payload), "event_id": row.id}
+        except Exception:
+            return {"channel": row.channel, "type": "raw", "payload": row.payload, "event_id": row.id}
+
+    def start(self) -> None:
+        with _lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="realtime-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        last_id: Optional[int] = None
+        attempt = 0
+        next_prune = datetime.utcnow()
+        delay = self.poll_seconds
+        while not self._stop.wait(delay):
+            delay = self.poll_seconds
+            try:
+                with self.engine.connect() as conn:
+                    if last_id is None:  # start at the tail: history is not replayed
+                        last_id = conn.execute(select(func.max(RealtimeOutbox.id))).scalar() or 0
+                        continue
+                    rows = conn.execute(
+                        select(RealtimeOutbox.id, RealtimeOutbox.origin, RealtimeOutbox.channel, RealtimeOutbox.payload)
+                        .where(RealtimeOutbox.id > last_id)
+                        .order_by(RealtimeOutbox.id)
+                        .limit(self.BATCH)
+                    ).all()
+                    if datetime.utcnow() >= next_prune:
+                        # never the newest row: ids must not restart (SQLite reuses max(id) + 1)
+                        newest = select(func.max(RealtimeOutbox.id)).scalar_subquery()
+                        conn.execute(delete(RealtimeOutbox).where(
+                            RealtimeOutbox.created_at < datetime.utcnow() - self.keep,
+                            RealtimeOutbox.id < newest,
+                        ))
+                        conn.commit()
+                        next_prune = datetime.utcnow() + self.keep / 4
+                if attempt:
+                    self.hub._count("reconnects")
+                attempt = 0
+                for row in rows:
+                    last_id = row.id
+                    if row.origin == self.origin:
+                        continue  # delivered locally after our own commit
+                    self.hub._count("received")
+                    self.hub.publish(self._decode(row))
+                if len(rows) == self.BATCH:
+                    delay = 0  # more waiting
+            except Exception:
+                self.hub._count("errors")
+                attempt += 1
+                delay = max(self.poll_seconds, _backoff(attempt))
+                log.warning("realtime: outbox read failed (attempt %d)", attempt, exc_info=attempt == 1)
+
+
+def make_transport(app) -> Transport:
+    from .broker import hub
+
+    cfg = app.config
+    kind = (cfg.get("REALTIME_TRANSPORT") or "auto").lower()
+    engine = db.engine
+    if kind == "auto":
+        kind = "pg" if engine.dialect.name == "postgresql" else "outbox"
+    if kind == "pg":
+        return PgNotifyTransport(hub, engine, db_triggers=bool(cfg.get("REALTIME_DB_TRIGGERS")))
+    if kind == "outbox":
+        return OutboxTransport(
+            hub, engine,
+            poll_seconds=float(cfg.get("REALTIME_OUTBOX_POLL_SECONDS", 0.5)),
+            keep_seconds=int(cfg.get("REALTIME_OUTBOX_KEEP_SECONDS", 300)),
+        )
+    if kind != "local":
+        app.logger.warning("realtime: unknown REALTIME_TRANSPORT %r, using local", kind)
+    return LocalTransport(hub, engine)
+
+
+def get_transport() -> Transport:
+    app = current_app._get_current_object()
+    t = app.extensions.get("realtime_transport")
+    if t is None:
+        with _lock:
+            t = app.extensions.get("realtime_transport")
+            if t is None:
+                t = app.extensions["realtime_transport"] = make_transport(app)
+    return t
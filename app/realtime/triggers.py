@@ -6,27 +6,46 @@ SQL = dedent("""
 -- === REALTIME NOTIFY TRIGGERS (PostgreSQL) ===
 -- Broadcast lightweight JSON on:
 --   feed_posts, feed_comments, feed_reactions, feed_notifications
+-- Feed events carry the post audience (audience_type / audience_id /
+-- audience_users) so the hub only routes them to viewers of the post.
+-- Every payload gets an event_id from realtime_event_id_seq (SSE Last-Event-ID).
+
+CREATE SEQUENCE IF NOT EXISTS realtime_event_id_seq;
+
+CREATE OR REPLACE FUNCTION fn_rt_post_audience(pid integer) RETURNS jsonb AS $$
+  SELECT jsonb_build_object(
+    'audience_type', p.audience_type,
+    'audience_id', p.audience_id,
+    'audience_users', CASE WHEN p.audience_type = 'users' THEN
+        (SELECT coalesce(jsonb_agg(a.user_id), '[]'::jsonb) FROM feed_post_allowed_users a WHERE a.post_id = p.id)
+      END
+  )
+  FROM feed_posts p WHERE p.id = pid;
+$$ LANGUAGE sql STABLE;
 
 -- FEED POSTS
 CREATE OR REPLACE FUNCTION fn_rt_feed_post() RETURNS trigger AS $$
 BEGIN
   IF TG_OP = 'INSERT' THEN
     PERFORM pg_notify('feed_events',
-      json_build_object(
+      (jsonb_build_object(
         'type','post',
         'id', NEW.id,
         'author_id', NEW.author_id,
-        'audience_type', NEW.audience_type,
-        'audience_id', NEW.audience_id,
         'created_at', to_char(NEW.created_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
-      )::text
+      ) || coalesce(fn_rt_post_audience(NEW.id), '{}'::jsonb)
+         || jsonb_build_object('event_id', nextval('realtime_event_id_seq')))::text
     );
   END IF;
   RETURN NEW;
 END; $$ LANGUAGE plpgsql;
 
+-- Deferred to commit: feed_post_allowed_users rows are inserted after the post
+-- row in the same transaction, so an immediate trigger would always see an
+-- empty audience_users list for 'users' posts.
 DROP TRIGGER IF EXISTS trg_rt_feed_post ON feed_posts;
-CREATE TRIGGER trg_rt_feed_post AFTER INSERT ON feed_posts
+CREATE CONSTRAINT TRIGGER trg_rt_feed_post AFTER INSERT ON feed_posts
+DEFERRABLE INITIALLY DEFERRED
 FOR EACH ROW EXECUTE FUNCTION fn_rt_feed_post();
 
 -- FEED COMMENTS
@@ -34,13 +53,14 @@ CREATE OR REPLACE FUNCTION fn_rt_feed_comment() RETURNS trigger AS $$
 BEGIN
   IF TG_OP = 'INSERT' THEN
     PERFORM pg_notify('feed_events',
-      json_build_object(
+      (jsonb_build_object(
         'type','comment',
         'id', NEW.id,
         'post_id', NEW.post_id,
         'author_id', NEW.author_id,
         'created_at', to_char(NEW.created_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
-      )::text
+      ) || coalesce(fn_rt_post_audience(NEW.post_id), '{}'::jsonb)
+         || jsonb_build_object('event_id', nextval('realtime_event_id_seq')))::text
     );
   END IF;
   RETURN NEW;
@@ -55,14 +75,15 @@ CREATE OR REPLACE FUNCTION fn_rt_feed_reaction() RETURNS trigger AS $$
 BEGIN
   IF TG_OP = 'INSERT' THEN
     PERFORM pg_notify('feed_events',
-      json_build_object(
+      (jsonb_build_object(
         'type','reaction',
         'id', NEW.id,
         'post_id', NEW.post_id,
         'user_id', NEW.user_id,
         'emoji', NEW.emoji,
         'created_at', to_char(NEW.created_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
-      )::text
+      ) || coalesce(fn_rt_post_audience(NEW.post_id), '{}'::jsonb)
+         || jsonb_build_object('event_id', nextval('realtime_event_id_seq')))::text
     );
   END IF;
   RETURN NEW;
@@ -77,13 +98,14 @@ CREATE OR REPLACE FUNCTION fn_rt_feed_notification() RETURNS trigger AS $$
 BEGIN
   IF TG_OP = 'INSERT' THEN
     PERFORM pg_notify('notif_events',
-      json_build_object(
+      jsonb_build_object(
         'type', NEW.kind,
         'id', NEW.id,
         'user_id', NEW.user_id,
         'actor_id', NEW.actor_id,
         'post_id', NEW.post_id,
-        'created_at', to_char(NEW.created_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
+        'created_at', to_char(NEW.created_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"'),
+        'event_id', nextval('realtime_event_id_seq')
       )::text
     );
   END IF;
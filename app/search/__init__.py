@@ -0,0 +1,11 @@
+# app/search/__init__.py
+from flask import Blueprint
+
+bp = Blueprint(
+    "search_api",
+    __name__,
+    url_prefix="/api/search",
+)
+
+from . import indexer  # noqa: E402,F401  (registers SQLAlchemy listeners)
+from . import api  # noqa: E402,F401
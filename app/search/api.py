@@ -0,0 +1,164 @@
+# app/search/api.py
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import column, func, literal_column, table
+
+from app.extensions import db
+from app.feed_search.backends import MARK_START, MARK_END, render_snippet, _tokens
+from . import bp
+from .fts import fts_ready, install_index
+from .indexer import SEARCH_TYPES
+from .models import SearchDocument
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 25
+_FTS_TTL = 300  # seconds before index availability is re-checked
+
+
+def _cursor_decode(cur: Optional[str]) -> Tuple[Optional[datetime], Optional[int]]:
+    # same "<epoch ms>.<id>" format as the feed cursors
+    if not cur:
+        return None, None
+    try:
+        ts_str, id_str = cur.split(".", 1)
+        return datetime.utcfromtimestamp(int(ts_str) / 1000.0), int(id_str)
+    except Exception:
+        return None, None
+
+
+def _cursor_encode(doc: SearchDocument) -> str:
+    ms = int((doc.created_at - datetime(1970, 1, 1)).total_seconds() * 1000)
+    return f"{ms}.{doc.id}"
+
+
+def _use_fts() -> bool:
+    """Is the FTS index over search_documents usable? (cached for _FTS_TTL; SQLite installs on demand)"""
+    cached = current_app.extensions.get("search_fts_ready")
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    try:
+        with db.engine.connect() as conn:
+            ready = fts_ready(conn)
+        if not ready and db.engine.dialect.name == "sqlite":
+            install_index()
+            ready = True
+    except Exception:
+        current_app.logger.exception("search index: FTS unavailable, using ILIKE")
+        ready = False
+    current_app.extensions["search_fts_ready"] = (ready, time.monotonic() + _FTS_TTL)
+    return ready
+
+
+def _match(q, tokens: List[str]):
+    """Add the text match + snippet column for the active dialect."""
+    dialect = db.engine.dialect.name
+    if _use_fts() and dialect == "sqlite":
+        fts_tbl = table("search_documents_fts", column("rowid"))
+        fts = literal_column("search_documents_fts")
+        q = q.join(fts_tbl, fts_tbl.c.rowid == SearchDocument.id) \
+             .filter(fts.op("MATCH")(" ".join('"%s"*' % t for t in tokens)))
+        return q, func.snippet(fts, 1, MARK_START, MARK_END, "…", 24)
+    if _use_fts() and dialect == "postgresql":
+        from app.feed_search.fts import pg_config
+        cfg = literal_column(f"'{pg_config()}'::regconfig")
+        tsq = func.to_tsquery(cfg, " & ".join(f"{t}:*" for t in tokens))
+        q = q.filter(literal_column("search_documents.tsv").op("@@")(tsq))
+        return q, func.ts_headline(
+            cfg, func.coalesce(SearchDocument.body, ""), tsq,
+            f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10",
+        )
+    for t in tokens:
+        like = f"%{t}%"
+        q = q.filter(db.or_(SearchDocument.title.ilike(like), SearchDocument.body.ilike(like)))
+    return q, None
+
+
+def _search_type(doc_type: str, tokens: List[str], limit: int, cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    st = SEARCH_TYPES[doc_type]
+    visible = st.visible_ids(current_user)
+    if visible is None:
+        return None
+
+    q = db.session.query(SearchDocument).filter(
+        SearchDocument.doc_type == doc_type,
+        SearchDocument.doc_id.in_(visible.statement),
+    )
+    q, snippet = _match(q, tokens)
+    if snippet is not None:
+        q = q.add_columns(snippet.label("snippet"))
+
+    cur_dt, cur_id = _cursor_decode(cursor)
+    if cur_dt is not None and cur_id is not None:
+        q = q.filter(db.or_(
+            SearchDocument.created_at < cur_dt,
+            db.and_(SearchDocument.created_at == cur_dt, SearchDocument.id < cur_id),
+        ))
+    rows = q.order_by(SearchDocument.created_at.desc(), SearchDocument.id.desc()).limit(limit + 1).all()
+
+    page = rows[:limit]
+    docs = [r[0] if snippet is not None else r for r in page]
+    extra = st.links([d.doc_id for d in docs]) if docs else {}
+    items = []
+    for row, d in zip(page, docs):
+        raw = row[1] if snippet is not None else None
+        items.append({
+            "type": doc_type,
+            "id": d.doc_id,
+            "title": d.title or "",
+            "snippet": render_snippet(raw) if raw else render_snippet((d.body or "")[:200]),
+            "created_at": d.created_at.isoformat() if d.created_at else None,
+            **extra.get(d.doc_id, {}),
+        })
+    return {
+        "items": items,
+        "next": _cursor_encode(docs[-1]) if len(rows) > limit and docs else None,
+    }
+
+
+@bp.get("")
+@bp.get("/")
+@login_required
+def search():
+    """
+    GET /api/search?q=term[&types=feed_post,ticket,...][&limit=5]
+    GET /api/search?q=term&type=ticket&cursor=<next>     (page one type)
+
+    Returns permission-filtered hits grouped by type:
+      {"ok": true, "results": {"ticket": {"items": [...], "next": "..."}, ...}}
+    """
+    term = (request.args.get("q") or "").strip()
+    tokens = _tokens(term)
+    if not tokens:
+        return jsonify({"ok": True, "results": {}})
+
+    try:
+        limit = max(1, min(int(request.args.get("limit") or DEFAULT_LIMIT), MAX_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+
+    single = (request.args.get("type") or "").strip()
+    if single:
+        if single not in SEARCH_TYPES:
+            return jsonify({"ok": False, "error": "unknown type"}), 400
+        types = [single]
+    else:
+        raw = (request.args.get("types") or "").strip()
+        types = [t for t in raw.split(",") if t in SEARCH_TYPES] if raw else list(SEARCH_TYPES)
+
+    results: Dict[str, Any] = {}
+    try:
+        for doc_type in types:
+            res = _search_type(doc_type, tokens, limit, request.args.get("cursor") if single else None)
+            if res is not None:
+                results[doc_type] = res
+    except Exception as e:
+        current_app.logger.exception("unified search failed")
+        return jsonify({"ok": False, "error": "internal", "detail": str(e)}), 500
+
+    return jsonify({"ok": True, "results": results})
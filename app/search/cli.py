@@ -0,0 +1,28 @@
+# app/search/cli.py
+import click
+from flask.cli import AppGroup
+
+search_cli = AppGroup("search", help="Unified search index commands")
+
+
+@search_cli.command("install")
+def install():
+    """Create the FTS structures over search_documents (idempotent)."""
+    from app.search.fts import install_index
+
+    install_index()
+    click.echo("Search index installed.")
+
+
+@search_cli.command("reindex")
+@click.option("--type", "doc_types", multiple=True, help="Only these document types (repeatable).")
+@click.option("--batch-size", default=500, show_default=True)
+def reindex_cmd(doc_types, batch_size: int):
+    """Rebuild search_documents from the source tables."""
+    from app.search.indexer import SEARCH_TYPES, reindex
+
+    unknown = [t for t in doc_types if t not in SEARCH_TYPES]
+    if unknown:
+        raise click.BadParameter(f"unknown type(s): {', '.join(unknown)}; known: {', '.join(SEARCH_TYPES)}")
+    for doc_type, n in reindex(list(doc_types) or None, batch_size=batch_size).items():
+        click.echo(f"{doc_type}: {n}")
@@ -0,0 +1,93 @@
+# app/search/fts.py
+from textwrap import dedent
+from flask import current_app
+from sqlalchemy import text
+from app.extensions import db
+from app.feed_search.fts import pg_config, _sqlite_statements
+
+PG_SQL = dedent("""
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name='search_documents' AND column_name='tsv'
+  ) THEN
+    ALTER TABLE search_documents
+      ADD COLUMN tsv tsvector
+      GENERATED ALWAYS AS (
+        setweight(to_tsvector('{cfg}', coalesce(title,'')), 'A') ||
+        setweight(to_tsvector('{cfg}', coalesce(body,'')), 'B')
+      ) STORED;
+  END IF;
+END$$;
+
+CREATE INDEX IF NOT EXISTS idx_search_documents_fts ON search_documents USING GIN (tsv);
+""")
+
+PG_DROP_SQL = dedent("""
+DROP INDEX IF EXISTS idx_search_documents_fts;
+ALTER TABLE search_documents DROP COLUMN IF EXISTS tsv;
+""")
+
+SQLITE_SQL = dedent("""
+CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+  title, body,
+  content='search_documents', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_search_documents_fts_ai AFTER INSERT ON search_documents BEGIN
+  INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_documents_fts_ad AFTER DELETE ON search_documents BEGIN
+  INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_documents_fts_au AFTER UPDATE OF title, body ON search_documents BEGIN
+  INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+  INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+""")
+
+
+def fts_ready(conn) -> bool:
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        return bool(conn.execute(text("""
+            SELECT to_regclass('public.idx_search_documents_fts') IS NOT NULL
+               AND EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name='search_documents' AND column_name='tsv')
+        """)).scalar())
+    if dialect == "sqlite":
+        return conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='search_documents_fts'"
+        )).first() is not None
+    return False
+
+
+def install_index():
+    """Create the FTS structures over search_documents (idempotent)."""
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text(PG_SQL.format(cfg=pg_config())))
+        elif dialect == "sqlite":
+            fresh = not fts_ready(conn)
+            for stmt in _sqlite_statements(SQLITE_SQL):
+                conn.execute(text(stmt))
+            if fresh:
+                conn.execute(text("INSERT INTO search_documents_fts(search_documents_fts) VALUES ('rebuild')"))
+    current_app.extensions.pop("search_fts_ready", None)
+
+
+def drop_index():
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text(PG_DROP_SQL))
+        elif dialect == "sqlite":
+            for name in ("trg_search_documents_fts_ai", "trg_search_documents_fts_ad", "trg_search_documents_fts_au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            conn.execute(text("DROP TABLE IF EXISTS search_documents_fts"))
+    current_app.extensions.pop("search_fts_ready", None)
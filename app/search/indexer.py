@@ -0,0 +1,282 @@
+# app/search/indexer.py
+"""
+Keeps search_documents in sync with the source tables.
+
+Each searchable model is described by a SearchType: which columns feed the
+index, how to turn a row into (title, body, created_at), and a SQL subquery of
+the source ids the current user may see (the same rules the module itself
+uses). Mapper after_insert/after_update/after_delete listeners write the
+document on the flushing connection, so the index commits or rolls back
+together with the change.
+"""
+from __future__ import annotations
+
+import html as _html
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, select
+
+from app.extensions import db
+from app.models import PlanTask
+from app.feed.models import FeedPost
+from app.tickets.models import Ticket
+from app.war.models_war import WarCompany, WarInteraction
+from app.callendar.models import Event, EventAttendee
+from .models import SearchDocument
+
+DocTuple = Tuple[str, str, datetime]
+
+
+def plain_text(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    s = re.sub(r"<[^>]+>", " ", value)
+    return re.sub(r"\s+", " ", _html.unescape(s)).strip()
+
+
+@dataclass
+class SearchType:
+    doc_type: str
+    model: Any
+    fields: Tuple[str, ...]
+    # (row, connection) -> (title, body, created_at) or None to drop from the index
+    to_doc: Callable[[Any, Any], Optional[DocTuple]]
+    # user -> SELECT of visible source ids, or None when the module is off-limits
+    visible_ids: Callable[[Any], Any]
+    # [doc_id, ...] -> {doc_id: extra hit fields (urls etc.)}, one call per page
+    links: Callable[[List[int]], Dict[int, Dict[str, Any]]] = field(default=lambda ids: {})
+
+
+SEARCH_TYPES: Dict[str, SearchType] = {}
+
+
+def register(st: SearchType) -> None:
+    SEARCH_TYPES[st.doc_type] = st
+    event.listen(st.model, "after_insert", _after_write(st))
+    event.listen(st.model, "after_update", _after_write(st, only_changes=True))
+    event.listen(st.model, "after_delete", _after_delete(st))
+
+
+# -----------------------------------------------------------------------------
+# Listeners
+# -----------------------------------------------------------------------------
+def _write_doc(st: SearchType, connection, target) -> None:
+    doc = st.to_doc(target, connection)
+    connection.execute(
+        delete(SearchDocument.__table__).where(
+            SearchDocument.doc_type == st.doc_type,
+            SearchDocument.doc_id == target.id,
+        )
+    )
+    if doc is None:
+        return
+    title, body, created_at = doc
+    connection.execute(insert(SearchDocument.__table__).values(
+        doc_type=st.doc_type,
+        doc_id=target.id,
+        title=(title or "")[:300],
+        body=body or "",
+        created_at=created_at or datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+    ))
+
+
+def _after_write(st: SearchType, only_changes: bool = False):
+    def listener(mapper, connection, target):
+        if only_changes:
+            state = inspect(target)
+            if not any(state.attrs[f].history.has_changes() for f in st.fields):
+                return
+        _write_doc(st, connection, target)
+    return listener
+
+
+def _after_delete(st: SearchType):
+    def listener(mapper, connection, target):
+        connection.execute(
+            delete(SearchDocument.__table__).where(
+                SearchDocument.doc_type == st.doc_type,
+                SearchDocument.doc_id == target.id,
+            )
+        )
+    return listener
+
+
+def reindex(doc_types: Optional[List[str]] = None, batch_size: int = 500) -> Dict[str, int]:
+    """Rebuild documents for the given types (default: all) from the source tables."""
+    counts: Dict[str, int] = {}
+    for doc_type in doc_types or list(SEARCH_TYPES):
+        st = SEARCH_TYPES[doc_type]
+        db.session.execute(delete(SearchDocument).where(SearchDocument.doc_type == doc_type))
+        db.session.commit()
+        n, last_id = 0, 0
+        while True:
+            rows = (st.model.query
+                    .filter(st.model.id > last_id)
+                    .order_by(st.model.id)
+                    .limit(batch_size)
+                    .all())
+            if not rows:
+                break
+            conn = db.session.connection()
+            for row in rows:
+                _write_doc(st, conn, row)
+            db.session.commit()
+            n += len(rows)
+            last_id = rows[-1].id
+        counts[doc_type] = n
+    return counts
+
+
+# -----------------------------------------------------------------------------
+# Type definitions
+# -----------------------------------------------------------------------------
+def _safe_url(endpoint: str, **values) -> Optional[str]:
+    from flask import url_for
+    try:
+        return url_for(endpoint, **values)
+    except Exception:
+        return None
+
+
+# --- feed posts ---
+def _feed_doc(p: FeedPost, conn) -> Optional[DocTuple]:
+    if p.is_deleted:
+        return None
+    return p.title or "", plain_text(p.html), p.created_at
+
+
+def _feed_visible(user):
+    from app.feed.permissions import feed_queryset_for_current_user
+    return feed_queryset_for_current_user(FeedPost.query, user=user).with_entities(FeedPost.id)
+
+
+register(SearchType(
+    doc_type="feed_post",
+    model=FeedPost,
+    fields=("title", "html", "is_deleted"),
+    to_doc=_feed_doc,
+    visible_ids=_feed_visible,
+    links=lambda ids: {i: {"api_url": _safe_url("feed_api.get_post", post_id=i)} for i in ids},
+))
+
+
+# --- tickets ---
+def _ticket_doc(t: Ticket, conn) -> Optional[DocTuple]:
+    return t.title or "", plain_text(t.description), t.created_at
+
+
+def _ticket_visible(user):
+    from app.tickets.permissions import visibility_filter
+    return visibility_filter(Ticket.query, user).with_entities(Ticket.id)
+
+
+register(SearchType(
+    doc_type="ticket",
+    model=Ticket,
+    fields=("title", "description"),
+    to_doc=_ticket_doc,
+    visible_ids=_ticket_visible,
+    links=lambda ids: {i: {"url": _safe_url("tickets.view", ticket_id=i)} for i in ids},
+))
+
+
+# --- plan tasks ---
+def _plan_doc(t: PlanTask, conn) -> Optional[DocTuple]:
+    if t.deleted_at is not None:
+        return None
+    # created_at is a server default: read it without triggering a refresh mid-flush
+    return t.title or "", plain_text(t.description), inspect(t).dict.get("created_at")
+
+
+def _plan_visible(user):
+    # mirrors plan/routes.py::ensure_task_visible_to_user
+    from app.plan.routes import is_director, director_department_ids
+    q = db.session.query(PlanTask.id).filter(PlanTask.deleted_at.is_(None))
+    if is_director(user):
+        return q.filter(PlanTask.department_id.in_(director_department_ids(user) or [-1]))
+    return q.filter(PlanTask.owner_user_id == user.id)
+
+
+register(SearchType(
+    doc_type="plan_task",
+    model=PlanTask,
+    fields=("title", "description", "deleted_at"),
+    to_doc=_plan_doc,
+    visible_ids=_plan_visible,
+    links=lambda ids: {i: {"api_url": _safe_url("plan.api_task_get", task_id=i)} for i in ids},
+))
+
+
+# --- war interactions ---
+def _war_doc(it: WarInteraction, conn) -> Optional[DocTuple]:
+    company = conn.execute(
+        select(WarCompany.name).where(WarCompany.id == it.company_id)
+    ).scalar() or ""
+    kind = getattr(it.kind, "value", it.kind) or ""
+    return f"{company} · {kind}".strip(" ·"), plain_text(it.text), it.created_at
+
+
+def _war_visible(user):
+    # mirrors war/routes.py: war.view + company linked to the user's department
+    from app.permissions import has_permission, is_admin_like
+    q = db.session.query(WarInteraction.id)
+    if is_admin_like(user):
+        return q
+    if not has_permission(user, "war.view"):
+        return None
+    dep_id = getattr(user, "department_id", None)
+    if dep_id is None:
+        return None
+    return q.filter(
+        WarInteraction.department_id == dep_id,
+        WarInteraction.company.has(WarCompany.departments.any(id=dep_id)),
+    )
+
+
+def _war_links(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    rows = db.session.query(WarInteraction.id, WarInteraction.company_id).filter(WarInteraction.id.in_(ids)).all()
+    return {
+        iid: {
+            "company_id": cid,
+            "api_url": _safe_url("war.api_interactions_list", company_id=cid),
+        }
+        for iid, cid in rows
+    }
+
+
+register(SearchType(
+    doc_type="war_interaction",
+    model=WarInteraction,
+    fields=("text", "kind", "company_id", "archived"),
+    to_doc=_war_doc,
+    visible_ids=_war_visible,
+    links=_war_links,
+))
+
+
+# --- calendar events ---
+def _event_doc(e: Event, conn) -> Optional[DocTuple]:
+    return e.title or "", plain_text(e.description), e.start_dt or e.created_at
+
+
+def _event_visible(user):
+    # mirrors callendar get_events_for_user: organiser or attendee
+    attendee = db.session.query(EventAttendee.id).filter(
+        EventAttendee.event_id == Event.id,
+        EventAttendee.user_id == user.id,
+    ).exists()
+    return db.session.query(Event.id).filter(db.or_(Event.organiser_id == user.id, attendee))
+
+
+register(SearchType(
+    doc_type="event",
+    model=Event,
+    fields=("title", "description", "start_dt"),
+    to_doc=_event_doc,
+    visible_ids=_event_visible,
+    links=lambda ids: {i: {"api_url": _safe_url("callendar.api_get_event", event_id=i)} for i in ids},
+))
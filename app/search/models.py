@@ -0,0 +1,27 @@
+# app/search/models.py
+from datetime import datetime
+from app.extensions import db
+
+
+class SearchDocument(db.Model):
+    """
+    One row per searchable record (feed post, ticket, plan task, war interaction,
+    calendar event). Kept in sync by app/search/indexer.py; permission checks are
+    applied at query time against the source tables.
+    """
+    __tablename__ = "search_documents"
+
+    id = db.Column(db.Integer, primary_key=True)
+    doc_type = db.Column(db.String(32), nullable=False)
+    doc_id = db.Column(db.Integer, nullable=False)
+
+    title = db.Column(db.String(300))
+    body = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("doc_type", "doc_id", name="uq_search_documents_type_doc"),
+        db.Index("ix_search_documents_type_created_id", "doc_type", "created_at", "id"),
+    )
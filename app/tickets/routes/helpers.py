@@ -8,6 +8,7 @@ from typing import Optional, List, Any
 from flask import current_app, request, abort
 from werkzeug.utils import secure_filename
 
+from app import blobs
 from app.models import User, Department
 from app.tickets.models import TicketPriority, TicketStatus, TicketChecklist
 
@@ -56,7 +57,7 @@ def save_comment_file_under_ticket_root(file_storage, rel_dir: Path) -> Optional
     abs_dir.mkdir(parents=True, exist_ok=True)
     filename = f"{uuid4().hex}_{secure_filename(file_storage.filename)}"
     abs_path = abs_dir / filename
-    file_storage.save(str(abs_path))
+    blobs.save(file_storage, abs_path)
     return str((rel_dir / filename).as_posix())
 
 # -------------------------
@@ -1,11 +1,20 @@
 import os
 from pathlib import Path
 
-from flask import request, jsonify, send_from_directory, Blueprint, current_app
+from flask import request, jsonify, send_from_directory, Blueprint, current_app, redirect, url_for
 from flask_login import login_required, current_user
 
+from app.extensions import db
 from . import bp
-from .storage import save_file, make_thumbnail, get_upload_root
+from .storage import save_file, get_upload_root, _HAS_PIL
+from .models import UploadDerivativeJob
+from .derivatives import queue_image, submit, variant_url, original_url, allowed_variants
+
+# Shown at a derivative URL until the worker has rendered it
+_PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">'
+    '<rect width="64" height="64" fill="#e5e7eb"/></svg>'
+)
 
 # ---------- Public file serving (no auth) ----------
 # We expose a tiny public blueprint at /u/<path> for the URLs we issue.
@@ -24,6 +33,30 @@ def serve_upload(relpath: str):
         return ("Not found", 404)
     return send_from_directory(abs_path.parent.as_posix(), abs_path.name, conditional=True)
 
+
+@public_bp.route("/_d/<token>/<variant>")
+def serve_derivative(token: str, variant: str):
+    """
+    Stable preview URL: placeholder while rendering, then a redirect to the file.
+    Keyed by the job's random token (this blueprint has no auth); never redirects
+    to the original, so a failed job or an unknown variant is a 404.
+    """
+    if variant not in allowed_variants():
+        return ("Not found", 404)
+    job = UploadDerivativeJob.query.filter_by(token=token).first() if token else None
+    if not job:
+        return ("Not found", 404)
+    if job.status == "pending":
+        resp = current_app.response_class(_PLACEHOLDER_SVG, mimetype="image/svg+xml")
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    target = variant_url(job, variant) if job.status == "done" else None
+    if not target:
+        return ("Not found", 404)
+    resp = redirect(target, code=302)
+    resp.headers["Cache-Control"] = "public, max-age=86400"
+    return resp
+
 # You must register public_bp alongside this module's bp in your app factory.
 
 
@@ -33,38 +66,65 @@ def serve_upload(relpath: str):
 def upload_feed_files():
     """
     Multipart upload: field name 'files' (can be multiple).
-    Returns: { ok, items: [ { name, mime, size, url, preview_url } ] }
+    Returns: { ok, items: [ { name, mime, size, url, preview_url, job_id?, status_url? } ] }
     Access: anyone logged in; your feed audience rules govern visibility.
+
+    Images are only written to disk here; thumbnails/WebP sizes are rendered in
+    the background (derivatives.py). preview_url is stable: a placeholder until
+    the thumbnail exists, then a redirect to it.
     """
     if "files" not in request.files:
         return jsonify({"ok": False, "error": "No files"}), 400
 
     files = request.files.getlist("files")
     items = []
+    jobs = []
     for f in files:
         try:
             abs_path, url = save_file(f, subdir="feed")
-            preview_url = None
-            if (f.mimetype or "").startswith("image/"):
-                t = make_thumbnail(abs_path)
-                if t:
-                    preview_url = t[1]
-            items.append({
+            is_image = (f.mimetype or "").startswith("image/")
+            item = {
                 "name": f.filename,
                 "mime": f.mimetype,
                 "size": os.path.getsize(abs_path),
                 "url": url,
-                "preview_url": preview_url or url if (f.mimetype or "").startswith("image/") else None
-            })
+                "preview_url": url if is_image else None,
+            }
+            if is_image and _HAS_PIL:
+                job = queue_image(abs_path)
+                jobs.append(job)
+                item["job_id"] = job.id
+                item["preview_url"] = url_for("uploads_public.serve_derivative", token=job.token, variant="thumb")
+                item["status_url"] = url_for("uploader.derivative_status", token=job.token)
+            items.append(item)
         except ValueError as e:
             return jsonify({"ok": False, "error": str(e)}), 400
         except Exception as e:
             current_app.logger.exception("Upload error: %s", e)
             return jsonify({"ok": False, "error": "Upload failed"}), 500
 
+    if jobs:
+        db.session.commit()  # the pool callback updates these rows from another session
+    for job in jobs:
+        try:
+            submit(job)
+        except Exception:
+            current_app.logger.exception("Could not queue derivatives for job %s", job.id)
+
     return jsonify({"ok": True, "items": items})
 
 
+@bp.get("/derivatives/<token>")
+@login_required
+def derivative_status(token: str):
+    """{ ok, status: pending|done|failed, url, variants: {thumb: url, w320: url, ...} }"""
+    job = UploadDerivativeJob.query.filter_by(token=token).first()
+    if not job:
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    variants = {name: variant_url(job, name) for name in (job.variants or {})}
+    return jsonify({"ok": True, "status": job.status, "url": original_url(job), "variants": variants})
+
+
 @bp.delete("/purge")
 @login_required
 def purge_file():
@@ -82,10 +142,9 @@ def purge_file():
         return jsonify({"ok": False, "error": "Not found"}), 404
     try:
         path.unlink(missing_ok=True)
-        # try thumbnail too
-        t = path.with_name(path.stem + "_thumb.jpg")
-        if t.exists():
-            t.unlink(missing_ok=True)
+        # derivatives too (_thumb.jpg, _w<size>.webp); stored names are unique uuids
+        for d in path.parent.glob(path.stem + "_*"):
+            d.unlink(missing_ok=True)
         return jsonify({"ok": True})
     except Exception:
         return jsonify({"ok": False, "error": "Cannot delete"}), 500
@@ -0,0 +1,15 @@
+# app/uploader/cli.py
+import click
+from flask.cli import AppGroup
+
+uploads_cli = AppGroup("uploads", help="Uploaded file maintenance")
+
+
+@uploads_cli.command("derivatives")
+@click.option("--retry-failed", is_flag=True, help="Also retry jobs that gave up.")
+def derivatives(retry_failed: bool):
+    """Render image derivatives still queued (e.g. after a restart)."""
+    from app.uploader.derivatives import process_pending
+
+    n = process_pending(include_failed=retry_failed)
+    click.echo(f"Processed {n} derivative job(s).")
@@ -0,0 +1,259 @@
+# app/uploader/derivatives.py
+"""
+Image derivatives (thumbnail + resized WebP) rendered off the request thread.
+
+upload_feed_files only writes the original to disk and queues a job; a process
+pool renders the variants and a done-callback records them in
+upload_derivative_jobs. Until then the stable preview URL
+(/u/_d/<token>/<variant>, token = random per job) serves a tiny placeholder,
+afterwards it redirects to the file.
+
+A failed render is resubmitted until MAX_ATTEMPTS, then the job is marked
+failed. Jobs left pending (lost callback, process restart) are picked up by
+requeue_stale() from the app scheduler.
+
+Rendering is cheap on big phone photos: JPEGs are decoded with Image.draft()
+(libjpeg DCT scaling to 1/2, 1/4 or 1/8 of full size), other formats use
+thumbnail(reducing_gap=...) (reduce() on load), EXIF orientation is applied,
+and every size is downscaled from the previous one.
+
+Config:
+  UPLOAD_DERIVATIVE_WORKERS   process pool size (default 2; 0 = render inline)
+  UPLOAD_DERIVATIVE_SIZES     WebP widths (default (320, 1280))
+  UPLOAD_THUMB_SIZE           JPEG "_thumb.jpg" preview (default 512)
+  UPLOAD_DERIVATIVE_STALE_SECONDS  requeue jobs pending this long (default 300; 0 = off)
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from flask import current_app
+
+from app.extensions import db
+from .models import UploadDerivativeJob
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (320, 1280)
+DEFAULT_THUMB = 512
+DEFAULT_STALE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# -----------------------------------------------------------------------------
+# Rendering (runs in the pool: plain paths in, file names out, no app context)
+# -----------------------------------------------------------------------------
+def _save_atomic(im, path: Path, fmt: str, **opts) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    im.save(tmp, format=fmt, **opts)
+    os.replace(tmp, path)
+
+
+def render_derivatives(src: str, sizes: Iterable[int], thumb_size: int) -> Dict[str, str]:
+    from PIL import Image, ImageOps
+
+    src_path = Path(src)
+    targets = sorted({int(s) for s in sizes} | {int(thumb_size)}, reverse=True)
+    out: Dict[str, str] = {}
+
+    with Image.open(src_path) as im:
+        if im.format == "JPEG":
+            # decode straight at the smallest DCT scale that still covers the largest target
+            im.draft("RGB", (targets[0], targets[0]))
+        im = ImageOps.exif_transpose(im)
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        im = im.convert("RGBA" if has_alpha else "RGB")
+
+        current = im
+        for size in targets:
+            current = current.copy()
+            current.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+
+            if size in sizes:
+                name = f"{src_path.stem}_w{size}.webp"
+                _save_atomic(current, src_path.with_name(name), "WEBP", quality=80, method=4)
+                out[f"w{size}"] = name
+
+            if size == thumb_size:
+                flat = current
+                if has_alpha:
+                    flat = Image.new("RGB", current.size, (255, 255, 255))
+                    flat.paste(current, mask=current.getchannel("A"))
+                name = f"{src_path.stem}_thumb.jpg"
+                _save_atomic(flat, src_path.with_name(name), "JPEG", quality=82, optimize=True, progressive=True)
+                out["thumb"] = name
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Dispatch
+# -----------------------------------------------------------------------------
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a threaded web worker (locks, DB connections)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _render_args(app, job: UploadDerivativeJob):
+    from .storage import get_upload_root
+    with app.app_context():
+        src = str(get_upload_root() / job.src_relpath)
+    sizes = tuple(app.config.get("UPLOAD_DERIVATIVE_SIZES", DEFAULT_SIZES))
+    return src, sizes, int(app.config.get("UPLOAD_THUMB_SIZE", DEFAULT_THUMB))
+
+
+def _record(app, job_id: int, variants: Optional[Dict[str, str]], error: Optional[str]) -> None:
+    """Store a render result; a failure below MAX_ATTEMPTS is resubmitted, then the job is failed."""
+    with app.app_context():
+        try:
+            job = db.session.get(UploadDerivativeJob, job_id)
+            if job is None:
+                return
+            job.attempts = (job.attempts or 0) + 1
+            if error is None:
+                job.status, job.variants, job.error = "done", variants or {}, None
+            else:
+                job.status = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+                job.error = error[:2000]
+            db.session.commit()
+            if job.status == "pending":
+                submit(job)
+        except Exception:
+            db.session.rollback()
+            log.exception("upload derivatives: recording job %s failed", job_id)
+        finally:
+            db.session.remove()
+
+
+def submit(job: UploadDerivativeJob) -> None:
+    """Render the job's variants in the pool (call after the job row is committed)."""
+    app = current_app._get_current_object()
+    workers = int(app.config.get("UPLOAD_DERIVATIVE_WORKERS", 2))
+    args = _render_args(app, job)
+    job_id = job.id
+
+    if workers <= 0:
+        run_one(app, job_id, args)
+        return
+
+    def _done(fut):
+        try:
+            _record(app, job_id, fut.result(), None)
+        except Exception as e:
+            _record(app, job_id, None, f"{type(e).__name__}: {e}")
+
+    try:
+        _get_pool(workers).submit(render_derivatives, *args).add_done_callback(_done)
+    except Exception as e:
+        # BrokenProcessPool / shutdown: start a fresh pool and count a failed attempt
+        # (_record resubmits to the new pool, or fails the job after MAX_ATTEMPTS)
+        log.exception("upload derivatives: pool unavailable for job %s", job_id)
+        _reset_pool()
+        _record(app, job_id, None, f"{type(e).__name__}: {e}")
+
+
+def run_one(app, job_id: int, args=None) -> None:
+    if args is None:
+        with app.app_context():
+            args = _render_args(app, db.session.get(UploadDerivativeJob, job_id))
+    try:
+        variants = render_derivatives(*args)
+    except Exception as e:
+        _record(app, job_id, None, f"{type(e).__name__}: {e}")
+    else:
+        _record(app, job_id, variants, None)
+
+
+def queue_image(abs_path: Path) -> UploadDerivativeJob:
+    """Add the job row for a freshly saved image (caller commits before submit())."""
+    from .storage import get_upload_root
+    rel = abs_path.resolve().relative_to(get_upload_root().resolve()).as_posix()
+    job = UploadDerivativeJob(src_relpath=rel, status="pending", token=secrets.token_urlsafe(24))
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def allowed_variants() -> set:
+    """Variant names the renderer produces with the current config: thumb, w<size>..."""
+    sizes = current_app.config.get("UPLOAD_DERIVATIVE_SIZES", DEFAULT_SIZES)
+    return {"thumb"} | {f"w{int(s)}" for s in sizes}
+
+
+def variant_url(job: UploadDerivativeJob, variant: str) -> Optional[str]:
+    from .storage import get_public_base
+    name = (job.variants or {}).get(variant)
+    if not name:
+        return None
+    rel_dir = Path(job.src_relpath).parent.as_posix()
+    return f"{get_public_base().rstrip('/')}/{rel_dir}/{name}"
+
+
+def original_url(job: UploadDerivativeJob) -> str:
+    from .storage import get_public_base
+    return f"{get_public_base().rstrip('/')}/{job.src_relpath}"
+
+
+def process_pending(include_failed: bool = False) -> int:
+    """Render queued jobs inline (`flask uploads derivatives`, e.g. after a restart)."""
+    statuses = ["pending", "failed"] if include_failed else ["pending"]
+    ids = [j.id for j in UploadDerivativeJob.query
+           .filter(UploadDerivativeJob.status.in_(statuses))
+           .order_by(UploadDerivativeJob.id).all()]
+    app = current_app._get_current_object()
+    for job_id in ids:
+        run_one(app, job_id)
+    return len(ids)
+
+
+def requeue_stale(older_than_seconds: Optional[int] = None, limit: int = 100) -> int:
+    """
+    Resubmit jobs still pending after `older_than_seconds` (a callback lost to a
+    restart or a dead pool). Each requeue counts as an attempt, so a job that
+    never finishes ends up failed. Returns the number of jobs resubmitted.
+    """
+    if older_than_seconds is None:
+        older_than_seconds = int(current_app.config.get("UPLOAD_DERIVATIVE_STALE_SECONDS", DEFAULT_STALE_SECONDS))
+    cutoff = datetime.utcnow() - timedelta(seconds=int(older_than_seconds))
+    jobs = (UploadDerivativeJob.query
+            .filter(UploadDerivativeJob.status == "pending", UploadDerivativeJob.updated_at < cutoff)
+            .order_by(UploadDerivativeJob.id).limit(limit).all())
+    for job in jobs:
+        job.attempts = (job.attempts or 0) + 1
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = "failed"
+            job.error = job.error or "never rendered"
+    db.session.commit()
+
+    resubmitted = 0
+    for job in jobs:
+        if job.status != "pending":
+            continue
+        try:
+            submit(job)
+            resubmitted += 1
+        except Exception:
+            log.exception("upload derivatives: requeue of job %s failed", job.id)
+    return resubmitted
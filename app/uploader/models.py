@@ -0,0 +1,28 @@
+# app/uploader/models.py
+from datetime import datetime
+
+from sqlalchemy import JSON
+
+from app.extensions import db
+
+
+class UploadDerivativeJob(db.Model):
+    """
+    One row per uploaded image: resized JPEG/WebP variants are rendered off the
+    request thread (app/uploader/derivatives.py) and recorded here.
+    """
+    __tablename__ = "upload_derivative_jobs"
+    __table_args__ = (
+        db.Index("ix_upload_derivative_jobs_status_id", "status", "id"),
+        db.Index("ux_upload_derivative_jobs_token", "token", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(64), nullable=True)  # unguessable id used in the public /u/_d/ URL
+    src_relpath = db.Column(db.String(500), nullable=False, unique=True)  # relative to the upload root
+    status = db.Column(db.String(16), nullable=False, default="pending")  # pending|done|failed
+    variants = db.Column(JSON, nullable=True)  # {"thumb": "<file name>", "w320": ..., ...}
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
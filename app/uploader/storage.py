@@ -8,6 +8,8 @@ from typing import Optional, Tuple
 from flask import current_app
 from werkzeug.utils import secure_filename
 
+from app import blobs
+
 # Try Pillow for thumbnails (optional). If not installed, previews fall back to original.
 try:
     from PIL import Image  # type: ignore
@@ -121,7 +123,7 @@ def save_file(file_storage, subdir: str = "feed") -> Tuple[Path, str]:
 
     final_name = _gen_name(fname)
     abs_path = abs_dir / final_name
-    file_storage.save(abs_path)
+    blobs.save(file_storage, abs_path)
 
     # If image and missing extension, try to detect via Pillow
     if not abs_path.suffix and (ct.startswith("image/") or _HAS_PIL):
@@ -133,18 +135,16 @@ def save_file(file_storage, subdir: str = "feed") -> Tuple[Path, str]:
 
 def make_thumbnail(src_path: Path, max_side: int = 512) -> Optional[Tuple[Path, str]]:
     """
-    Create a JPEG thumbnail next to the original.
+    Create a JPEG thumbnail next to the original, synchronously.
     Returns (abs_path, public_url) or None if not an image or Pillow missing.
+    Uploads go through the async pipeline in derivatives.py instead.
     """
     if not _HAS_PIL:
         return None
     try:
-        with Image.open(src_path) as im:
-            im = im.convert("RGB")
-            im.thumbnail((max_side, max_side))
-            thumb_name = src_path.stem + "_thumb.jpg"
-            thumb_path = src_path.parent / thumb_name
-            im.save(thumb_path, format="JPEG", quality=82)
+        from .derivatives import render_derivatives
+        name = render_derivatives(str(src_path), (), max_side)["thumb"]
+        thumb_path = src_path.parent / name
         rel = thumb_path.relative_to(get_upload_root())
         public_url = f"{get_public_base().rstrip('/')}/{rel.as_posix()}"
         return thumb_path, public_url
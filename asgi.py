@@ -0,0 +1,11 @@
+# Async SSE server (GET /api/realtime/stream) for many open tabs:
+#   uvicorn asgi:application --host 0.0.0.0 --port 8001
+# Route /api/realtime/stream to it and everything else to gunicorn "wsgi:app".
+# REALTIME_ASGI_MOUNT_WSGI=1 also serves the whole Flask app (needs asgiref).
+import os
+
+from app import create_app
+from app.realtime.asgi import create_asgi_app
+
+app = create_app()
+application = create_asgi_app(app, mount_wsgi=os.environ.get("REALTIME_ASGI_MOUNT_WSGI") == "1")